@@ -0,0 +1,293 @@
+import argparse
+
+import pandas as pd
+
+from banco import CAMINHO_BANCO, PoolConexoes
+from dados import reais
+from instrumentacao import ler_sql
+from migracoes import aplicar_migracoes
+
+# =============================================
+# RESUMO DIÁRIO AGREGADO
+# =============================================
+#
+# A tabela `resumo_diario` guarda, por data, o total e a quantidade de
+# lançamentos de cada tabela do caixa. Ela é mantida por triggers (criadas
+# na migração 003), de modo que qualquer escrita nos lançamentos, venha do
+# dashboard ou de um script, atualiza o agregado na mesma transação.
+# Sobre ele, `resumo_mensal` acumula os mesmos totais por mês (AAAA-MM) e
+# `resumo_mensal_metodo` os recebimentos por mês e forma de pagamento
+# (migração 004). Relatórios de vários meses leem poucas centenas de linhas
+# dessas tabelas em vez de varrer os lançamentos, e `saldo_acumulado`
+# guarda a soma corrida do líquido diário, de onde sai o saldo de abertura
+# de qualquer data (migração 009). Os totais são somas
+# exatas em centavos (migração 008); as funções de leitura devolvem reais.
+# Este módulo lê os resumos e oferece a reconstrução e a conferência
+# contra os lançamentos.
+
+# tabela de lançamentos -> sufixo das colunas em resumo_diario
+TABELAS_RESUMO = {
+    "recebimentos": "recebimentos",
+    "consumo_clientes": "consumo",
+    "gastos_insumos": "gastos_insumos",
+    "gastos_fixos": "gastos_fixos",
+}
+
+COLUNAS_RESUMO = tuple(
+    coluna
+    for sufixo in TABELAS_RESUMO.values()
+    for coluna in (f"total_{sufixo}", f"qtd_{sufixo}")
+)
+
+SQL_RESUMO_DIA = f"SELECT {', '.join(COLUNAS_RESUMO)} FROM resumo_diario WHERE data = ?"
+SQL_RESUMO_PERIODO = f'''
+    SELECT data, {', '.join(COLUNAS_RESUMO)} FROM resumo_diario
+    WHERE data >= ? AND data < ? ORDER BY data
+'''
+SQL_RESUMO_MES = f"SELECT {', '.join(COLUNAS_RESUMO)} FROM resumo_mensal WHERE mes = ?"
+SQL_RESUMO_MESES = f'''
+    SELECT mes, {', '.join(COLUNAS_RESUMO)} FROM resumo_mensal
+    WHERE mes >= ? AND mes <= ? ORDER BY mes
+'''
+SQL_FORMAS_PAGAMENTO_MES = '''
+    SELECT metodo AS "Forma de Pagamento", total / 100.0 AS "Total (R$)"
+    FROM resumo_mensal_metodo
+    WHERE mes = ? AND qtd > 0
+    ORDER BY metodo
+'''
+SQL_FORMAS_PAGAMENTO_MESES = '''
+    SELECT mes, metodo, total FROM resumo_mensal_metodo
+    WHERE mes >= ? AND mes <= ? AND qtd > 0
+    ORDER BY mes
+'''
+
+# Tolerância para comparar somas (em centavos, que são exatas)
+TOLERANCIA = 0.5
+
+
+def _sql_recalcular():
+    """SELECT que recalcula o resumo a partir dos lançamentos brutos"""
+    partes = []
+    for tabela, sufixo in TABELAS_RESUMO.items():
+        valores = ", ".join(
+            "COALESCE(SUM(valor), 0), COUNT(*)" if s == sufixo else "0, 0"
+            for s in TABELAS_RESUMO.values()
+        )
+        partes.append(
+            f"SELECT data, {valores} FROM {tabela} WHERE data IS NOT NULL GROUP BY data")
+    somas = ", ".join(f"SUM(c{i})" for i in range(len(COLUNAS_RESUMO)))
+    apelidos = ", ".join(f"c{i}" for i in range(len(COLUNAS_RESUMO)))
+    return f'''
+        WITH brutos (data, {apelidos}) AS ({" UNION ALL ".join(partes)})
+        SELECT data, {somas} FROM brutos GROUP BY data
+    '''
+
+
+def _resumo_em_reais(linha):
+    if linha is None:
+        linha = (0,) * len(COLUNAS_RESUMO)
+    return {coluna: reais(valor) if coluna.startswith("total_") else valor
+            for coluna, valor in zip(COLUNAS_RESUMO, linha)}
+
+
+def obter_resumo_dia(cursor, data):
+    """Totais (em reais) e quantidades do dia, de uma única linha do resumo"""
+    cursor.execute(SQL_RESUMO_DIA, (data,))
+    return _resumo_em_reais(cursor.fetchone())
+
+
+def obter_resumo_mes(cursor, mes):
+    """Totais (em reais) e quantidades do mês (AAAA-MM), do rollup mensal"""
+    cursor.execute(SQL_RESUMO_MES, (mes,))
+    return _resumo_em_reais(cursor.fetchone())
+
+
+def deslocar_mes(ano, mes, meses):
+    """Soma (ou subtrai) `meses` a ano/mês e retorna o novo par"""
+    indice = ano * 12 + (mes - 1) + meses
+    return indice // 12, indice % 12 + 1
+
+
+def _chave_mes(ano, mes):
+    return f"{ano:04d}-{mes:02d}"
+
+
+def serie_mensal(conn, ano, mes, meses=12):
+    """Série de `meses` meses terminando em ano/mês, com comparação anual.
+
+    Para cada mês traz recebimentos, consumo, gastos com insumos, gastos
+    fixos e o saldo do mês (recebimentos + consumo - gastos, como em
+    CaixaService.resumo_mes), o mesmo valor no mês do ano
+    anterior (sufixo `_ano_anterior`) e a variação entre os dois (prefixo
+    `var_`). Lê no máximo `meses + 12` linhas de resumo_mensal.
+    """
+    inicio = deslocar_mes(ano, mes, -(meses + 11))
+    chaves = [_chave_mes(*deslocar_mes(*inicio, i)) for i in range(meses + 12)]
+
+    df = ler_sql(SQL_RESUMO_MESES, conn, (chaves[0], chaves[-1]),
+                 "read_sql_query resumo_mensal")
+    df = df.set_index("mes").reindex(chaves, fill_value=0)
+
+    serie = pd.DataFrame(index=df.index)
+    serie["recebimentos"] = df["total_recebimentos"] / 100
+    serie["consumo"] = df["total_consumo"] / 100
+    serie["gastos_insumos"] = df["total_gastos_insumos"] / 100
+    serie["gastos_fixos"] = df["total_gastos_fixos"] / 100
+    serie["saldo"] = (df["total_recebimentos"] + df["total_consumo"]
+                      - df["total_gastos_insumos"] - df["total_gastos_fixos"]) / 100
+
+    metricas = list(serie.columns)
+    for metrica in metricas:
+        serie[f"{metrica}_ano_anterior"] = serie[metrica].shift(12)
+        serie[f"var_{metrica}"] = serie[metrica] - serie[f"{metrica}_ano_anterior"]
+
+    serie = serie.iloc[12:]
+    serie.index.name = "mes"
+    return serie
+
+
+def serie_formas_pagamento(conn, ano, mes, meses=12):
+    """Recebimentos por forma de pagamento (colunas) e mês (linhas)"""
+    inicio = deslocar_mes(ano, mes, -(meses - 1))
+    chaves = [_chave_mes(*deslocar_mes(*inicio, i)) for i in range(meses)]
+
+    df = ler_sql(SQL_FORMAS_PAGAMENTO_MESES, conn, (chaves[0], chaves[-1]),
+                 "read_sql_query resumo_mensal_metodo")
+    df["total"] = df["total"] / 100
+    tabela = df.pivot_table(index="mes", columns="metodo", values="total",
+                            aggfunc="sum", fill_value=0)
+    tabela = tabela.reindex(chaves, fill_value=0)
+    tabela.index.name = "mes"
+    tabela.columns.name = None
+    return tabela
+
+
+def _sql_recalcular_metodo():
+    return '''
+        SELECT substr(data, 1, 7), COALESCE(metodo, ''),
+               COALESCE(SUM(valor), 0), COUNT(*)
+        FROM recebimentos WHERE data IS NOT NULL
+        GROUP BY substr(data, 1, 7), COALESCE(metodo, '')
+    '''
+
+
+def reconstruir_resumo_diario(conn):
+    """Recalcula todos os resumos a partir dos lançamentos; retorna nº de dias"""
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        # As triggers de resumo_diario repovoam resumo_mensal e
+        # saldo_acumulado. Esvaziar saldo_acumulado antes evita que cada
+        # dia apagado desloque todos os dias seguintes; a reinserção em
+        # ordem de data só acrescenta linhas ao fim.
+        cursor.execute("DELETE FROM saldo_acumulado")
+        cursor.execute("DELETE FROM resumo_diario")
+        cursor.execute("DELETE FROM resumo_mensal")
+        cursor.execute(
+            f"INSERT INTO resumo_diario (data, {', '.join(COLUNAS_RESUMO)}) "
+            f"{_sql_recalcular()} ORDER BY data")
+        dias = cursor.rowcount
+        cursor.execute("DELETE FROM resumo_mensal_metodo")
+        cursor.execute(
+            f"INSERT INTO resumo_mensal_metodo (mes, metodo, total, qtd) {_sql_recalcular_metodo()}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return dias
+
+
+def _comparar(mantido, recalculado, colunas):
+    zeros = (0,) * len(colunas)
+    divergencias = []
+    for chave in sorted(mantido.keys() | recalculado.keys()):
+        atual = mantido.get(chave, zeros)
+        esperado = recalculado.get(chave, zeros)
+        for coluna, a, e in zip(colunas, atual, esperado):
+            if abs(a - e) > TOLERANCIA:
+                divergencias.append((chave, coluna, a, e))
+    return divergencias
+
+
+def verificar_resumo_diario(conn):
+    """Compara os resumos mantidos com os recalculados dos lançamentos.
+
+    Retorna uma lista de (chave, coluna, valor_no_resumo, valor_recalculado)
+    para cada divergência, onde a chave é a data (resumo diário), o mês
+    (resumo mensal) ou "mês método"; lista vazia indica consistência.
+    O saldo acumulado por dia é conferido contra a soma corrida do
+    líquido recalculado.
+    """
+    colunas = ", ".join(COLUNAS_RESUMO)
+    recalculado = {linha[0]: linha[1:]
+                   for linha in conn.execute(_sql_recalcular())}
+    mantido = {linha[0]: linha[1:] for linha in conn.execute(
+        f"SELECT data, {colunas} FROM resumo_diario")}
+    divergencias = _comparar(mantido, recalculado, COLUNAS_RESUMO)
+
+    # O mensal deve ser a soma do diário recalculado
+    mensal = {}
+    for data, valores in recalculado.items():
+        atual = mensal.get(data[:7], (0,) * len(COLUNAS_RESUMO))
+        mensal[data[:7]] = tuple(a + v for a, v in zip(atual, valores))
+    mantido = {linha[0]: linha[1:] for linha in conn.execute(
+        f"SELECT mes, {colunas} FROM resumo_mensal")}
+    divergencias += _comparar(mantido, mensal, COLUNAS_RESUMO)
+
+    acumulado, corrida = {}, 0
+    for data in sorted(recalculado):
+        r, _, c, _, gi, _, gf, _ = recalculado[data]
+        corrida += r + c - gi - gf
+        acumulado[data] = (corrida,)
+    mantido = {linha[0]: linha[1:] for linha in conn.execute(
+        "SELECT data, acumulado FROM saldo_acumulado")}
+    divergencias += _comparar(mantido, acumulado, ("acumulado",))
+
+    recalculado = {f"{linha[0]} {linha[1]}": linha[2:]
+                   for linha in conn.execute(_sql_recalcular_metodo())}
+    mantido = {f"{linha[0]} {linha[1]}": linha[2:] for linha in conn.execute(
+        "SELECT mes, metodo, total, qtd FROM resumo_mensal_metodo")}
+    divergencias += _comparar(mantido, recalculado, ("total", "qtd"))
+    return divergencias
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Reconstrói ou confere os resumos diário e mensal")
+    parser.add_argument("--banco", default=CAMINHO_BANCO,
+                        help="caminho do arquivo SQLite")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("reconstruir",
+                   help="recalcula os resumos a partir dos lançamentos")
+    sub.add_parser("verificar",
+                   help="lista divergências entre resumos e lançamentos")
+    args = parser.parse_args()
+
+    pool = PoolConexoes(args.banco, tamanho_maximo=1)
+    try:
+        with pool.conexao_reentrante() as conn:
+            aplicar_migracoes(conn)
+            if args.comando == "reconstruir":
+                dias = reconstruir_resumo_diario(conn)
+                print(f"Resumos reconstruídos ({dias} dias)")
+            else:
+                from caza.caixa import CaixaService
+
+                divergencias = verificar_resumo_diario(conn)
+                fechamentos = CaixaService(pool, capacidade_memo=0).verificar_fechamentos()
+    finally:
+        pool.fechar()
+
+    if args.comando == "verificar":
+        for chave, coluna, atual, esperado in divergencias:
+            print(f"{chave} {coluna}: resumo={atual} lançamentos={esperado}")
+        for mes, coluna, valor, esperado in fechamentos:
+            print(f"{mes} {coluna}: fechamento={valor} abertura do mês seguinte={esperado}")
+        if divergencias or fechamentos:
+            parser.exit(1, f"{len(divergencias) + len(fechamentos)} "
+                           "divergência(s) encontrada(s)\n")
+        print("Resumos consistentes com os lançamentos e fechamentos mensais encadeados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+import argparse
+import json
+import zlib
+from collections import namedtuple
+from datetime import datetime
+
+from banco import CAMINHO_BANCO, PoolConexoes, executar_escrita
+from dados import reais
+from migracoes import aplicar_migracoes
+from registros import REGISTROS
+
+# =============================================
+# AUDITORIA DOS LANÇAMENTOS
+# =============================================
+#
+# Triggers (migração 012) gravam em `auditoria`, somente por inclusão,
+# cada inclusão, alteração e exclusão de lançamentos e saldos informados,
+# com o dia do lançamento: "I" traz a linha inteira, "U" só as colunas
+# alteradas e "D" nada. Os valores ficam como no banco (centavos).
+#
+# O estado de um dia em um momento é o instantâneo mais recente do dia até
+# esse momento (`auditoria_instantaneos`, JSON comprimido) mais as
+# entradas do registro daquele dia depois dele. As buscas usam o índice
+# (dia, id), então reconstruir um dia lê apenas as entradas desse dia, e
+# os instantâneos limitam quantas delas são reaplicadas: ao reconstruir um
+# dia com mais de LIMITE_ENTRADAS entradas desde o último instantâneo, um
+# novo é gravado, e `compactar` faz o mesmo para todos os dias de uma vez.
+
+# Entradas reaplicadas a partir das quais vale gravar um instantâneo
+LIMITE_ENTRADAS = 200
+
+# Momento do instantâneo de partida: anterior a qualquer entrada
+INICIO = ""
+
+SQL_INSTANTANEO = '''
+    SELECT id_auditoria, conteudo FROM auditoria_instantaneos
+    WHERE dia = ? AND momento <= ? ORDER BY id_auditoria DESC LIMIT 1
+'''
+SQL_ENTRADAS_DIA = '''
+    SELECT id, momento, tabela, registro_id, operacao, dados FROM auditoria
+    WHERE dia = ? AND id > ? AND momento <= ? ORDER BY id
+'''
+SQL_CONTAR_ENTRADAS_DIA = "SELECT COUNT(*) FROM auditoria WHERE dia = ? AND id > ? AND id <= ?"
+SQL_GRAVAR_INSTANTANEO = '''
+    INSERT OR IGNORE INTO auditoria_instantaneos (dia, id_auditoria, momento, conteudo)
+    VALUES (?, ?, ?, ?)
+'''
+SQL_DIAS_PARA_COMPACTAR = '''
+    SELECT a.dia, COUNT(*) FROM auditoria a
+    WHERE a.dia IS NOT NULL AND a.id > COALESCE(
+        (SELECT MAX(i.id_auditoria) FROM auditoria_instantaneos i WHERE i.dia = a.dia), 0)
+    GROUP BY a.dia HAVING COUNT(*) >= ?
+'''
+
+
+class LivroDia(namedtuple("LivroDia", ("dia", "momento", "saldo_informado", "registros",
+                                       "entradas_reaplicadas"))):
+    """Lançamentos de um dia como estavam em um momento.
+
+    `registros` é {tabela: [Registro, ...]} (ver `registros`), em ordem de
+    id; `saldo_informado` é o saldo de abertura informado para o dia, em
+    reais (None se não havia). `entradas_reaplicadas` conta as entradas do
+    registro lidas depois do instantâneo usado.
+    """
+    __slots__ = ()
+
+    def total(self, tabela):
+        """Soma em reais dos lançamentos da tabela"""
+        return reais(sum(r.centavos or 0 for r in self.registros.get(tabela, ())))
+
+
+Alteracao = namedtuple("Alteracao", ("id", "momento", "tabela", "registro_id", "dia",
+                                     "operacao", "dados"))
+
+
+def _momento(momento):
+    """datetime ou texto ISO -> texto comparável com `auditoria.momento`"""
+    if momento is None:
+        return "9999"
+    if isinstance(momento, str):
+        momento = datetime.fromisoformat(momento)
+    return momento.isoformat(sep=" ", timespec="milliseconds")
+
+
+def _compactar(estado):
+    return zlib.compress(json.dumps(estado, separators=(",", ":")).encode())
+
+
+def _descompactar(conteudo):
+    return {tabela: {int(registro_id): linha for registro_id, linha in linhas.items()}
+            for tabela, linhas in json.loads(zlib.decompress(conteudo)).items()}
+
+
+def estado_dia(conn, dia, momento=None):
+    """Estado bruto do dia: ({tabela: {id: {coluna: valor}}}, reaplicadas, último id).
+
+    Sem `momento`, o estado atual. Grava um instantâneo quando a
+    reconstrução reaplicou LIMITE_ENTRADAS entradas ou mais.
+    """
+    limite = _momento(momento)
+    instantaneo = conn.execute(SQL_INSTANTANEO, (dia, limite)).fetchone()
+    if instantaneo is None:
+        desde, estado = 0, {}
+    else:
+        desde, estado = instantaneo[0], _descompactar(instantaneo[1])
+
+    ultimo, ultimo_momento, reaplicadas = desde, INICIO, 0
+    for id_, momento_entrada, tabela, registro_id, operacao, dados in conn.execute(
+            SQL_ENTRADAS_DIA, (dia, desde, limite)):
+        linhas = estado.setdefault(tabela, {})
+        if operacao == "I":
+            linhas[registro_id] = json.loads(dados)
+        elif operacao == "U":
+            linhas.setdefault(registro_id, {}).update(json.loads(dados))
+        else:
+            linhas.pop(registro_id, None)
+        ultimo, ultimo_momento, reaplicadas = id_, momento_entrada, reaplicadas + 1
+
+    # Só vale como instantâneo se nenhuma entrada anterior ficou de fora
+    # pelo filtro de momento (relógio ajustado para trás)
+    if reaplicadas >= LIMITE_ENTRADAS and conn.execute(
+            SQL_CONTAR_ENTRADAS_DIA, (dia, desde, ultimo)).fetchone()[0] == reaplicadas:
+        executar_escrita(conn.cursor(), SQL_GRAVAR_INSTANTANEO,
+                         (dia, ultimo, ultimo_momento, _compactar(estado)))
+    return estado, reaplicadas, ultimo
+
+
+def livro_dia(conn, dia, momento=None):
+    """LivroDia com os lançamentos de `dia` como estavam em `momento`.
+
+    `momento` é um datetime ou texto ISO ("2025-07-01 18:30"); sem ele, o
+    estado atual. Só as entradas do registro daquele dia são lidas.
+    """
+    estado, reaplicadas, _ = estado_dia(conn, dia, momento)
+    registros = {}
+    for tabela, classe in REGISTROS.items():
+        linhas = estado.get(tabela, {})
+        registros[tabela] = [
+            classe.de_linha(tuple(registro_id if coluna == "id" else linha.get(coluna)
+                                  for coluna in classe.COLUNAS))
+            for registro_id, linha in sorted(linhas.items())]
+    saldo = next(iter(estado.get("saldo_inicial", {}).values()), None)
+    return LivroDia(dia, momento, reais(saldo.get("valor")) if saldo else None,
+                    registros, reaplicadas)
+
+
+def alteracoes(conn, tabela=None, inicio=None, fim=None, limite=100):
+    """Alterações mais recentes (Alteracao), filtradas por tabela e período"""
+    filtros, parametros = [], []
+    if tabela:
+        filtros.append("tabela = ?")
+        parametros.append(tabela)
+    if inicio:
+        filtros.append("momento >= ?")
+        parametros.append(_momento(inicio))
+    if fim:
+        filtros.append("momento < ?")
+        parametros.append(_momento(fim))
+    onde = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+    cursor = conn.execute(
+        f"SELECT {', '.join(Alteracao._fields)} FROM auditoria {onde} "
+        "ORDER BY momento DESC, id DESC LIMIT ?", (*parametros, limite))
+    return [Alteracao(*linha)._replace(dados=json.loads(linha[-1]) if linha[-1] else None)
+            for linha in cursor]
+
+
+def compactar(conn, limite=LIMITE_ENTRADAS):
+    """Grava o instantâneo atual de cada dia com `limite` entradas ou mais
+    desde o último; retorna o número de instantâneos gravados."""
+    dias = [dia for dia, _ in conn.execute(SQL_DIAS_PARA_COMPACTAR, (limite,))]
+    for dia in dias:
+        estado, reaplicadas, ultimo = estado_dia(conn, dia)
+        if reaplicadas < LIMITE_ENTRADAS:
+            momento = conn.execute("SELECT momento FROM auditoria WHERE id = ?",
+                                   (ultimo,)).fetchone()[0]
+            executar_escrita(conn.cursor(), SQL_GRAVAR_INSTANTANEO,
+                             (dia, ultimo, momento, _compactar(estado)))
+    return len(dias)
+
+
+def verificar(conn):
+    """Compara o estado atual reconstruído de cada dia com as tabelas.
+
+    Retorna uma lista de (dia, tabela, id) divergentes; lista vazia indica
+    que o registro cobre todos os lançamentos.
+    """
+    colunas = {tabela: classe.COLUNAS for tabela, classe in REGISTROS.items()}
+    colunas["saldo_inicial"] = ("id", "data", "valor", "observacao")
+    atual = {}
+    for tabela, nomes in colunas.items():
+        for linha in conn.execute(
+                f"SELECT {', '.join(nomes)} FROM {tabela} WHERE data IS NOT NULL"):
+            campos = dict(zip(nomes, linha))
+            registro_id = campos.pop("id")
+            atual.setdefault(campos["data"], {}).setdefault(tabela, {})[registro_id] = campos
+
+    dias = set(atual) | {dia for (dia,) in conn.execute(
+        "SELECT DISTINCT dia FROM auditoria_instantaneos")}
+    divergencias = []
+    for dia in sorted(dias):
+        reconstruido, _, _ = estado_dia(conn, dia)
+        for tabela in colunas:
+            esperado = atual.get(dia, {}).get(tabela, {})
+            obtido = reconstruido.get(tabela, {})
+            for registro_id in set(esperado) | set(obtido):
+                a = {c: v for c, v in esperado.get(registro_id, {}).items() if v is not None}
+                b = {c: v for c, v in obtido.get(registro_id, {}).items() if v is not None}
+                if registro_id not in obtido or registro_id not in esperado or a != b:
+                    divergencias.append((dia, tabela, registro_id))
+    return divergencias
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Consulta o registro de alterações dos lançamentos")
+    parser.add_argument("--banco", default=CAMINHO_BANCO,
+                        help="caminho do arquivo SQLite")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    dia = sub.add_parser("dia", help="lançamentos de um dia como estavam em um momento")
+    dia.add_argument("dia", help="AAAA-MM-DD")
+    dia.add_argument("--em", help="momento, ex.: '2025-07-01 18:30' (padrão: agora)")
+    listar = sub.add_parser("listar", help="alterações mais recentes")
+    listar.add_argument("--tabela")
+    listar.add_argument("--desde")
+    listar.add_argument("--limite", type=int, default=30)
+    sub.add_parser("compactar", help="grava instantâneos dos dias com muitas alterações")
+    sub.add_parser("verificar", help="confere o registro contra os lançamentos atuais")
+    args = parser.parse_args()
+
+    pool = PoolConexoes(args.banco, tamanho_maximo=1)
+    try:
+        with pool.conexao() as conn:
+            aplicar_migracoes(conn)
+            if args.comando == "dia":
+                livro = livro_dia(conn, args.dia, args.em)
+                if livro.saldo_informado is not None:
+                    print(f"Saldo informado: R$ {livro.saldo_informado:.2f}")
+                for tabela, registros in livro.registros.items():
+                    print(f"{tabela}: {len(registros)} lançamento(s), "
+                          f"R$ {livro.total(tabela):.2f}")
+                    for registro in registros:
+                        print(f"  {registro!r}")
+                print(f"({livro.entradas_reaplicadas} entrada(s) do registro reaplicada(s))")
+            elif args.comando == "listar":
+                for alteracao in alteracoes(conn, args.tabela, args.desde, limite=args.limite):
+                    print(f"{alteracao.momento} {alteracao.operacao} {alteracao.tabela:<17} "
+                          f"{alteracao.registro_id:>7} {alteracao.dia} "
+                          f"{json.dumps(alteracao.dados, ensure_ascii=False) if alteracao.dados else ''}")
+            elif args.comando == "compactar":
+                print(f"{compactar(conn)} instantâneo(s) gravado(s)")
+            else:
+                divergencias = verificar(conn)
+    finally:
+        pool.fechar()
+
+    if args.comando == "verificar":
+        for dia, tabela, registro_id in divergencias:
+            print(f"{dia} {tabela} id {registro_id}: diferente do registro")
+        if divergencias:
+            parser.exit(1, f"{len(divergencias)} divergência(s) encontrada(s)\n")
+        print("Registro de alterações consistente com os lançamentos")
+
+
+if __name__ == "__main__":
+    main()
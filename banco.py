@@ -0,0 +1,226 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+import atexit
+from contextlib import contextmanager
+
+# =============================================
+# POOL DE CONEXÕES SQLITE
+# =============================================
+
+CAMINHO_BANCO = os.environ.get("CAZA_DB", os.path.join("data", "caza.db"))
+
+# Configurações aplicadas em toda conexão nova
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA cache_size = -16000",  # ~16 MB de cache de páginas
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+def banco_ocupado(erro):
+    """Indica se o erro do SQLite é de banco bloqueado/ocupado"""
+    mensagem = str(erro).lower()
+    return "locked" in mensagem or "busy" in mensagem
+
+
+class PoolConexoes:
+    """Pool de conexões SQLite compartilhado pelo processo.
+
+    As conexões são abertas sob demanda (até `tamanho_maximo`), configuradas
+    com WAL e reaproveitadas entre as execuções do script. Com WAL, leitores
+    (Relatório Mensal) não bloqueiam o escritor (Caixa Diário).
+    """
+
+    def __init__(self, caminho=CAMINHO_BANCO, tamanho_maximo=8, timeout=30.0):
+        self.caminho = caminho
+        self.tamanho_maximo = tamanho_maximo
+        self.timeout = timeout
+        self._livres = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._todas = []
+        self._fechado = False
+        # Conexão da thread emprestada por `conexao_reentrante`
+        self._da_thread = threading.local()
+        self._estatisticas = {
+            "conexoes_abertas": 0,
+            "em_uso": 0,
+            "emprestimos": 0,
+            "esperas": 0,
+            "tentativas_ocupado": 0,
+        }
+
+        pasta = os.path.dirname(caminho)
+        if pasta and not os.path.exists(pasta):
+            os.makedirs(pasta)
+
+    def _abrir(self):
+        conn = sqlite3.connect(self.caminho, check_same_thread=False,
+                               timeout=self.timeout)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def adquirir(self):
+        """Retira uma conexão do pool, abrindo uma nova se houver espaço"""
+        if self._fechado:
+            raise RuntimeError("Pool de conexões já foi fechado")
+
+        try:
+            conn = self._livres.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if len(self._todas) < self.tamanho_maximo:
+                    conn = self._abrir()
+                    self._todas.append(conn)
+                    self._estatisticas["conexoes_abertas"] = len(self._todas)
+                else:
+                    self._estatisticas["esperas"] += 1
+            if conn is None:
+                try:
+                    conn = self._livres.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise sqlite3.OperationalError(
+                        "Tempo esgotado aguardando conexão livre no pool")
+
+        with self._lock:
+            self._estatisticas["emprestimos"] += 1
+            self._estatisticas["em_uso"] += 1
+        return conn
+
+    def devolver(self, conn):
+        """Devolve a conexão ao pool, desfazendo transações pendentes"""
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            self._estatisticas["em_uso"] -= 1
+        if self._fechado:
+            conn.close()
+        else:
+            self._livres.put(conn)
+
+    @contextmanager
+    def conexao(self):
+        """Empresta uma conexão durante o bloco `with`.
+
+        Dentro de um bloco `conexao_reentrante` da mesma thread, devolve a
+        conexão desse bloco em vez de emprestar outra.
+        """
+        conn = getattr(self._da_thread, "conn", None)
+        if conn is not None:
+            yield conn
+            return
+        conn = self.adquirir()
+        try:
+            yield conn
+        finally:
+            self.devolver(conn)
+
+    @contextmanager
+    def conexao_reentrante(self):
+        """Empresta uma conexão que os empréstimos aninhados reaproveitam.
+
+        Enquanto o bloco durar, `conexao()` e `conexao_reentrante()` na
+        mesma thread devolvem essa conexão. Uma thread nunca segura uma
+        conexão esperando outra: com todas emprestadas, várias sessões
+        presas nessa espera esgotariam o pool até o timeout.
+        """
+        if getattr(self._da_thread, "conn", None) is not None:
+            yield self._da_thread.conn
+            return
+        with self.conexao() as conn:
+            self._da_thread.conn = conn
+            try:
+                yield conn
+            finally:
+                self._da_thread.conn = None
+
+    def repetir_se_ocupado(self, operacao, tentativas=5, espera=0.05):
+        """Executa `operacao()` repetindo enquanto o banco estiver bloqueado"""
+        for tentativa in range(tentativas):
+            try:
+                return operacao()
+            except sqlite3.OperationalError as e:
+                if not banco_ocupado(e) or tentativa == tentativas - 1:
+                    raise
+                with self._lock:
+                    self._estatisticas["tentativas_ocupado"] += 1
+                time.sleep(espera * (2 ** tentativa))
+
+    def estatisticas(self):
+        """Retorna uma cópia dos contadores do pool"""
+        with self._lock:
+            dados = dict(self._estatisticas)
+        dados["livres"] = self._livres.qsize()
+        dados["tamanho_maximo"] = self.tamanho_maximo
+        return dados
+
+    def fechar(self):
+        """Fecha todas as conexões abertas pelo pool"""
+        with self._lock:
+            self._fechado = True
+            conexoes, self._todas = self._todas, []
+            self._estatisticas["conexoes_abertas"] = 0
+        for conn in conexoes:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def obter_pool():
+    """Retorna o pool do processo, criando-o na primeira chamada"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PoolConexoes()
+                atexit.register(_pool.fechar)
+    return _pool
+
+
+def repetir_se_ocupado(operacao, tentativas=5, espera=0.05):
+    """Atalho para `obter_pool().repetir_se_ocupado`"""
+    return obter_pool().repetir_se_ocupado(operacao, tentativas, espera)
+
+
+def executar_escrita(cursor, sql, parametros=()):
+    """Executa uma escrita e confirma, repetindo se o banco estiver ocupado"""
+    def operacao():
+        try:
+            cursor.execute(sql, parametros)
+            cursor.connection.commit()
+        except sqlite3.OperationalError:
+            cursor.connection.rollback()
+            raise
+
+    repetir_se_ocupado(operacao)
+
+
+def executar_transacao(conn, operacao):
+    """Executa `operacao(cursor)` em uma única transação BEGIN IMMEDIATE.
+
+    Confirma ao final ou desfaz tudo em caso de erro; se o banco estiver
+    ocupado, a transação inteira é repetida. Retorna o resultado da operação.
+    """
+    def tentativa():
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            resultado = operacao(cursor)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        return resultado
+
+    return repetir_se_ocupado(tentativa)
@@ -0,0 +1 @@
+"""Benchmarks do CAZÁ. Execute a partir da raiz do projeto com `python -m`."""
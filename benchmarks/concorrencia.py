@@ -0,0 +1,264 @@
+"""Estresse de escritas concorrentes (vários terminais) no CAZÁ.
+
+Cria um banco descartável com alguns insumos e dispara N trabalhadores
+(processos, ou threads com `--threads`), cada um com a sua conexão,
+misturando as escritas do dia a dia: lançamentos de recebimento, baixas de
+estoque, ajustes de estoque pela grade (com a versão lida) e edições de um
+mesmo lançamento compartilhado (leitura, soma de um centavo e gravação com
+a versão lida, repetindo em caso de conflito). Ao final confere que
+nenhuma escrita confirmada se perdeu:
+
+- a quantidade e a soma dos recebimentos batem com as inclusões feitas;
+- o estoque de cada insumo é o inicial menos as baixas e os ajustes, e
+  bate com o livro de movimentos;
+- o lançamento compartilhado acumulou exatamente as edições confirmadas;
+- os resumos agregados batem com os lançamentos.
+
+O resultado (vazão, conflitos, tentativas com banco ocupado e as
+conferências) vai em JSON para `--saida` ou para a saída padrão; sai com
+código 1 se alguma conferência falhar.
+
+    python -m benchmarks.concorrencia [--trabalhadores 4] [--operacoes 500] \\
+        [--insumos 3] [--threads] [--saida resultado.json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from banco import PoolConexoes, obter_pool
+
+# Proporção de cada operação no sorteio
+MIX_OPERACOES = {"lancamento": 0.5, "baixa": 0.25, "ajuste": 0.1, "edicao": 0.15}
+
+# Tentativas de uma escrita otimista antes de desistir
+TENTATIVAS_CONFLITO = 100
+
+ESTOQUE_INICIAL = 1_000_000.0
+DIA = date(2025, 12, 31).isoformat()
+
+
+def preparar(caminho, insumos):
+    """Banco novo com `insumos` insumos e o lançamento compartilhado.
+
+    Retorna (ids dos insumos, id do lançamento compartilhado).
+    """
+    from dados import inserir
+    from estoque import cadastrar_insumo
+    from migracoes import aplicar_migracoes
+
+    pool = PoolConexoes(caminho, tamanho_maximo=1)
+    try:
+        with pool.conexao() as conn:
+            aplicar_migracoes(conn)
+            ids = [cadastrar_insumo(conn, f"Insumo {n}", "un", 0, ESTOQUE_INICIAL, data=DIA)
+                   for n in range(insumos)]
+            compartilhado = inserir(conn.cursor(), "gastos_fixos", {
+                "data": DIA, "descricao": "Lançamento editado por todos",
+                "valor": 0, "tipo": "gasto_fixo"})
+    finally:
+        pool.fechar()
+    return ids, compartilhado
+
+
+def trabalhar(caminho, numero, operacoes, insumos, compartilhado, semente, contar_ocupado):
+    """Executa `operacoes` escritas sorteadas e devolve o que foi confirmado"""
+    from dados import ConflitoVersao, atualizar, inserir, selecionar
+    from estoque import registrar_baixa, salvar_insumos
+
+    aleatorio = random.Random(semente * 1_000 + numero)
+    nomes, pesos = zip(*MIX_OPERACOES.items())
+    feitos = {nome: 0 for nome in nomes}
+    resultado = {"recebimentos": 0, "recebimentos_centavos": 0, "edicoes": 0,
+                 "saidas": {str(insumo_id): 0.0 for insumo_id in insumos},
+                 "conflitos": 0, "desistencias": 0, "erros": []}
+
+    def otimista(ler, gravar):
+        """Lê e grava com a versão lida, repetindo enquanto houver conflito"""
+        for _ in range(TENTATIVAS_CONFLITO):
+            try:
+                gravar(*ler())
+                return True
+            except ConflitoVersao:
+                resultado["conflitos"] += 1
+        resultado["desistencias"] += 1
+        return False
+
+    pool = PoolConexoes(caminho, tamanho_maximo=1)
+    inicio = time.perf_counter()
+    try:
+        with pool.conexao() as conn:
+            cursor = conn.cursor()
+            for _ in range(operacoes):
+                operacao = aleatorio.choices(nomes, pesos)[0]
+                insumo_id = aleatorio.choice(insumos)
+                try:
+                    if operacao == "lancamento":
+                        valor = aleatorio.randint(100, 20_000)
+                        inserir(cursor, "recebimentos", {
+                            "data": DIA, "valor": valor / 100, "metodo": "PIX",
+                            "tipo": "recebimento"})
+                        resultado["recebimentos"] += 1
+                        resultado["recebimentos_centavos"] += valor
+                    elif operacao == "baixa":
+                        registrar_baixa(conn, insumo_id, 1, DIA, f"trabalhador {numero}")
+                        resultado["saidas"][str(insumo_id)] += 1
+                    elif operacao == "ajuste":
+                        # Como na grade: novo saldo absoluto a partir do saldo lido
+                        def ler():
+                            return conn.execute(
+                                "SELECT estoque_atual, versao FROM insumos WHERE id = ?",
+                                (insumo_id,)).fetchone()
+
+                        def gravar(saldo, versao):
+                            salvar_insumos(conn, {insumo_id: {"estoque_atual": saldo - 1}},
+                                           data=DIA, versoes={insumo_id: versao})
+
+                        if otimista(ler, gravar):
+                            resultado["saidas"][str(insumo_id)] += 1
+                    else:
+                        def ler():
+                            linha, = selecionar(cursor, "gastos_fixos", "id", (compartilhado,),
+                                                ("valor", "versao"))
+                            return linha
+
+                        def gravar(valor, versao):
+                            atualizar(cursor, "gastos_fixos", compartilhado,
+                                      {"valor": round(valor + 0.01, 2)}, versao)
+
+                        if otimista(ler, gravar):
+                            resultado["edicoes"] += 1
+                    feitos[operacao] += 1
+                except sqlite3.OperationalError as e:
+                    resultado["erros"].append(f"{operacao}: {e}")
+    finally:
+        pool.fechar()
+
+    resultado["segundos"] = time.perf_counter() - inicio
+    resultado["operacoes"] = feitos
+    resultado["tentativas_ocupado"] = (
+        obter_pool().estatisticas()["tentativas_ocupado"] if contar_ocupado else 0)
+    return resultado
+
+
+def _trabalhar(argumentos):
+    return trabalhar(*argumentos)
+
+
+def conferir(caminho, insumos, compartilhado, resultados):
+    """Lista de (conferência, esperado, encontrado, ok)"""
+    from agregados import verificar_resumo_diario
+    from estoque import verificar_estoque
+
+    conferencias = []
+    conn = sqlite3.connect(caminho)
+    try:
+        quantidade, soma = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(valor), 0) FROM recebimentos").fetchone()
+        esperado = sum(r["recebimentos"] for r in resultados)
+        conferencias.append(("recebimentos", esperado, quantidade, quantidade == esperado))
+        esperado = sum(r["recebimentos_centavos"] for r in resultados)
+        conferencias.append(("soma dos recebimentos (centavos)", esperado, soma,
+                             soma == esperado))
+
+        for insumo_id in insumos:
+            saldo, = conn.execute("SELECT estoque_atual FROM insumos WHERE id = ?",
+                                  (insumo_id,)).fetchone()
+            esperado = ESTOQUE_INICIAL - sum(r["saidas"][str(insumo_id)] for r in resultados)
+            conferencias.append((f"estoque do insumo {insumo_id}", esperado, saldo,
+                                 abs(saldo - esperado) < 1e-6))
+        divergencias = verificar_estoque(conn)
+        conferencias.append(("estoque x livro de movimentos", 0, len(divergencias),
+                             not divergencias))
+
+        valor, = conn.execute("SELECT valor FROM gastos_fixos WHERE id = ?",
+                              (compartilhado,)).fetchone()
+        esperado = sum(r["edicoes"] for r in resultados)
+        conferencias.append(("edições do lançamento compartilhado (centavos)", esperado,
+                             valor, valor == esperado))
+
+        divergencias = verificar_resumo_diario(conn)
+        conferencias.append(("resumos agregados x lançamentos", 0, len(divergencias),
+                             not divergencias))
+    finally:
+        conn.close()
+    return conferencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trabalhadores", type=int, default=4)
+    parser.add_argument("--operacoes", type=int, default=500,
+                        help="escritas por trabalhador")
+    parser.add_argument("--insumos", type=int, default=3,
+                        help="poucos insumos concentram as baixas e os ajustes")
+    parser.add_argument("--threads", action="store_true",
+                        help="trabalhadores em threads do mesmo processo")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--saida", help="arquivo JSON de resultado (padrão: saída padrão)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "caza.db")
+        insumos, compartilhado = preparar(caminho, args.insumos)
+        tarefas = [(caminho, numero, args.operacoes, insumos, compartilhado, args.semente,
+                    not args.threads)
+                   for numero in range(args.trabalhadores)]
+
+        ocupado_antes = obter_pool().estatisticas()["tentativas_ocupado"]
+        inicio = time.perf_counter()
+        if args.threads:
+            with ThreadPoolExecutor(args.trabalhadores) as executor:
+                resultados = list(executor.map(_trabalhar, tarefas))
+            tentativas_ocupado = obter_pool().estatisticas()["tentativas_ocupado"] - ocupado_antes
+        else:
+            with multiprocessing.get_context("spawn").Pool(args.trabalhadores) as processos:
+                resultados = processos.map(_trabalhar, tarefas)
+            tentativas_ocupado = sum(r["tentativas_ocupado"] for r in resultados)
+        duracao = time.perf_counter() - inicio
+
+        conferencias = conferir(caminho, insumos, compartilhado, resultados)
+
+    operacoes = {nome: sum(r["operacoes"][nome] for r in resultados) for nome in MIX_OPERACOES}
+    total = sum(operacoes.values())
+    erros = [erro for r in resultados for erro in r["erros"]]
+    resultado = {
+        "sqlite": sqlite3.sqlite_version,
+        "parametros": {"trabalhadores": args.trabalhadores, "operacoes": args.operacoes,
+                       "insumos": args.insumos,
+                       "modo": "threads" if args.threads else "processos",
+                       "semente": args.semente},
+        "duracao_s": round(duracao, 3),
+        "operacoes": operacoes,
+        "operacoes_por_segundo": round(total / duracao, 1),
+        "conflitos": sum(r["conflitos"] for r in resultados),
+        "desistencias": sum(r["desistencias"] for r in resultados),
+        "tentativas_ocupado": tentativas_ocupado,
+        "erros": erros,
+        "conferencias": [{"conferencia": nome, "esperado": esperado, "encontrado": encontrado,
+                          "ok": ok} for nome, esperado, encontrado, ok in conferencias],
+    }
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(texto + "\n")
+    else:
+        print(texto)
+
+    falhas = [nome for nome, _, _, ok in conferencias if not ok]
+    print(f"\n{total} escritas em {duracao:.2f} s ({total / duracao:.0f}/s), "
+          f"{resultado['conflitos']} conflito(s) resolvido(s), "
+          f"{tentativas_ocupado} tentativa(s) com banco ocupado", file=sys.stderr)
+    if falhas or erros:
+        parser.exit(1, f"Falhas: {', '.join(falhas) or '-'}; {len(erros)} erro(s) de escrita\n")
+
+
+if __name__ == "__main__":
+    main()
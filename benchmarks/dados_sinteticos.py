@@ -0,0 +1,214 @@
+"""Gerador de dados sintéticos de restaurante para benchmarks.
+
+Cria (ou completa) um banco do CAZÁ com anos de movimento plausível:
+vendas diárias com sazonalidade por dia da semana e valores log-normais,
+consumo de clientes fiados, compras e baixas de um catálogo de insumos,
+gastos fixos mensais e o saldo inicial do primeiro dia. A semente fixa
+torna o banco reproduzível entre execuções e entre commits.
+
+    python -m benchmarks.dados_sinteticos --saida /tmp/caza_bench.db \\
+        [--anos 3] [--vendas-dia 120] [--insumos 300] [--mix PIX=0.5,Cartão=0.3,Dinheiro=0.15,Transferência=0.05]
+"""
+import argparse
+import os
+import random
+import time
+from datetime import date, timedelta
+
+from banco import PoolConexoes, executar_transacao
+from dados import centavos
+from migracoes import aplicar_migracoes
+
+MIX_PAGAMENTO_PADRAO = {"PIX": 0.45, "Cartão": 0.35, "Dinheiro": 0.15, "Transferência": 0.05}
+
+# Fator de movimento por dia da semana (segunda = 0)
+FATOR_DIA_SEMANA = (0.7, 0.85, 0.9, 1.0, 1.35, 1.5, 1.2)
+
+INSUMOS_BASE = (
+    ("Farinha de trigo", "kg", 4.5), ("Açúcar", "kg", 4.2), ("Óleo de soja", "L", 7.9),
+    ("Arroz", "kg", 5.8), ("Feijão", "kg", 8.5), ("Carne bovina", "kg", 39.9),
+    ("Frango", "kg", 16.9), ("Queijo muçarela", "kg", 42.0), ("Presunto", "kg", 32.0),
+    ("Tomate", "kg", 7.5), ("Cebola", "kg", 5.2), ("Alho", "kg", 24.0),
+    ("Leite", "L", 5.3), ("Ovos", "dz", 11.0), ("Manteiga", "kg", 48.0),
+    ("Café", "kg", 45.0), ("Refrigerante", "un", 6.5), ("Batata", "kg", 5.9),
+    ("Sal", "kg", 2.5), ("Embalagem", "un", 0.8),
+)
+VARIANTES = ("", " Premium", " Tipo 1", " Orgânico", " Granel", " Congelado")
+
+CLIENTES = tuple(f"Cliente {i:02d}" for i in range(1, 41))
+
+GASTOS_FIXOS = (
+    ("Aluguel", 3500.0, 0.0), ("Energia elétrica", 850.0, 0.2), ("Água", 220.0, 0.15),
+    ("Internet", 150.0, 0.0), ("Salários", 6800.0, 0.05), ("Contador", 450.0, 0.0),
+)
+
+
+def ler_mix(texto):
+    """"PIX=0.5,Cartão=0.3" -> {"PIX": 0.5, "Cartão": 0.3}, normalizado para somar 1"""
+    mix = {}
+    for parte in texto.split(","):
+        metodo, _, peso = parte.partition("=")
+        mix[metodo.strip()] = float(peso)
+    total = sum(mix.values())
+    if total <= 0:
+        raise ValueError("O mix de pagamento precisa de pesos positivos")
+    return {metodo: peso / total for metodo, peso in mix.items()}
+
+
+def catalogo_insumos(quantidade):
+    """(nome, unidade, preço unitário) para `quantidade` insumos distintos"""
+    insumos = []
+    for indice in range(quantidade):
+        nome, unidade, preco = INSUMOS_BASE[indice % len(INSUMOS_BASE)]
+        rodada = indice // len(INSUMOS_BASE)
+        variante = VARIANTES[rodada % len(VARIANTES)]
+        sufixo = f" {rodada // len(VARIANTES) + 1}" if rodada >= len(VARIANTES) else ""
+        insumos.append((f"{nome}{variante}{sufixo}", unidade,
+                        round(preco * (1 + 0.1 * (rodada % len(VARIANTES))), 2)))
+    return insumos
+
+
+def _cadastrar_insumos(conn, insumos, data, aleatorio):
+    def gravar(cursor):
+        ids = []
+        for nome, unidade, _ in insumos:
+            cursor.execute(
+                "INSERT INTO insumos (nome, unidade_medida, estoque_minimo, estoque_atual, observacao) "
+                "VALUES (?, ?, ?, 0, '')",
+                (nome, unidade, aleatorio.choice((2, 5, 10))))
+            ids.append(cursor.lastrowid)
+        # As triggers do livro de movimentos levam o saldo a estoque_atual
+        cursor.executemany(
+            "INSERT INTO movimentos_estoque (insumo_id, data, quantidade, tipo, observacao) "
+            "VALUES (?, ?, ?, 'abertura', 'Estoque inicial')",
+            [(insumo_id, data, aleatorio.randint(10, 50)) for insumo_id in ids])
+        return ids
+
+    return executar_transacao(conn, gravar)
+
+
+def _lancamentos_do_mes(dias, insumos, ids, mix, vendas_por_dia, aleatorio):
+    metodos, pesos = list(mix), list(mix.values())
+    recebimentos, consumos, gastos_insumos, gastos_fixos = [], [], [], []
+    compras_por_dia = max(1, len(insumos) // 30)
+
+    for dia in dias:
+        data = dia.isoformat()
+        vendas = max(0, round(vendas_por_dia * FATOR_DIA_SEMANA[dia.weekday()]
+                              * aleatorio.gauss(1, 0.15)))
+        for metodo in aleatorio.choices(metodos, pesos, k=vendas):
+            recebimentos.append((data, centavos(round(aleatorio.lognormvariate(3.3, 0.6), 2)),
+                                 metodo, "recebimento", "", ""))
+        for _ in range(round(vendas * 0.03)):
+            consumos.append((data, aleatorio.choice(CLIENTES), "Consumo",
+                             centavos(round(aleatorio.lognormvariate(3.0, 0.5), 2)),
+                             "consumo", ""))
+
+        # Compras: cada insumo é reposto cerca de uma vez por mês
+        for indice in aleatorio.sample(range(len(insumos)), min(compras_por_dia, len(insumos))):
+            nome, unidade, preco = insumos[indice]
+            quantidade = aleatorio.randint(5, 25)
+            gastos_insumos.append((data, nome, centavos(quantidade * preco), "Compra semanal",
+                                   quantidade, unidade, "Compra", ids[indice]))
+        # Baixas: consumo do estoque na cozinha
+        for indice in aleatorio.sample(range(len(insumos)), min(compras_por_dia, len(insumos))):
+            nome, unidade, _ = insumos[indice]
+            gastos_insumos.append((data, nome, 0, "baixa_estoque",
+                                   -aleatorio.randint(1, 15), unidade, "Uso na cozinha",
+                                   ids[indice]))
+
+        if dia.day == 5:
+            for descricao, valor, variacao in GASTOS_FIXOS:
+                gastos_fixos.append((data, descricao,
+                                     centavos(round(valor * aleatorio.uniform(1 - variacao, 1 + variacao), 2)),
+                                     "fixo"))
+    return recebimentos, consumos, gastos_insumos, gastos_fixos
+
+
+def gerar_dados(conn, anos=2, vendas_por_dia=80, insumos=150, mix=None, semente=42,
+                fim=None, progresso=None):
+    """Popula o banco aberto em `conn` e retorna a contagem por tabela.
+
+    O período termina em `fim` (hoje, se omitido) e começa `anos` anos
+    antes. Os lançamentos são gravados mês a mês, cada mês em uma
+    transação; `progresso(mes)` é chamado a cada mês gravado.
+    """
+    aleatorio = random.Random(semente)
+    mix = mix or MIX_PAGAMENTO_PADRAO
+    fim = fim or date.today()
+    inicio = fim - timedelta(days=round(365.25 * anos) - 1)
+    catalogo = catalogo_insumos(insumos)
+
+    contagem = {"insumos": len(catalogo), "recebimentos": 0, "consumo_clientes": 0,
+                "gastos_insumos": 0, "gastos_fixos": 0}
+    ids = _cadastrar_insumos(conn, catalogo, inicio.isoformat(), aleatorio)
+    executar_transacao(conn, lambda c: c.execute(
+        "INSERT OR IGNORE INTO saldo_inicial (data, valor, observacao) VALUES (?, ?, ?)",
+        (inicio.isoformat(), centavos(2000), "Saldo de abertura")))
+
+    dia = inicio
+    while dia <= fim:
+        proximo = (dia.replace(day=28) + timedelta(days=4)).replace(day=1)
+        dias = [dia + timedelta(days=i) for i in range((min(proximo, fim + timedelta(days=1)) - dia).days)]
+        recebimentos, consumos, gastos_insumos, gastos_fixos = _lancamentos_do_mes(
+            dias, catalogo, ids, mix, vendas_por_dia, aleatorio)
+
+        def gravar(cursor):
+            cursor.executemany(
+                "INSERT INTO recebimentos (data, valor, metodo, tipo, observacao, nome_cliente) "
+                "VALUES (?, ?, ?, ?, ?, ?)", recebimentos)
+            cursor.executemany(
+                "INSERT INTO consumo_clientes (data, nome_cliente, descricao, valor, tipo, observacao) "
+                "VALUES (?, ?, ?, ?, ?, ?)", consumos)
+            cursor.executemany(
+                "INSERT INTO gastos_insumos (data, item, valor, tipo, quantidade, unidade_medida, "
+                "observacao, insumo_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", gastos_insumos)
+            cursor.executemany(
+                "INSERT INTO gastos_fixos (data, descricao, valor, tipo) VALUES (?, ?, ?, ?)",
+                gastos_fixos)
+
+        executar_transacao(conn, gravar)
+        contagem["recebimentos"] += len(recebimentos)
+        contagem["consumo_clientes"] += len(consumos)
+        contagem["gastos_insumos"] += len(gastos_insumos)
+        contagem["gastos_fixos"] += len(gastos_fixos)
+        if progresso:
+            progresso(dia.strftime("%Y-%m"))
+        dia = proximo
+
+    contagem["inicio"], contagem["fim"] = inicio.isoformat(), fim.isoformat()
+    return contagem
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--saida", required=True, help="arquivo SQLite a criar")
+    parser.add_argument("--anos", type=float, default=2)
+    parser.add_argument("--vendas-dia", type=int, default=80)
+    parser.add_argument("--insumos", type=int, default=150)
+    parser.add_argument("--mix", type=ler_mix, default=MIX_PAGAMENTO_PADRAO,
+                        help="pesos das formas de pagamento, ex.: PIX=0.5,Cartão=0.3,Dinheiro=0.2")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--fim", type=date.fromisoformat, help="último dia (padrão: hoje)")
+    args = parser.parse_args()
+
+    if os.path.exists(args.saida):
+        parser.exit(1, f"{args.saida} já existe; use um arquivo novo\n")
+
+    inicio = time.perf_counter()
+    pool = PoolConexoes(args.saida, tamanho_maximo=1)
+    try:
+        with pool.conexao() as conn:
+            aplicar_migracoes(conn)
+            contagem = gerar_dados(conn, args.anos, args.vendas_dia, args.insumos,
+                                   args.mix, args.semente, args.fim)
+    finally:
+        pool.fechar()
+    print(f"{args.saida}: {contagem['inicio']} a {contagem['fim']}, "
+          f"{contagem['recebimentos']:,} recebimentos, {contagem['gastos_insumos']:,} "
+          f"gastos com insumos, {contagem['insumos']} insumos "
+          f"({time.perf_counter() - inicio:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""Suíte de benchmarks das operações principais do CAZÁ, com saída JSON.
+
+Gera um banco sintético descartável (ver benchmarks.dados_sinteticos) ou
+usa uma cópia de um banco existente, e cronometra sem interface as
+operações que o dashboard faz: resumo do dia, relatório mensal, visão do
+estoque, exportações Excel/PDF e inclusões unitárias e em lote. Com
+`--apptest`, mede também a renderização completa de cada aba pelo
+AppTest do Streamlit. O resultado (mediana, p95 e mínimo por operação,
+com o commit e os parâmetros) vai em JSON para `--saida` ou para a saída
+padrão; `--comparar base.json` aponta as operações que ficaram mais
+lentas que a base além da tolerância e sai com código 1.
+
+    python -m benchmarks.suite [--anos 2] [--vendas-dia 80] [--insumos 150] \\
+        [--repeticoes 15] [--saida resultado.json] [--comparar base.json] [--apptest]
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from banco import PoolConexoes
+from benchmarks.dados_sinteticos import MIX_PAGAMENTO_PADRAO, gerar_dados, ler_mix
+from migracoes import aplicar_migracoes
+
+TOLERANCIA_PADRAO = 1.25
+LOTE_INSERCAO = 1_000
+
+
+def _percentil(ordenados, fracao):
+    return ordenados[max(0, math.ceil(fracao * len(ordenados)) - 1)]
+
+
+def cronometrar(funcao, repeticoes, aquecimento=1):
+    """Mediana, p95 e mínimo (ms) de `repeticoes` chamadas de `funcao()`"""
+    for _ in range(aquecimento):
+        funcao()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    return {
+        "mediana_ms": round(statistics.median(tempos), 3),
+        "p95_ms": round(_percentil(tempos, 0.95), 3),
+        "min_ms": round(tempos[0], 3),
+        "repeticoes": repeticoes,
+    }
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def operacoes_leitura(pool, conn, dia, ano, mes):
+    """Operações somente leitura, na forma {nome: função sem argumentos}.
+
+    Os serviços medidos não memorizam nada, para cronometrar o cálculo; a
+    operação `relatorio_mensal_memo` mede o mesmo relatório servido do memo.
+    """
+    from auditoria import livro_dia
+    from caza import CaixaService, RelatorioService
+    from consultas import intervalo_mes
+    from exportacao import exportar_periodo
+
+    caixa = CaixaService(pool, capacidade_memo=0)
+    relatorios = RelatorioService(pool, capacidade_memo=0)
+    relatorios_memo = RelatorioService(pool)
+    inicio_mes, fim_mes = intervalo_mes(ano, mes)
+    fim_lote = (date.fromisoformat(fim_mes) - timedelta(days=1)).isoformat()
+
+    def relatorio_mensal(servico=relatorios):
+        caixa.resumo_mes(ano, mes)
+        servico.formas_pagamento_mes(ano, mes)
+        servico.serie_mensal(ano, mes, 12)
+        servico.serie_formas_pagamento(ano, mes, 12)
+
+    def exportar_mes_csv():
+        os.remove(exportar_periodo(conn, inicio_mes, fim_mes, "csv"))
+
+    return {
+        "resumo_dia": lambda: caixa.resumo_dia(dia),
+        "saldo_abertura": lambda: caixa.abertura(dia),
+        "relatorio_mensal": relatorio_mensal,
+        "relatorio_mensal_memo": lambda: relatorio_mensal(relatorios_memo),
+        "visao_estoque": relatorios.status_estoque,
+        "excel_dia": lambda: relatorios.planilha_caixa_diario(caixa.resumo_dia(dia)),
+        "excel_mes": lambda: relatorios.planilha_relatorio_mensal(
+            ano, mes, caixa.resumo_mes(ano, mes)),
+        "pdf_dia": lambda: relatorios.pdf_resumo(caixa.resumo_dia(dia)),
+        "pdf_lote_mes": lambda: relatorios.pdf_periodo(inicio_mes, fim_lote),
+        "exportar_mes_csv": exportar_mes_csv,
+        "livro_dia_auditoria": lambda: livro_dia(conn, dia),
+    }
+
+
+def operacoes_escrita(conn, dia):
+    """Inclusões: uma por chamada (com commit) e um lote em uma transação"""
+    from dados import inserir
+    from lancamentos import adicionar_entradas
+
+    def insercao_unitaria():
+        inserir(conn.cursor(), "recebimentos", {
+            "data": dia, "valor": 12.5, "metodo": "PIX", "tipo": "recebimento"})
+
+    lote = [{"data": dia, "valor": "9,90", "metodo": "Cartão"}] * LOTE_INSERCAO
+
+    def insercao_lote():
+        adicionar_entradas(conn.cursor(), "recebimentos", lote)
+
+    return {"insercao_unitaria": insercao_unitaria,
+            f"insercao_lote_{LOTE_INSERCAO}": insercao_lote}
+
+
+def medir_apptest(caminho_banco, repeticoes):
+    """Tempo de renderização completa de cada aba pelo AppTest.
+
+    Roda em um processo novo: o caminho do banco do dashboard (CAZA_DB) é
+    lido quando o módulo `banco` é importado.
+    """
+    processo = subprocess.run(
+        [sys.executable, "-m", "benchmarks.suite", "--somente-apptest", caminho_banco,
+         "--repeticoes", str(repeticoes)],
+        capture_output=True, text=True, env={**os.environ, "CAZA_DB": caminho_banco})
+    if processo.returncode != 0:
+        raise RuntimeError(f"AppTest falhou:\n{processo.stderr}")
+    return json.loads(processo.stdout)
+
+
+def _medir_apptest_no_processo(repeticoes):
+    from streamlit.testing.v1 import AppTest
+
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    app = AppTest.from_file(os.path.join(raiz, "dashboard_caza.py"), default_timeout=120)
+    inicio = time.perf_counter()
+    app.run()
+    resultados = {"app_inicio_frio": {"mediana_ms": round((time.perf_counter() - inicio) * 1000, 3),
+                                      "repeticoes": 1}}
+    for aba in app.sidebar.radio[0].options:
+        def renderizar(aba=aba):
+            app.sidebar.radio[0].set_value(aba).run()
+            if app.exception:
+                raise RuntimeError(f"{aba}: {app.exception[0].message}")
+        resultados[f"app {aba}"] = cronometrar(renderizar, repeticoes)
+    return resultados
+
+
+def comparar(atual, base, tolerancia):
+    """Linhas (operação, base, atual, razão) e as operações que regrediram"""
+    linhas, regressoes = [], []
+    for nome, medida in atual["operacoes"].items():
+        anterior = base.get("operacoes", {}).get(nome)
+        if not anterior:
+            continue
+        razao = medida["mediana_ms"] / max(anterior["mediana_ms"], 1e-6)
+        linhas.append((nome, anterior["mediana_ms"], medida["mediana_ms"], razao))
+        if razao > tolerancia:
+            regressoes.append(nome)
+    return linhas, regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--banco", help="banco existente a copiar (em vez do sintético)")
+    parser.add_argument("--anos", type=float, default=2)
+    parser.add_argument("--vendas-dia", type=int, default=80)
+    parser.add_argument("--insumos", type=int, default=150)
+    parser.add_argument("--mix", type=ler_mix, default=MIX_PAGAMENTO_PADRAO)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--repeticoes", type=int, default=15)
+    parser.add_argument("--apptest", action="store_true",
+                        help="mede também a renderização de cada aba pelo AppTest")
+    parser.add_argument("--saida", help="arquivo JSON de resultado (padrão: saída padrão)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparação")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_PADRAO,
+                        help="razão atual/base acima da qual há regressão")
+    parser.add_argument("--somente-apptest", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.somente_apptest:
+        print(json.dumps(_medir_apptest_no_processo(args.repeticoes)))
+        return
+
+    # Um fim fixo mantém os mesmos dados (e o mesmo dia medido) entre execuções
+    fim = date(2025, 12, 31)
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "caza.db")
+        inicio = time.perf_counter()
+        # Uma conexão para a suíte e outra para os serviços
+        pool = PoolConexoes(caminho, tamanho_maximo=2)
+        try:
+            with pool.conexao() as conn:
+                if args.banco:
+                    origem = sqlite3.connect(args.banco)
+                    origem.backup(conn)
+                    origem.close()
+                    aplicar_migracoes(conn)
+                    dados = {"origem": os.path.abspath(args.banco)}
+                    for tabela in ("insumos", "recebimentos", "consumo_clientes",
+                                   "gastos_insumos", "gastos_fixos"):
+                        dados[tabela] = conn.execute(f"SELECT COUNT(*) FROM {tabela}").fetchone()[0]
+                    fim = date.fromisoformat(conn.execute(
+                        "SELECT COALESCE(MAX(data), date('now')) FROM recebimentos").fetchone()[0])
+                else:
+                    aplicar_migracoes(conn)
+                    dados = gerar_dados(conn, args.anos, args.vendas_dia, args.insumos,
+                                        args.mix, args.semente, fim)
+                geracao_s = round(time.perf_counter() - inicio, 2)
+
+                dia = (fim - timedelta(days=1)).isoformat()
+                operacoes = {}
+                for nome, funcao in operacoes_leitura(pool, conn, dia, fim.year, fim.month).items():
+                    operacoes[nome] = cronometrar(funcao, args.repeticoes)
+                for nome, funcao in operacoes_escrita(conn, fim.isoformat()).items():
+                    operacoes[nome] = cronometrar(funcao, args.repeticoes)
+        finally:
+            pool.fechar()
+
+        if args.apptest:
+            operacoes.update(medir_apptest(caminho, max(3, args.repeticoes // 3)))
+
+    resultado = {
+        "commit": _commit_atual(),
+        "quando": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "parametros": {"anos": args.anos, "vendas_dia": args.vendas_dia,
+                       "insumos": args.insumos, "mix": args.mix, "semente": args.semente,
+                       "repeticoes": args.repeticoes, "banco": args.banco},
+        "dados": dados,
+        "geracao_s": geracao_s,
+        "operacoes": operacoes,
+    }
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(texto + "\n")
+    else:
+        print(texto)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            base = json.load(arquivo)
+        linhas, regressoes = comparar(resultado, base, args.tolerancia)
+        print(f"\n{'operação':<28} {'base (ms)':>10} {'atual (ms)':>10} {'razão':>7}",
+              file=sys.stderr)
+        for nome, anterior, atual, razao in linhas:
+            marca = "  <-- regressão" if nome in regressoes else ""
+            print(f"{nome:<28} {anterior:>10.2f} {atual:>10.2f} {razao:>7.2f}{marca}",
+                  file=sys.stderr)
+        if regressoes:
+            parser.exit(1, f"{len(regressoes)} operação(ões) mais lenta(s) que a base "
+                           f"(tolerância {args.tolerancia:.2f}x)\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Tempo de montagem do Relatório Mensal em função do tamanho do histórico.
+
+Gera bancos temporários com N lançamentos espalhados por 36 meses e mede
+as consultas que a aba "📅 Relatório Mensal" faz para um mês e para a
+tendência de 24 meses. Com os rollups mensais, o tempo deve ficar estável
+de 1 mil a 1 milhão de lançamentos; a coluna "ledger" mostra, para
+comparação, a mesma série calculada direto sobre os lançamentos.
+
+    python -m benchmarks.tendencia_mensal [--tamanhos 1000 10000 100000 1000000]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+from banco import PoolConexoes
+from migracoes import aplicar_migracoes
+from agregados import (SQL_FORMAS_PAGAMENTO_MES, obter_resumo_mes,
+                       serie_formas_pagamento, serie_mensal)
+
+METODOS = ["Dinheiro", "PIX", "Cartão", "Transferência"]
+ANO_FINAL, MES_FINAL = 2025, 12
+INICIO = date(2023, 1, 1)
+DIAS = (date(2025, 12, 31) - INICIO).days + 1
+
+
+def popular(conn, total, lote=50_000):
+    """Insere `total` lançamentos aleatórios (70% recebimentos)"""
+    aleatorio = random.Random(42)
+    restantes = total
+    while restantes > 0:
+        n = min(lote, restantes)
+        recebimentos, insumos, fixos = [], [], []
+        for _ in range(n):
+            data = (INICIO + timedelta(days=aleatorio.randrange(DIAS))).isoformat()
+            valor = round(aleatorio.uniform(5, 300) * 100)  # centavos
+            sorteio = aleatorio.random()
+            if sorteio < 0.7:
+                recebimentos.append((data, valor, aleatorio.choice(METODOS)))
+            elif sorteio < 0.9:
+                insumos.append((data, "Farinha", valor))
+            else:
+                fixos.append((data, "Luz", valor))
+        conn.executemany(
+            "INSERT INTO recebimentos (data, valor, metodo, tipo) VALUES (?, ?, ?, 'recebimento')",
+            recebimentos)
+        conn.executemany(
+            "INSERT INTO gastos_insumos (data, item, valor) VALUES (?, ?, ?)", insumos)
+        conn.executemany(
+            "INSERT INTO gastos_fixos (data, descricao, valor) VALUES (?, ?, ?)", fixos)
+        conn.commit()
+        restantes -= n
+
+
+def renderizar_com_rollup(conn):
+    mes = f"{ANO_FINAL}-{MES_FINAL:02d}"
+    obter_resumo_mes(conn.cursor(), mes)
+    pd.read_sql_query(SQL_FORMAS_PAGAMENTO_MES, conn, params=(mes,))
+    serie_mensal(conn, ANO_FINAL, MES_FINAL, 24)
+    serie_formas_pagamento(conn, ANO_FINAL, MES_FINAL, 24)
+
+
+def renderizar_do_ledger(conn):
+    for tabela in ("recebimentos", "gastos_insumos", "gastos_fixos"):
+        pd.read_sql_query(
+            f"SELECT substr(data, 1, 7) AS mes, SUM(valor) AS total FROM {tabela} "
+            "WHERE data >= ? AND data < ? GROUP BY mes",
+            conn, params=("2023-01-01", "2026-01-01"))
+    pd.read_sql_query(
+        "SELECT substr(data, 1, 7) AS mes, metodo, SUM(valor) AS total FROM recebimentos "
+        "WHERE data >= ? AND data < ? GROUP BY mes, metodo",
+        conn, params=("2024-01-01", "2026-01-01"))
+
+
+def cronometrar(funcao, conn, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(conn)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tamanhos", type=int, nargs="+",
+                        default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'lançamentos':>12} {'rollup (ms)':>12} {'ledger (ms)':>12}")
+    with tempfile.TemporaryDirectory() as pasta:
+        for tamanho in args.tamanhos:
+            pool = PoolConexoes(os.path.join(pasta, f"bench_{tamanho}.db"),
+                                tamanho_maximo=1)
+            with pool.conexao() as conn:
+                aplicar_migracoes(conn)
+                popular(conn, tamanho)
+                rollup = cronometrar(renderizar_com_rollup, conn, args.repeticoes)
+                ledger = cronometrar(renderizar_do_ledger, conn, args.repeticoes)
+            pool.fechar()
+            print(f"{tamanho:>12,} {rollup:>12.2f} {ledger:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import bisect
+import unicodedata
+from collections import namedtuple
+
+# =============================================
+# CATÁLOGO DE INSUMOS
+# =============================================
+#
+# Os seletores de insumo consultavam um DataFrame com uma máscara booleana
+# por opção (O(n²) por renderização). O catálogo carrega os insumos uma vez
+# e os indexa por id e por nome, para consultas O(1), e mantém os nomes
+# normalizados ordenados para a busca por prefixo (typeahead) com bisect.
+# O dashboard reaproveita o mesmo catálogo em todas as abas enquanto a
+# versão da tabela `insumos` não muda.
+
+SQL_CATALOGO = '''
+    SELECT id, nome, unidade_medida, estoque_minimo, estoque_atual
+    FROM insumos ORDER BY nome
+'''
+
+# Até este tamanho os seletores listam o catálogo inteiro sem busca
+LIMITE_OPCOES = 200
+
+Insumo = namedtuple(
+    "Insumo", "id nome unidade_medida estoque_minimo estoque_atual")
+
+
+def normalizar_nome(nome):
+    """Nome em minúsculas e sem acentos, para busca"""
+    decomposto = unicodedata.normalize("NFKD", nome or "")
+    return "".join(c for c in decomposto if not unicodedata.combining(c)).lower().strip()
+
+
+class CatalogoInsumos:
+    """Insumos indexados por id e por nome, com busca por prefixo"""
+
+    def __init__(self, linhas):
+        self.por_id = {}
+        self.por_nome = {}
+        for id_, nome, unidade, minimo, atual in linhas:
+            insumo = Insumo(id_, nome, unidade or "", minimo or 0.0, atual or 0.0)
+            self.por_id[id_] = insumo
+            self.por_nome[nome] = insumo
+        self._nomes = sorted(
+            (normalizar_nome(insumo.nome), insumo.id) for insumo in self.por_id.values())
+
+    @classmethod
+    def carregar(cls, conn):
+        return cls(conn.execute(SQL_CATALOGO).fetchall())
+
+    def __len__(self):
+        return len(self.por_id)
+
+    def __bool__(self):
+        return bool(self.por_id)
+
+    def ids(self):
+        """Ids de todos os insumos, em ordem de nome"""
+        return [id_ for _, id_ in self._nomes]
+
+    def rotulo(self, insumo_id):
+        """"Nome (unidade)", para exibir nos seletores"""
+        insumo = self.por_id[insumo_id]
+        return f"{insumo.nome} ({insumo.unidade_medida})"
+
+    def buscar(self, termo, limite=50):
+        """Ids dos insumos cujo nome começa com `termo` e, depois, dos que o contêm.
+
+        A comparação ignora maiúsculas e acentos. Os de prefixo saem por
+        busca binária; a busca por trecho só percorre a lista quando os de
+        prefixo não preenchem o limite.
+        """
+        termo = normalizar_nome(termo)
+        if not termo:
+            return self.ids()[:limite]
+
+        inicio = bisect.bisect_left(self._nomes, (termo,))
+        encontrados = []
+        for nome, id_ in self._nomes[inicio:]:
+            if not nome.startswith(termo) or len(encontrados) >= limite:
+                break
+            encontrados.append(id_)
+
+        if len(encontrados) < limite:
+            vistos = set(encontrados)
+            for nome, id_ in self._nomes:
+                if termo in nome and id_ not in vistos:
+                    encontrados.append(id_)
+                    if len(encontrados) >= limite:
+                        break
+        return encontrados
+
+    def opcoes(self, termo=""):
+        """Ids a oferecer no seletor: todos em catálogos pequenos, senão a busca"""
+        if len(self) <= LIMITE_OPCOES and not termo:
+            return self.ids()
+        return self.buscar(termo)
+
+
+# Grade paginada de "Insumos Cadastrados": a página sai do banco com
+# LIMIT/OFFSET sobre o índice UNIQUE de nome, filtrada por trecho do nome
+SQL_PAGINA_INSUMOS = '''
+    SELECT id, nome, unidade_medida, estoque_minimo, estoque_atual, observacao, versao
+    FROM insumos WHERE nome LIKE ? ESCAPE '\\'
+    ORDER BY nome LIMIT ? OFFSET ?
+'''
+SQL_TOTAL_INSUMOS = "SELECT COUNT(*) AS total FROM insumos WHERE nome LIKE ? ESCAPE '\\'"
+
+
+def padrao_busca(termo):
+    """Padrão LIKE que casa nomes contendo `termo` (curingas escapados)"""
+    termo = (termo or "").strip()
+    for especial in ("\\", "%", "_"):
+        termo = termo.replace(especial, "\\" + especial)
+    return f"%{termo}%"
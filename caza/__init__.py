@@ -0,0 +1,12 @@
+"""Camada de serviços do CAZÁ.
+
+Os cálculos do caixa e dos relatórios, fora do script do Streamlit: podem
+ser importados, medidos e reaproveitados por qualquer chamador (dashboard,
+benchmarks, linha de comando). Os serviços recebem o pool de conexões e
+memorizam os resultados caros pelas versões das tabelas.
+"""
+from caza.caixa import CaixaService, ResumoCaixa, SaldoAbertura
+from caza.relatorios import RelatorioService, gerar_excel_resumo, gerar_pdf_resumo
+
+__all__ = ["CaixaService", "ResumoCaixa", "SaldoAbertura", "RelatorioService",
+           "gerar_excel_resumo", "gerar_pdf_resumo"]
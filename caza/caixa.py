@@ -0,0 +1,208 @@
+from collections import namedtuple
+
+from agregados import deslocar_mes, obter_resumo_dia, obter_resumo_mes
+from banco import executar_escrita
+from consultas import SQL_SALDO_ACUMULADO_ANTES, SQL_SALDO_INFORMADO_ATE
+from dados import ConflitoVersao, centavos, reais
+from instrumentacao import instrumentar
+
+from caza.servico import Servico
+
+# =============================================
+# CAIXA: SALDO E RESUMOS
+# =============================================
+
+# Saldo informado: UPSERT pela data (o id e a versão da linha são
+# mantidos, ao contrário de INSERT OR REPLACE, que apaga e reinsere). Com
+# a versão lida (0 quando ainda não havia saldo no dia), só grava se
+# nenhum outro terminal gravou o saldo do dia depois da leitura.
+SQL_SALVAR_SALDO = '''
+    INSERT INTO saldo_inicial (data, valor, observacao) VALUES (?, ?, ?)
+    ON CONFLICT (data) DO UPDATE SET
+        valor = excluded.valor,
+        observacao = excluded.observacao,
+        versao = versao + 1,
+        atualizado_em = datetime('now', 'localtime')
+    WHERE ?4 IS NULL OR saldo_inicial.versao = ?4
+'''
+SQL_REMOVER_SALDO = "DELETE FROM saldo_inicial WHERE data = ? AND (?2 IS NULL OR versao = ?2)"
+
+
+class ResumoCaixa(namedtuple("ResumoCaixa", (
+        "periodo", "saldo_inicial", "recebimentos", "consumo",
+        "gastos_insumos", "gastos_fixos", "ajuste_saldo"), defaults=(0,))):
+    """Totais de um dia ou de um mês, em reais, e os valores derivados.
+
+    `ajuste_saldo` só aparece em períodos de vários dias: a diferença que
+    os saldos informados no meio do período fizeram no fechamento, de modo
+    que o saldo final é a abertura do dia seguinte ao período.
+    """
+    __slots__ = ()
+
+    @property
+    def entrada(self):
+        return self.recebimentos + self.consumo
+
+    @property
+    def gastos(self):
+        return self.gastos_insumos + self.gastos_fixos
+
+    @property
+    def saldo_final(self):
+        return round(self.saldo_inicial + self.ajuste_saldo + self.entrada - self.gastos, 2)
+
+    def totais(self):
+        """Dicionário usado pelas exportações e pelas métricas da tela"""
+        return {
+            "recebimentos": self.recebimentos,
+            "consumo": self.consumo,
+            "entrada": self.entrada,
+            "gastos_insumos": self.gastos_insumos,
+            "gastos_fixos": self.gastos_fixos,
+            "gastos": self.gastos,
+            "ajuste_saldo": self.ajuste_saldo,
+            "saldo_final": self.saldo_final,
+        }
+
+
+class SaldoAbertura(namedtuple("SaldoAbertura", ("dia", "valor", "informado_em", "versao"))):
+    """Saldo de abertura de um dia, em reais.
+
+    `informado_em` é a data do último saldo informado manualmente até o
+    dia (None se nunca houve um); quando é o próprio dia, o valor é o
+    informado, e nos demais casos foi carregado dos fechamentos anteriores.
+    `versao` é a versão de linha do saldo informado no próprio dia (0 se
+    não há), para gravar uma correção sem sobrescrever a de outro terminal.
+    """
+    __slots__ = ()
+
+    @property
+    def manual(self):
+        return self.informado_em == self.dia
+
+
+def _acumulado_antes(conn, dia):
+    linha = conn.execute(SQL_SALDO_ACUMULADO_ANTES, (dia,)).fetchone()
+    return linha[0] if linha else 0
+
+
+def saldo_abertura(conn, dia):
+    """Saldo de abertura do dia: o fechamento do dia anterior.
+
+    Parte do último saldo informado até o dia (ou de zero) e soma o
+    líquido dos dias seguintes até a véspera, pela diferença de dois
+    acumulados de `saldo_acumulado`. São três buscas por índice,
+    qualquer que seja a distância até o saldo informado.
+    """
+    informado = conn.execute(SQL_SALDO_INFORMADO_ATE, (dia,)).fetchone()
+    if informado is None:
+        return SaldoAbertura(dia, reais(_acumulado_antes(conn, dia)), None, 0)
+    data, valor, versao = informado
+    if data == dia:
+        return SaldoAbertura(dia, reais(valor or 0), data, versao)
+    liquido = _acumulado_antes(conn, dia) - _acumulado_antes(conn, data)
+    return SaldoAbertura(dia, reais((valor or 0) + liquido), data, 0)
+
+
+def _primeiro_dia(ano, mes):
+    return f"{ano:04d}-{mes:02d}-01"
+
+
+class CaixaService(Servico):
+    """Saldo inicial e resumos do caixa, por dia e por mês"""
+
+    @instrumentar("obter_saldo_inicial")
+    def abertura(self, dia):
+        """SaldoAbertura do dia (ver `saldo_abertura`)"""
+        with self._conexao() as conn:
+            return saldo_abertura(conn, dia)
+
+    def saldo_inicial(self, dia):
+        """Valor do saldo de abertura do dia (ver `abertura`)"""
+        return self.abertura(dia).valor
+
+    def salvar_saldo_inicial(self, dia, valor, observacao="", versao=None):
+        """Informa manualmente o saldo de abertura do dia.
+
+        Os dias seguintes passam a carregar o saldo a partir deste. Com
+        `versao` (a de `abertura(dia)`), levanta ConflitoVersao se outro
+        terminal gravou o saldo do dia depois da leitura.
+        """
+        with self._conexao() as conn:
+            cursor = conn.cursor()
+            executar_escrita(cursor, SQL_SALVAR_SALDO,
+                             (dia, centavos(valor), observacao, versao))
+            if not cursor.rowcount:
+                raise ConflitoVersao(
+                    "O saldo inicial do dia foi alterado por outro terminal; "
+                    "recarregue e tente de novo")
+
+    def remover_saldo_inicial(self, dia, versao=None):
+        """Volta o dia ao saldo carregado do dia anterior"""
+        with self._conexao() as conn:
+            cursor = conn.cursor()
+            executar_escrita(cursor, SQL_REMOVER_SALDO, (dia, versao))
+            if versao is not None and not cursor.rowcount:
+                raise ConflitoVersao(
+                    "O saldo inicial do dia foi alterado ou removido por outro terminal")
+
+    def resumo_dia(self, dia):
+        """ResumoCaixa do dia, a partir da linha do resumo diário agregado"""
+        with self._conexao() as conn:
+            resumo = obter_resumo_dia(conn.cursor(), dia)
+        return ResumoCaixa(
+            dia, self.saldo_inicial(dia), resumo["total_recebimentos"],
+            resumo["total_consumo"], resumo["total_gastos_insumos"],
+            resumo["total_gastos_fixos"])
+
+    def resumo_mes(self, ano, mes):
+        """ResumoCaixa do mês, a partir do rollup mensal.
+
+        Usa a mesma conta do saldo de abertura: o saldo inicial é a
+        abertura do dia 1, as entradas incluem o consumo de clientes e o
+        saldo final é a abertura do dia 1 do mês seguinte, com os saldos
+        informados durante o mês em `ajuste_saldo`.
+        """
+        with self._conexao() as conn:
+            resumo = obter_resumo_mes(conn.cursor(), f"{ano:04d}-{mes:02d}")
+        inicial = self.saldo_inicial(_primeiro_dia(ano, mes))
+        final = self.saldo_inicial(_primeiro_dia(*deslocar_mes(ano, mes, 1)))
+        liquido = (centavos(resumo["total_recebimentos"]) + centavos(resumo["total_consumo"])
+                   - centavos(resumo["total_gastos_insumos"])
+                   - centavos(resumo["total_gastos_fixos"]))
+        return ResumoCaixa(
+            f"{mes:02d}/{ano}", inicial, resumo["total_recebimentos"],
+            resumo["total_consumo"], resumo["total_gastos_insumos"],
+            resumo["total_gastos_fixos"],
+            reais(centavos(final) - centavos(inicial) - liquido))
+
+    def verificar_fechamentos(self):
+        """Meses cujo fechamento não encadeia com a abertura do seguinte.
+
+        Confere que o saldo final de cada mês é o saldo inicial do mês
+        seguinte e que, sem saldo informado depois do dia 1, o mês não tem
+        ajuste (o rollup mensal bate com o acumulado usado na abertura).
+        Lista de (mês, coluna, valor, esperado), no formato de
+        `agregados.verificar_resumo_diario`; vazia quando tudo confere.
+        """
+        with self._conexao() as conn:
+            primeiro, ultimo = conn.execute(
+                "SELECT MIN(mes), MAX(mes) FROM resumo_mensal").fetchone()
+            informados = {data[:7] for (data,) in conn.execute(
+                "SELECT data FROM saldo_inicial WHERE substr(data, 9) != '01'")}
+        if primeiro is None:
+            return []
+        divergencias = []
+        ano, mes = map(int, primeiro.split("-"))
+        resumo = self.resumo_mes(ano, mes)
+        while f"{ano:04d}-{mes:02d}" <= ultimo:
+            chave = f"{ano:04d}-{mes:02d}"
+            ano, mes = deslocar_mes(ano, mes, 1)
+            seguinte = self.resumo_mes(ano, mes)
+            if centavos(resumo.saldo_final) != centavos(seguinte.saldo_inicial):
+                divergencias.append((chave, "saldo_final", resumo.saldo_final,
+                                     seguinte.saldo_inicial))
+            if chave not in informados and centavos(resumo.ajuste_saldo):
+                divergencias.append((chave, "ajuste_saldo", resumo.ajuste_saldo, 0))
+            resumo = seguinte
+        return divergencias
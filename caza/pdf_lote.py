@@ -0,0 +1,407 @@
+import argparse
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+
+from agregados import SQL_RESUMO_PERIODO
+from banco import CAMINHO_BANCO, PoolConexoes
+from consultas import SQL_SALDOS_INFORMADOS_PERIODO
+from dados import centavos, reais
+from fpdf import FPDF
+from instrumentacao import instrumentar
+from migracoes import aplicar_migracoes
+from registros import Consumo, GastoFixo, GastoInsumo, Recebimento, ler_registros
+
+from caza.caixa import ResumoCaixa, saldo_abertura
+
+# =============================================
+# PDF EM LOTE: FECHAMENTOS DE UM PERÍODO
+# =============================================
+#
+# Um único PDF para um intervalo de datas: para cada mês, uma capa com os
+# totais e o fechamento de cada dia, seguida de uma página por dia com o
+# resumo do caixa e os lançamentos detalhados. Os dados do período inteiro
+# são lidos de uma vez (resumo diário, saldos informados e os lançamentos
+# de cada tabela) e o saldo de abertura é carregado de um dia para o
+# outro, como em `caza.caixa.saldo_abertura`. O layout (seções, colunas,
+# estilos) é definido uma vez nas constantes abaixo e aplicado por um só
+# documento `ModeloPdf`, que troca fonte e cor apenas quando o estilo muda.
+
+ALTURA_LINHA = 6
+
+# nome -> (estilo da fonte, tamanho, cor do texto)
+ESTILOS = {
+    "titulo": ("B", 16, (0, 0, 0)),
+    "secao": ("B", 12, (0, 0, 0)),
+    "texto": ("", 10, (0, 0, 0)),
+    "negativo": ("", 10, (255, 0, 0)),
+    "cabecalho": ("B", 9, (255, 255, 255)),
+    "celula": ("", 9, (0, 0, 0)),
+    "celula_negativa": ("", 9, (255, 0, 0)),
+    "vazio": ("I", 9, (110, 110, 110)),
+}
+
+COR_CABECALHO = (60, 60, 60)
+
+# Linhas do resumo, com os nomes usados em gerar_pdf_resumo
+LINHAS_RESUMO = (
+    ("Saldo Inicial", "saldo_inicial"),
+    ("Total Recebimentos", "recebimentos"),
+    ("Total Consumo Clientes", "consumo"),
+    ("Total Entrada", "entrada"),
+    ("Total Gastos Insumos", "gastos_insumos"),
+    ("Total Gastos Fixos", "gastos_fixos"),
+    ("Total Gastos", "gastos"),
+    ("Ajuste de Saldo Informado", "ajuste_saldo"),
+    ("Saldo Final", "saldo_final"),
+)
+
+
+def _quantidade(registro):
+    if registro.quantidade is None:
+        return ""
+    return f"{registro.quantidade:g} {registro.unidade_medida or ''}".strip()
+
+
+# (título, classe do registro, colunas); cada coluna é
+# (rótulo, atributo ou função do registro, largura em mm, alinhamento)
+SECOES_DIA = (
+    ("Recebimentos", Recebimento, (
+        ("Forma de pagamento", "metodo", 45, "L"),
+        ("Cliente", "nome_cliente", 50, "L"),
+        ("Observação", "observacao", 65, "L"),
+        ("Valor", "valor", 30, "R"))),
+    ("Consumo de clientes", Consumo, (
+        ("Cliente", "nome_cliente", 50, "L"),
+        ("Descrição", "descricao", 110, "L"),
+        ("Valor", "valor", 30, "R"))),
+    ("Gastos com insumos", GastoInsumo, (
+        ("Item", "item", 70, "L"),
+        ("Quantidade", _quantidade, 30, "R"),
+        ("Observação", "observacao", 60, "L"),
+        ("Valor", "valor", 30, "R"))),
+    ("Gastos fixos", GastoFixo, (
+        ("Descrição", "descricao", 110, "L"),
+        ("Tipo", "tipo", 50, "L"),
+        ("Valor", "valor", 30, "R"))),
+)
+
+COLUNAS_CAPA = (
+    ("Dia", "periodo", 40, "L"),
+    ("Saldo inicial", "saldo_inicial", 37, "R"),
+    ("Entradas", "entrada", 37, "R"),
+    ("Gastos", "gastos", 37, "R"),
+    ("Saldo final", "saldo_final", 39, "R"),
+)
+
+DiaLote = namedtuple("DiaLote", ("resumo", "registros"))
+
+
+class ResultadoLotePdf(namedtuple("ResultadoLotePdf", ("conteudo", "paginas", "dias", "segundos"))):
+    """Bytes do PDF gerado e a vazão da geração"""
+    __slots__ = ()
+
+    @property
+    def paginas_por_segundo(self):
+        return self.paginas / self.segundos if self.segundos else 0.0
+
+
+def _data_br(iso):
+    return date.fromisoformat(iso).strftime("%d/%m/%Y")
+
+
+def _texto(valor):
+    """Texto da célula no latin-1 das fontes padrão do PDF"""
+    if valor is None:
+        return ""
+    return str(valor).encode("latin-1", "replace").decode("latin-1")
+
+
+def _moeda(valor):
+    return f"R$ {valor:.2f}"
+
+
+def carregar_periodo(conn, inicio, fim, incluir_dias_vazios=False):
+    """Dias de [inicio, fim] (datas ISO, inclusive) que entram no lote.
+
+    Um dia entra quando tem lançamentos ou saldo informado (ou sempre, com
+    `incluir_dias_vazios`). O saldo de abertura do primeiro dia vem de
+    `saldo_abertura`; os seguintes recebem o fechamento do dia anterior,
+    salvo quando há saldo informado para eles.
+    """
+    fim_exclusivo = (date.fromisoformat(fim) + timedelta(days=1)).isoformat()
+    cursor = conn.cursor()
+    resumos = {linha[0]: linha[1:] for linha in
+               cursor.execute(SQL_RESUMO_PERIODO, (inicio, fim_exclusivo))}
+    informados = dict(cursor.execute(SQL_SALDOS_INFORMADOS_PERIODO,
+                                     (inicio, fim_exclusivo)).fetchall())
+    registros = {}
+    for _, classe, _ in SECOES_DIA:
+        for registro in ler_registros(cursor, classe, "periodo", (inicio, fim_exclusivo)):
+            registros.setdefault(registro.data.isoformat(), {}).setdefault(
+                classe, []).append(registro)
+
+    saldo = centavos(saldo_abertura(conn, inicio).valor)
+    dias = []
+    dia, ultimo = date.fromisoformat(inicio), date.fromisoformat(fim)
+    while dia <= ultimo:
+        chave = dia.isoformat()
+        if chave in informados:
+            saldo = informados[chave] or 0
+        resumo = resumos.get(chave)
+        receb, qtd_receb, consumo, qtd_consumo, insumos, qtd_insumos, fixos, qtd_fixos = (
+            resumo or (0,) * 8)
+        movimento = qtd_receb or qtd_consumo or qtd_insumos or qtd_fixos
+        if movimento or chave in informados or incluir_dias_vazios:
+            dias.append(DiaLote(
+                ResumoCaixa(chave, reais(saldo), reais(receb), reais(consumo),
+                            reais(insumos), reais(fixos)),
+                registros.get(chave, {})))
+        saldo += receb + consumo - insumos - fixos
+        dia += timedelta(days=1)
+    return dias
+
+
+def agrupar_por_mes(dias):
+    """[(AAAA-MM, ResumoCaixa do mês, dias do mês)] na ordem das datas"""
+    meses = {}
+    for dia in dias:
+        meses.setdefault(dia.resumo.periodo[:7], []).append(dia)
+    grupos = []
+    for mes, dias_mes in meses.items():
+        ano, numero = mes.split("-")
+        resumo = ResumoCaixa(
+            f"{numero}/{ano}", dias_mes[0].resumo.saldo_inicial,
+            sum(d.resumo.recebimentos for d in dias_mes),
+            sum(d.resumo.consumo for d in dias_mes),
+            sum(d.resumo.gastos_insumos for d in dias_mes),
+            sum(d.resumo.gastos_fixos for d in dias_mes))
+        # Saldos informados no meio do mês: o fechamento do mês é o do último dia
+        ajuste = centavos(dias_mes[-1].resumo.saldo_final) - centavos(resumo.saldo_final)
+        grupos.append((mes, resumo._replace(ajuste_saldo=reais(ajuste)), dias_mes))
+    return grupos
+
+
+class _Saida:
+    """Buffer de saída do FPDF em partes.
+
+    A fpdf 1.7 grava o documento com `self.buffer += ...`, copiando tudo o
+    que já foi gerado a cada objeto: quadrático no número de páginas. Aqui
+    as partes são acumuladas em lista, e `len` (usado nos offsets do xref)
+    vem de um contador.
+    """
+    __slots__ = ("partes", "tamanho")
+
+    def __init__(self, texto=""):
+        self.partes = [texto] if texto else []
+        self.tamanho = len(texto)
+
+    def __iadd__(self, texto):
+        self.partes.append(texto)
+        self.tamanho += len(texto)
+        return self
+
+    def __len__(self):
+        return self.tamanho
+
+
+class ModeloPdf(FPDF):
+    """Documento A4 com cabeçalho, rodapé numerado e estilos nomeados"""
+
+    @property
+    def buffer(self):
+        return self._saida
+
+    @buffer.setter
+    def buffer(self, valor):
+        self._saida = valor if isinstance(valor, _Saida) else _Saida(valor)
+
+    def __init__(self, titulo):
+        super().__init__("P", "mm", "A4")
+        self.titulo = _texto(titulo)
+        self._estilo = None
+        self.set_margins(10, 10, 10)
+        self.set_auto_page_break(True, 15)
+        self.alias_nb_pages()
+        self.set_fill_color(*COR_CABECALHO)
+
+    def conteudo(self):
+        """Fecha o documento e devolve os bytes do PDF"""
+        self.close()
+        return "".join(self._saida.partes).encode("latin1")
+
+    def estilo(self, nome):
+        if nome != self._estilo:
+            negrito, tamanho, cor = ESTILOS[nome]
+            self.set_font("Arial", negrito, tamanho)
+            self.set_text_color(*cor)
+            self._estilo = nome
+
+    # add_page restaura fonte e cores depois do cabeçalho e do rodapé,
+    # então eles não passam por `estilo`
+    def header(self):
+        self.set_font("Arial", "", 8)
+        self.set_text_color(110, 110, 110)
+        self.cell(0, 5, self.titulo, 0, 1, "R")
+        self.ln(2)
+
+    def footer(self):
+        self.set_y(-12)
+        self.set_font("Arial", "", 8)
+        self.set_text_color(110, 110, 110)
+        self.cell(0, 8, f"Página {self.page_no()}/{{nb}}", 0, 0, "C")
+
+    def cabe(self, altura):
+        return self.get_y() + altura <= self.page_break_trigger
+
+    def tabela(self, colunas, linhas):
+        """Tabela com o cabeçalho repetido a cada quebra de página"""
+        self._cabecalho_tabela(colunas)
+        for linha in linhas:
+            if not self.cabe(ALTURA_LINHA):
+                self.add_page()
+                self._cabecalho_tabela(colunas)
+            for (_, atributo, largura, alinhamento), valor in zip(colunas, linha):
+                if isinstance(valor, float):
+                    self.estilo("celula_negativa" if valor < 0 else "celula")
+                    texto = _moeda(valor)
+                else:
+                    self.estilo("celula")
+                    texto = self._caber(_texto(valor), largura)
+                self.cell(largura, ALTURA_LINHA, texto, "B", 0, alinhamento)
+            self.ln()
+
+    def _cabecalho_tabela(self, colunas):
+        self.estilo("cabecalho")
+        for rotulo, _, largura, alinhamento in colunas:
+            self.cell(largura, ALTURA_LINHA, _texto(rotulo), 0, 0, alinhamento, True)
+        self.ln()
+
+    def _caber(self, texto, largura):
+        limite = largura - 2
+        if self.get_string_width(texto) <= limite:
+            return texto
+        while texto and self.get_string_width(texto + "...") > limite:
+            texto = texto[:-1]
+        return texto + "..."
+
+    def resumo(self, resumo):
+        for descricao, atributo in LINHAS_RESUMO:
+            valor = getattr(resumo, atributo)
+            if atributo == "ajuste_saldo" and not valor:
+                continue
+            self.estilo("negativo" if valor < 0 else "texto")
+            self.cell(130, 8, descricao, 0, 0)
+            self.cell(60, 8, _moeda(valor), 0, 1, "R")
+
+
+def _pagina_capa(pdf, resumo, dias):
+    pdf.add_page()
+    pdf.estilo("titulo")
+    pdf.cell(0, 10, _texto(f"Fechamento Mensal CAZÁ - {resumo.periodo}"), 0, 1, "C")
+    pdf.estilo("texto")
+    pdf.cell(0, 8, f"{len(dias)} dia(s), de {_data_br(dias[0].resumo.periodo)} "
+                   f"a {_data_br(dias[-1].resumo.periodo)}", 0, 1, "C")
+    pdf.ln(4)
+    pdf.resumo(resumo)
+    pdf.ln(6)
+    pdf.estilo("secao")
+    pdf.cell(0, 8, "Fechamento por dia", 0, 1)
+    pdf.tabela(COLUNAS_CAPA, (
+        [_data_br(d.resumo.periodo)] + [getattr(d.resumo, atributo)
+                                        for _, atributo, _, _ in COLUNAS_CAPA[1:]]
+        for d in dias))
+
+
+def _pagina_dia(pdf, dia):
+    resumo = dia.resumo
+    pdf.add_page()
+    pdf.estilo("titulo")
+    pdf.cell(0, 10, _texto("Resumo Diário CAZÁ"), 0, 1, "C")
+    pdf.estilo("texto")
+    pdf.cell(0, 8, f"Data: {_data_br(resumo.periodo)}", 0, 1)
+    pdf.ln(2)
+    pdf.resumo(resumo)
+
+    for titulo, classe, colunas in SECOES_DIA:
+        registros = dia.registros.get(classe, ())
+        if not pdf.cabe(8 + 2 * ALTURA_LINHA):
+            pdf.add_page()
+        pdf.ln(3)
+        pdf.estilo("secao")
+        pdf.cell(0, 8, _texto(f"{titulo} ({len(registros)})"), 0, 1)
+        if not registros:
+            pdf.estilo("vazio")
+            pdf.cell(0, ALTURA_LINHA, "Nenhum lançamento", 0, 1)
+            continue
+        pdf.tabela(colunas, (
+            [atributo(r) if callable(atributo) else getattr(r, atributo)
+             for _, atributo, _, _ in colunas]
+            for r in registros))
+
+
+def _medida_lote(resultado):
+    return resultado.paginas, len(resultado.conteudo)
+
+
+@instrumentar("gerar_pdf_periodo", _medida_lote)
+def gerar_pdf_periodo(conn, inicio, fim, progresso=None, incluir_dias_vazios=False):
+    """PDF dos fechamentos de [inicio, fim] (datas ISO) em uma passada.
+
+    `progresso(feitos, total)` é chamado a cada capa ou dia renderizado.
+    Retorna um ResultadoLotePdf com os bytes, as páginas e o tempo gasto.
+    """
+    relogio = time.perf_counter()
+    dias = carregar_periodo(conn, inicio, fim, incluir_dias_vazios)
+    meses = agrupar_por_mes(dias)
+    total = len(dias) + len(meses)
+
+    pdf = ModeloPdf(f"CAZÁ - Fechamentos de {_data_br(inicio)} a {_data_br(fim)}")
+    feitos = 0
+    for _, resumo, dias_mes in meses:
+        _pagina_capa(pdf, resumo, dias_mes)
+        for dia in [None] + dias_mes:
+            if dia is not None:
+                _pagina_dia(pdf, dia)
+            feitos += 1
+            if progresso:
+                progresso(feitos, total)
+    if not dias:
+        pdf.add_page()
+        pdf.estilo("texto")
+        pdf.cell(0, 10, _texto("Nenhum lançamento no período."), 0, 1, "C")
+
+    conteudo = pdf.conteudo()
+    return ResultadoLotePdf(conteudo, pdf.page_no(), len(dias), time.perf_counter() - relogio)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Gera o PDF dos fechamentos diários de um período")
+    parser.add_argument("--banco", default=CAMINHO_BANCO,
+                        help="caminho do arquivo SQLite")
+    parser.add_argument("--inicio", required=True, help="primeiro dia (AAAA-MM-DD)")
+    parser.add_argument("--fim", required=True, help="último dia (AAAA-MM-DD)")
+    parser.add_argument("--saida", help="arquivo PDF (padrão: fechamentos_INICIO_FIM.pdf)")
+    parser.add_argument("--vazios", action="store_true",
+                        help="inclui também os dias sem movimento")
+    args = parser.parse_args()
+
+    pool = PoolConexoes(args.banco, tamanho_maximo=1)
+    try:
+        with pool.conexao() as conn:
+            aplicar_migracoes(conn)
+            resultado = gerar_pdf_periodo(conn, args.inicio, args.fim,
+                                          incluir_dias_vazios=args.vazios)
+    finally:
+        pool.fechar()
+
+    saida = args.saida or f"fechamentos_{args.inicio}_{args.fim}.pdf"
+    with open(saida, "wb") as arquivo:
+        arquivo.write(resultado.conteudo)
+    print(f"{saida}: {resultado.paginas} páginas, {resultado.dias} dias em "
+          f"{resultado.segundos:.2f} s ({resultado.paginas_por_segundo:.1f} páginas/s)")
+
+
+if __name__ == "__main__":
+    main()
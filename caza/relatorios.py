@@ -0,0 +1,229 @@
+import io
+
+import pandas as pd
+
+from agregados import SQL_FORMAS_PAGAMENTO_MES, serie_formas_pagamento, serie_mensal
+from consultas import intervalo_mes
+from estoque import SQL_VISAO_ESTOQUE
+from instrumentacao import instrumentar, ler_sql, medida_buffer
+from registros import Consumo, GastoFixo, GastoInsumo, Recebimento, dataframe_registros, ler_registros
+
+from caza.servico import TABELAS_LANCAMENTOS, Servico
+
+# =============================================
+# RELATÓRIOS E EXPORTAÇÕES
+# =============================================
+
+# Lançamentos do dia listados no Caixa Diário: (rótulo, classe, descrição)
+LANCAMENTOS_DIA = (
+    ("💵 Recebimento", Recebimento,
+     lambda r: " · ".join(filter(None, (r.metodo, r.nome_cliente, r.observacao)))),
+    ("👥 Consumo", Consumo,
+     lambda r: " · ".join(filter(None, (r.nome_cliente, r.descricao)))),
+    ("🛒 Insumo", GastoInsumo,
+     lambda r: (f"{r.item} · {r.quantidade:g} {r.unidade_medida or ''}".rstrip()
+                if r.quantidade else r.item)),
+    ("🏢 Gasto fixo", GastoFixo, lambda r: r.descricao),
+)
+
+
+@instrumentar("gerar_pdf_resumo", medida_buffer)
+def gerar_pdf_resumo(data, saldo_inicial, totais, tipo='diario'):
+    """Gera um PDF com o resumo financeiro"""
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", "B", 16)
+
+    titulo = "Resumo Diário CAZÁ" if tipo == 'diario' else f"Resumo Mensal CAZÁ - {data}"
+    pdf.cell(0, 10, titulo, ln=True, align="C")
+    pdf.ln(10)
+
+    pdf.set_font("Arial", size=12)
+    pdf.cell(0, 10, f"Data: {data}", ln=True)
+    pdf.ln(5)
+
+    pdf.set_fill_color(255, 255, 255)
+
+    linhas = [
+        ("Saldo Inicial", saldo_inicial),
+        ("Total Recebimentos", totais['recebimentos']),
+        ("Total Consumo Clientes", totais['consumo']),
+        ("Total Entrada", totais['entrada']),
+        ("Total Gastos Insumos", totais['gastos_insumos']),
+        ("Total Gastos Fixos", totais['gastos_fixos']),
+        ("Total Gastos", totais['gastos']),
+        ("Ajuste de Saldo Informado", totais['ajuste_saldo']),
+        ("Saldo Final", totais['saldo_final'])
+    ]
+    if not totais['ajuste_saldo']:
+        linhas.pop(-2)
+
+    for desc, val in linhas:
+        if val < 0:
+            pdf.set_text_color(255, 0, 0)
+        else:
+            pdf.set_text_color(0, 0, 0)
+
+        pdf.cell(130, 10, desc, 0, 0)
+        pdf.cell(40, 10, f"R$ {val:.2f}", 0, 1, 'R')
+        pdf.set_text_color(0, 0, 0)
+
+    buffer = io.BytesIO()
+    pdf_output = pdf.output(dest='S').encode('latin1')
+    buffer.write(pdf_output)
+    buffer.seek(0)
+    return buffer
+
+
+@instrumentar("gerar_excel_resumo", medida_buffer)
+def gerar_excel_resumo(dados, nome_arquivo):
+    """Gera um arquivo Excel com os dados consolidados"""
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
+        for sheet_name, df in dados.items():
+            if not df.empty:
+                df.to_excel(writer, index=False, sheet_name=sheet_name[:31])
+
+                workbook = writer.book
+                worksheet = writer.sheets[sheet_name[:31]]
+                format_negativo = workbook.add_format(
+                    {'num_format': '[Red]R$ #,##0.00'})
+
+                for col_num, col_name in enumerate(df.columns):
+                    if pd.api.types.is_numeric_dtype(df[col_name]):
+                        worksheet.set_column(
+                            col_num, col_num, None, format_negativo)
+    buffer.seek(0)
+    return buffer
+
+
+def _aba_resumo(descricoes, valores):
+    return pd.DataFrame({"Descrição": descricoes, "Valor (R$)": valores})
+
+
+class RelatorioService(Servico):
+    """Detalhamentos, séries e arquivos exportados, memorizados por versão"""
+
+    def formas_pagamento_mes(self, ano, mes):
+        """Total recebido no mês por forma de pagamento"""
+        chave_mes = f"{ano:04d}-{mes:02d}"
+        return self._memorizar(
+            ("formas_pagamento_mes", chave_mes), ("recebimentos",),
+            lambda conn: ler_sql(SQL_FORMAS_PAGAMENTO_MES, conn, (chave_mes,),
+                                 "read_sql_query formas_pagamento_mes"))
+
+    def serie_mensal(self, ano, mes, meses=12):
+        """Ver agregados.serie_mensal"""
+        return self._memorizar(
+            ("serie_mensal", ano, mes, meses), TABELAS_LANCAMENTOS,
+            lambda conn: serie_mensal(conn, ano, mes, meses))
+
+    def serie_formas_pagamento(self, ano, mes, meses=12):
+        """Ver agregados.serie_formas_pagamento"""
+        return self._memorizar(
+            ("serie_formas_pagamento", ano, mes, meses), ("recebimentos",),
+            lambda conn: serie_formas_pagamento(conn, ano, mes, meses))
+
+    def lancamentos_dia(self, dia):
+        """Lançamentos do dia em uma tabela (Lançamento, Descrição, Valor)"""
+        def calcular(conn):
+            cursor = conn.cursor()
+            linhas = [(rotulo, descrever(registro), registro.valor)
+                      for rotulo, classe, descrever in LANCAMENTOS_DIA
+                      for registro in ler_registros(cursor, classe, "dia", (dia,))]
+            return pd.DataFrame(linhas, columns=["Lançamento", "Descrição", "Valor (R$)"])
+
+        return self._memorizar(("lancamentos_dia", dia), TABELAS_LANCAMENTOS, calcular)
+
+    def status_estoque(self):
+        """Estoque atual de cada insumo, com a indicação de reposição"""
+        return self._memorizar(
+            ("status_estoque",), ("insumos",),
+            lambda conn: ler_sql(SQL_VISAO_ESTOQUE, conn, (), "read_sql_query visao_estoque"))
+
+    def pdf_resumo(self, resumo, tipo="diario"):
+        """Bytes do PDF de um ResumoCaixa"""
+        return self._memorizar(
+            ("pdf_resumo", resumo, tipo), (),
+            lambda conn: gerar_pdf_resumo(resumo.periodo, resumo.saldo_inicial,
+                                          resumo.totais(), tipo).getvalue())
+
+    def planilha_caixa_diario(self, resumo):
+        """Planilha completa do caixa do dia de um ResumoCaixa"""
+        dia = resumo.periodo
+
+        def gerar(conn):
+            cursor = conn.cursor()
+            dados_excel = {
+                "Resumo Diário": _aba_resumo(
+                    ["Saldo Inicial", "Total Recebimentos", "Total Consumo",
+                     "Total Entradas", "Gastos com Insumos", "Gastos Fixos",
+                     "Total Gastos", "Saldo Final"],
+                    [resumo.saldo_inicial, resumo.recebimentos, resumo.consumo,
+                     resumo.entrada, resumo.gastos_insumos, resumo.gastos_fixos,
+                     resumo.gastos, resumo.saldo_final]),
+                "Recebimentos": dataframe_registros(
+                    Recebimento, ler_registros(cursor, Recebimento, "dia", (dia,))),
+                "Consumos": dataframe_registros(
+                    Consumo, ler_registros(cursor, Consumo, "dia", (dia,))),
+                "Gastos Insumos": dataframe_registros(
+                    GastoInsumo, ler_registros(cursor, GastoInsumo, "dia", (dia,))),
+                "Gastos Fixos": dataframe_registros(
+                    GastoFixo, ler_registros(cursor, GastoFixo, "dia", (dia,))),
+            }
+            return gerar_excel_resumo(dados_excel, f"resumo_caixa_{dia}.xlsx").getvalue()
+
+        return self._memorizar(("planilha_caixa_diario", resumo), TABELAS_LANCAMENTOS, gerar)
+
+    def planilha_relatorio_mensal(self, ano, mes, resumo):
+        """Planilha completa do mês de um ResumoCaixa mensal"""
+        inicio, fim = intervalo_mes(ano, mes)
+
+        def gerar(conn):
+            cursor = conn.cursor()
+            dados_excel = {
+                "Resumo Mensal": _aba_resumo(
+                    ["Saldo Inicial", "Total Recebido", "Total Consumo", "Total Entradas",
+                     "Gastos com Insumos", "Gastos Fixos", "Total Gastos",
+                     "Ajuste de Saldo Informado", "Saldo Final"],
+                    [resumo.saldo_inicial, resumo.recebimentos, resumo.consumo,
+                     resumo.entrada, resumo.gastos_insumos, resumo.gastos_fixos,
+                     resumo.gastos, resumo.ajuste_saldo, resumo.saldo_final]),
+                "Recebimentos": dataframe_registros(
+                    Recebimento, ler_registros(cursor, Recebimento, "periodo", (inicio, fim))),
+                "Consumos": dataframe_registros(
+                    Consumo, ler_registros(cursor, Consumo, "periodo", (inicio, fim))),
+                "Gastos Insumos": dataframe_registros(
+                    GastoInsumo, ler_registros(cursor, GastoInsumo, "periodo", (inicio, fim))),
+                "Gastos Fixos": dataframe_registros(
+                    GastoFixo, ler_registros(cursor, GastoFixo, "periodo", (inicio, fim))),
+            }
+            formas = ler_sql(SQL_FORMAS_PAGAMENTO_MES, conn, (f"{ano:04d}-{mes:02d}",),
+                             "read_sql_query formas_pagamento_mes")
+            if not formas.empty:
+                dados_excel["Formas Pagamento"] = formas
+            return gerar_excel_resumo(dados_excel, f"resumo_mensal_{mes:02d}_{ano}.xlsx").getvalue()
+
+        return self._memorizar(
+            ("planilha_relatorio_mensal", ano, mes, resumo),
+            TABELAS_LANCAMENTOS + ("saldo_inicial",), gerar)
+
+    def pdf_periodo(self, inicio, fim, progresso=None, incluir_dias_vazios=False):
+        """ResultadoLotePdf com os fechamentos de [inicio, fim] (ver caza.pdf_lote)"""
+        from caza.pdf_lote import gerar_pdf_periodo
+
+        return self._memorizar(
+            ("pdf_periodo", inicio, fim, incluir_dias_vazios),
+            TABELAS_LANCAMENTOS + ("saldo_inicial",),
+            lambda conn: gerar_pdf_periodo(conn, inicio, fim, progresso, incluir_dias_vazios))
+
+    def planilha_estoque(self):
+        """Planilha do estoque atual"""
+        return self._memorizar(
+            ("planilha_estoque",), ("insumos",),
+            lambda conn: gerar_excel_resumo(
+                {"Estoque": ler_sql(SQL_VISAO_ESTOQUE, conn, (),
+                                    "read_sql_query visao_estoque")},
+                "estoque_atual.xlsx").getvalue())
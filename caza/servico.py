@@ -0,0 +1,109 @@
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import pandas as pd
+
+from instrumentacao import ler_sql
+from versoes import versoes_tabelas
+
+# =============================================
+# BASE DOS SERVIÇOS
+# =============================================
+
+# Tabelas de lançamentos; os resumos agregados derivam delas
+TABELAS_LANCAMENTOS = ("recebimentos", "consumo_clientes", "gastos_insumos", "gastos_fixos")
+
+CAPACIDADE_MEMO = 64
+
+# Tabelas mantidas por triggers -> tabelas de lançamentos de que derivam
+TABELAS_DERIVADAS = {
+    "resumo_diario": TABELAS_LANCAMENTOS,
+    "resumo_mensal": TABELAS_LANCAMENTOS,
+    "resumo_mensal_metodo": ("recebimentos",),
+}
+
+_TABELAS_SQL = re.compile(r"\b(?:FROM|JOIN)\s+([A-Za-z_]\w*)", re.IGNORECASE)
+
+
+def tabelas_consulta(sql):
+    """Tabelas versionadas lidas por uma consulta, deduzidas do FROM/JOIN"""
+    tabelas = set()
+    for tabela in _TABELAS_SQL.findall(sql):
+        tabelas.update(TABELAS_DERIVADAS.get(tabela.lower(), (tabela.lower(),)))
+    return tuple(sorted(tabelas))
+
+
+class Servico:
+    """Base dos serviços: conexões emprestadas do pool e memo por versão.
+
+    Uma instância pode ser compartilhada por todas as sessões do
+    dashboard: cada chamada empresta uma conexão do pool (dentro de um
+    `conexao_reentrante`, a do bloco, como na renderização), e os resultados
+    memorizados são chaveados pelos argumentos e pelas versões das tabelas
+    de que dependem (`versoes_tabelas`), de modo que qualquer escrita, de
+    qualquer sessão ou processo, os invalida. `capacidade_memo=0` desliga o
+    memo (usado pelos benchmarks para medir o cálculo em si).
+    """
+
+    def __init__(self, pool, capacidade_memo=CAPACIDADE_MEMO):
+        self.pool = pool
+        self.capacidade_memo = capacidade_memo
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    @contextmanager
+    def _conexao(self):
+        with self.pool.conexao() as conn:
+            yield conn
+
+    def _memorizar(self, chave, tabelas, calcular):
+        """Resultado de `calcular(conn)`, reaproveitado enquanto as `tabelas`
+        não mudarem. DataFrames são devolvidos como cópia."""
+        with self._conexao() as conn:
+            if not self.capacidade_memo:
+                return calcular(conn)
+            versao = versoes_tabelas(conn.cursor(), tabelas)
+            with self._lock:
+                item = self._memo.get(chave)
+                if item is not None and item[0] == versao:
+                    self._memo.move_to_end(chave)
+                    self.acertos += 1
+                    return _copia(item[1])
+                self.falhas += 1
+
+            resultado = calcular(conn)
+            with self._lock:
+                self._memo[chave] = (versao, resultado)
+                self._memo.move_to_end(chave)
+                while len(self._memo) > self.capacidade_memo:
+                    self._memo.popitem(last=False)
+            return _copia(resultado)
+
+    def consulta(self, sql, params=(), tabelas=None):
+        """`pd.read_sql_query(sql, conn, params)` memorizado como os relatórios.
+
+        `tabelas` lista as tabelas de que o resultado depende; se omitido,
+        é deduzido do SQL (ver `tabelas_consulta`).
+        """
+        params = tuple(params)
+        tabelas = tuple(tabelas) if tabelas is not None else tabelas_consulta(sql)
+        return self._memorizar(
+            ("consulta", sql, params), tabelas,
+            lambda conn: ler_sql(sql, conn, params, f"read_sql_query {', '.join(tabelas)}"))
+
+    def estatisticas(self):
+        with self._lock:
+            return {"itens": len(self._memo), "capacidade": self.capacidade_memo,
+                    "acertos": self.acertos, "falhas": self.falhas}
+
+    def limpar(self):
+        with self._lock:
+            self._memo.clear()
+
+
+def _copia(resultado):
+    return resultado.copy() if isinstance(resultado, (pd.DataFrame, pd.Series)) else resultado
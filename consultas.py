@@ -0,0 +1,118 @@
+import argparse
+from datetime import date
+
+from banco import CAMINHO_BANCO, PoolConexoes
+from migracoes import aplicar_migracoes
+from dados import sql_selecionar
+from agregados import (SQL_RESUMO_DIA, SQL_RESUMO_PERIODO, SQL_RESUMO_MES, SQL_RESUMO_MESES,
+                       SQL_FORMAS_PAGAMENTO_MES, SQL_FORMAS_PAGAMENTO_MESES)
+
+# =============================================
+# CONSULTAS DOS RELATÓRIOS
+# =============================================
+#
+# Os filtros de data usam comparações diretas sobre a coluna `data`
+# (igualdade para o dia, intervalo semiaberto [inicio, fim) para o mês),
+# para que o SQLite percorra os índices criados na migração 002 em vez de
+# varrer a tabela inteira. As instruções vêm de `dados`, com as colunas
+# do relatório em vez de `SELECT *`.
+
+SQL_RECEBIMENTOS_DIA = sql_selecionar("recebimentos")
+SQL_CONSUMO_DIA = sql_selecionar("consumo_clientes")
+SQL_GASTOS_INSUMOS_DIA = sql_selecionar("gastos_insumos")
+SQL_GASTOS_FIXOS_DIA = sql_selecionar("gastos_fixos")
+
+SQL_RECEBIMENTOS_PERIODO = sql_selecionar("recebimentos", filtro="periodo")
+SQL_GASTOS_INSUMOS_PERIODO = sql_selecionar("gastos_insumos", filtro="periodo")
+SQL_GASTOS_FIXOS_PERIODO = sql_selecionar("gastos_fixos", filtro="periodo")
+
+SQL_SALDO_INICIAL = "SELECT valor FROM saldo_inicial WHERE data = ?"
+
+# Saldo de abertura (ver caza.caixa): o último saldo informado até o dia e
+# o acumulado do líquido até a véspera (migração 009), por busca no índice
+SQL_SALDO_INFORMADO_ATE = '''
+    SELECT data, valor, versao FROM saldo_inicial
+    WHERE data <= ? ORDER BY data DESC LIMIT 1
+'''
+SQL_SALDO_ACUMULADO_ANTES = '''
+    SELECT acumulado FROM saldo_acumulado
+    WHERE data < ? ORDER BY data DESC LIMIT 1
+'''
+SQL_SALDOS_INFORMADOS_PERIODO = "SELECT data, valor FROM saldo_inicial WHERE data >= ? AND data < ?"
+
+# Consultas verificadas por `verificar_planos`, com parâmetros de exemplo
+CONSULTAS_RELATORIO = {
+    "recebimentos_dia": (SQL_RECEBIMENTOS_DIA, ("2025-07-01",)),
+    "consumo_dia": (SQL_CONSUMO_DIA, ("2025-07-01",)),
+    "gastos_insumos_dia": (SQL_GASTOS_INSUMOS_DIA, ("2025-07-01",)),
+    "gastos_fixos_dia": (SQL_GASTOS_FIXOS_DIA, ("2025-07-01",)),
+    "recebimentos_mes": (SQL_RECEBIMENTOS_PERIODO, ("2025-07-01", "2025-08-01")),
+    "gastos_insumos_mes": (SQL_GASTOS_INSUMOS_PERIODO, ("2025-07-01", "2025-08-01")),
+    "gastos_fixos_mes": (SQL_GASTOS_FIXOS_PERIODO, ("2025-07-01", "2025-08-01")),
+    "saldo_inicial": (SQL_SALDO_INICIAL, ("2025-07-01",)),
+    "saldo_informado_ate": (SQL_SALDO_INFORMADO_ATE, ("2025-07-01",)),
+    "saldo_acumulado_antes": (SQL_SALDO_ACUMULADO_ANTES, ("2025-07-01",)),
+    "saldos_informados_periodo": (SQL_SALDOS_INFORMADOS_PERIODO, ("2025-07-01", "2025-08-01")),
+    "resumo_dia": (SQL_RESUMO_DIA, ("2025-07-01",)),
+    "resumo_periodo": (SQL_RESUMO_PERIODO, ("2025-07-01", "2025-08-01")),
+    "resumo_mes": (SQL_RESUMO_MES, ("2025-07",)),
+    "resumo_meses": (SQL_RESUMO_MESES, ("2024-08", "2025-07")),
+    "formas_pagamento_mes": (SQL_FORMAS_PAGAMENTO_MES, ("2025-07",)),
+    "formas_pagamento_meses": (SQL_FORMAS_PAGAMENTO_MESES, ("2024-08", "2025-07")),
+}
+
+
+def intervalo_mes(ano, mes):
+    """Retorna o intervalo semiaberto [inicio, fim) do mês em ISO"""
+    inicio = date(ano, mes, 1)
+    fim = date(ano + 1, 1, 1) if mes == 12 else date(ano, mes + 1, 1)
+    return inicio.isoformat(), fim.isoformat()
+
+
+def plano_consulta(conn, sql, parametros=()):
+    """Linhas de detalhe do EXPLAIN QUERY PLAN da consulta"""
+    return [linha[3] for linha in
+            conn.execute(f"EXPLAIN QUERY PLAN {sql}", parametros)]
+
+
+def verificar_planos(conn):
+    """Confere se cada consulta de relatório usa índice.
+
+    Retorna uma lista de (nome, detalhes_do_plano, usa_indice); um plano é
+    aceito quando nenhuma etapa faz SCAN (varredura completa) de tabela ou
+    índice.
+    """
+    resultado = []
+    for nome, (sql, parametros) in CONSULTAS_RELATORIO.items():
+        detalhes = plano_consulta(conn, sql, parametros)
+        usa_indice = not any(d.startswith("SCAN") for d in detalhes)
+        resultado.append((nome, detalhes, usa_indice))
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Mostra o plano de execução das consultas de relatório")
+    parser.add_argument("--banco", default=CAMINHO_BANCO,
+                        help="caminho do arquivo SQLite")
+    args = parser.parse_args()
+
+    pool = PoolConexoes(args.banco, tamanho_maximo=1)
+    try:
+        with pool.conexao() as conn:
+            aplicar_migracoes(conn)
+            planos = verificar_planos(conn)
+    finally:
+        pool.fechar()
+
+    for nome, detalhes, usa_indice in planos:
+        print(f"{'OK ' if usa_indice else 'SCAN'} {nome}")
+        for detalhe in detalhes:
+            print(f"       {detalhe}")
+
+    if not all(usa_indice for _, _, usa_indice in planos):
+        parser.exit(1, "Há consultas de relatório sem índice\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
 import sqlite3
 import streamlit as st
 
+from banco import obter_pool
+from migracoes import (VERSAO_ESQUEMA, aplicar_migracoes, migracoes_pendentes,
+                       versao_atual)
+
 
 def main():
     st.title("🛠️ Ferramenta de Correção do Banco de Dados")
@@ -8,37 +12,24 @@ def main():
     st.warning(
         "Use esta ferramenta apenas se estiver tendo problemas com a estrutura do banco de dados")
 
-    if st.button("Executar Verificação/Correção"):
-        try:
-            conn = sqlite3.connect('data/caza.db')
-            cursor = conn.cursor()
-
-            # Verificar e adicionar colunas faltantes
-            alteracoes = [
-                ("gastos_insumos", "quantidade", "REAL"),
-                ("gastos_insumos", "tipo", "TEXT"),
-                ("gastos_insumos", "unidade_medida", "TEXT"),
-                ("estoque", "sabor", "TEXT")
-            ]
-
-            for tabela, coluna, tipo in alteracoes:
-                try:
-                    cursor.execute(
-                        f"ALTER TABLE {tabela} ADD COLUMN {coluna} {tipo}")
-                    st.success(
-                        f"Coluna '{coluna}' adicionada à tabela {tabela}")
-                except sqlite3.OperationalError as e:
-                    st.warning(
-                        f"Coluna '{coluna}' já existe ou erro: {str(e)}")
-
-            conn.commit()
-            st.success("✅ Banco de dados verificado e corrigido com sucesso!")
-
-        except Exception as e:
-            st.error(f"❌ Erro durante a correção: {str(e)}")
-        finally:
-            if conn:
-                conn.close()
+    pool = obter_pool()
+    with pool.conexao() as conn:
+        st.caption(
+            f"Banco: {pool.caminho} | Versão do esquema: {versao_atual(conn)} "
+            f"(mais recente: {VERSAO_ESQUEMA})")
+
+        pendentes = migracoes_pendentes(conn)
+        for numero, descricao in pendentes:
+            st.write(f"Pendente {numero:03d}: {descricao}")
+
+        if st.button("Executar Verificação/Correção"):
+            try:
+                aplicadas = aplicar_migracoes(conn)
+                for numero in aplicadas:
+                    st.success(f"Migração {numero:03d} aplicada")
+                st.success("✅ Banco de dados verificado e corrigido com sucesso!")
+            except sqlite3.Error as e:
+                st.error(f"❌ Erro durante a correção: {str(e)}")
 
 
 if __name__ == "__main__":
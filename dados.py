@@ -0,0 +1,204 @@
+from collections import namedtuple
+from functools import lru_cache
+
+from banco import executar_escrita
+
+# =============================================
+# ACESSO A DADOS (INSTRUÇÕES FIXAS POR TABELA)
+# =============================================
+#
+# Nomes de tabela e de coluna nunca vêm de quem chama direto para o SQL:
+# são conferidos contra COLUNAS, e cada combinação (tabela, colunas,
+# filtro) gera sempre o mesmo texto de instrução, com os valores em
+# parâmetros `?`. Assim o cache de instruções do sqlite3 reaproveita o
+# plano compilado entre execuções, em vez de analisar de novo um SQL novo
+# a cada data ou valor. As leituras trazem apenas as colunas pedidas, como
+# namedtuples, no lugar de `SELECT *`. Valores monetários são gravados
+# em centavos inteiros (migração 008) e convertidos aqui, na borda: quem
+# chama continua passando e recebendo reais.
+#
+# Lançamentos, insumos e saldos têm versão de linha (migração 011): toda
+# edição feita por aqui incrementa `versao`, e quem leu o registro pode
+# passar a versão lida para `atualizar`/`excluir`. Se outro terminal
+# gravou a linha nesse meio tempo, nada é gravado e sobe ConflitoVersao,
+# em vez de a última edição sobrescrever a anterior sem aviso.
+
+# Colunas conhecidas de cada tabela (a primeira é sempre o id)
+COLUNAS = {
+    "saldo_inicial": ("id", "data", "valor", "observacao", "versao", "atualizado_em"),
+    "recebimentos": ("id", "data", "valor", "metodo", "tipo", "observacao",
+                     "nome_cliente", "hash_conteudo", "versao", "atualizado_em"),
+    "consumo_clientes": ("id", "data", "nome_cliente", "descricao", "valor",
+                         "tipo", "observacao", "versao", "atualizado_em"),
+    "gastos_insumos": ("id", "data", "item", "valor", "tipo", "quantidade",
+                       "unidade_medida", "observacao", "insumo_id", "versao",
+                       "atualizado_em"),
+    "gastos_fixos": ("id", "data", "descricao", "valor", "tipo", "versao",
+                     "atualizado_em"),
+    "insumos": ("id", "nome", "unidade_medida", "estoque_minimo",
+                "estoque_atual", "observacao", "versao", "atualizado_em"),
+    "estoque": ("id", "produto", "quantidade", "unidade", "sabor",
+                "data_atualizacao"),
+}
+
+# Colunas de controle, mantidas pelo banco e por este módulo
+COLUNAS_CONTROLE = ("hash_conteudo", "insumo_id", "versao", "atualizado_em")
+
+# Colunas exibidas nos relatórios, sem as de controle interno
+COLUNAS_RELATORIO = {
+    tabela: tuple(c for c in colunas if c not in COLUNAS_CONTROLE)
+    for tabela, colunas in COLUNAS.items()
+}
+
+# Tabelas com versão de linha (migração 011)
+TABELAS_VERSIONADAS = {tabela for tabela, colunas in COLUNAS.items() if "versao" in colunas}
+
+# Tabelas cuja coluna `valor` é guardada em centavos
+TABELAS_MONETARIAS = {"saldo_inicial", "recebimentos", "consumo_clientes",
+                      "gastos_insumos", "gastos_fixos"}
+
+# Filtros aceitos nas leituras
+FILTROS = {
+    "id": "id = ?",
+    "dia": "data = ?",
+    "periodo": "data >= ? AND data < ?",
+}
+
+
+class ConflitoVersao(ValueError):
+    """O registro foi alterado ou excluído por outro terminal depois de lido"""
+
+
+def centavos(valor):
+    """Reais (float, Decimal, int ou texto numérico) -> centavos inteiros"""
+    if valor is None:
+        return None
+    return round(float(valor) * 100)
+
+
+def reais(valor_centavos):
+    """Centavos inteiros -> reais (float), para exibição"""
+    if valor_centavos is None:
+        return None
+    return valor_centavos / 100
+
+
+def _em_centavos(tabela, dados):
+    if tabela in TABELAS_MONETARIAS and "valor" in dados:
+        dados = {**dados, "valor": centavos(dados["valor"])}
+    return dados
+
+
+def _validar(tabela, colunas):
+    if tabela not in COLUNAS:
+        raise ValueError(f"Tabela desconhecida: {tabela}")
+    desconhecidas = [c for c in colunas if c not in COLUNAS[tabela]]
+    if desconhecidas:
+        raise ValueError(
+            f"Colunas desconhecidas em {tabela}: {', '.join(desconhecidas)}")
+
+
+@lru_cache(maxsize=None)
+def sql_inserir(tabela, colunas):
+    _validar(tabela, colunas)
+    return (f"INSERT INTO {tabela} ({', '.join(colunas)}) "
+            f"VALUES ({', '.join('?' * len(colunas))})")
+
+
+@lru_cache(maxsize=None)
+def sql_atualizar(tabela, colunas, conferir_versao=False):
+    _validar(tabela, colunas)
+    if set(colunas) & {"id", "versao", "atualizado_em"}:
+        raise ValueError(f"Colunas de controle não podem ser editadas em {tabela}")
+    atribuicoes = [f"{c} = ?" for c in colunas]
+    if tabela in TABELAS_VERSIONADAS:
+        atribuicoes.append("versao = versao + 1, atualizado_em = datetime('now', 'localtime')")
+    sql = f"UPDATE {tabela} SET {', '.join(atribuicoes)} WHERE id = ?"
+    return sql + " AND versao = ?" if conferir_versao else sql
+
+
+@lru_cache(maxsize=None)
+def sql_excluir(tabela, conferir_versao=False):
+    _validar(tabela, ())
+    sql = f"DELETE FROM {tabela} WHERE id = ?"
+    return sql + " AND versao = ?" if conferir_versao else sql
+
+
+@lru_cache(maxsize=None)
+def sql_selecionar(tabela, colunas=None, filtro="dia"):
+    """SELECT das colunas pedidas (todas as do relatório, se omitidas)"""
+    colunas = COLUNAS_RELATORIO[tabela] if colunas is None else colunas
+    _validar(tabela, colunas)
+    if filtro not in FILTROS:
+        raise ValueError(f"Filtro desconhecido: {filtro}")
+    return f"SELECT {', '.join(colunas)} FROM {tabela} WHERE {FILTROS[filtro]}"
+
+
+@lru_cache(maxsize=None)
+def tipo_linha(tabela, colunas):
+    """namedtuple para as linhas de `tabela` com essas colunas"""
+    _validar(tabela, colunas)
+    nome = "".join(parte.capitalize() for parte in tabela.split("_"))
+    return namedtuple(f"Linha{nome}", colunas)
+
+
+def inserir(cursor, tabela, dados):
+    """Insere um registro (valor em reais) e retorna o id gerado"""
+    dados = _em_centavos(tabela, dados)
+    executar_escrita(cursor, sql_inserir(tabela, tuple(dados)), tuple(dados.values()))
+    return cursor.lastrowid
+
+
+def _parametros_versao(tabela, id_, versao):
+    if versao is None:
+        return (id_,)
+    if tabela not in TABELAS_VERSIONADAS:
+        raise ValueError(f"A tabela {tabela} não tem versão de linha")
+    return (id_, versao)
+
+
+def _conferir_versao(cursor, tabela, id_, versao):
+    """Levanta ConflitoVersao se a escrita condicionada não atingiu a linha"""
+    if versao is None or cursor.rowcount:
+        return
+    cursor.execute(sql_selecionar(tabela, ("versao",), "id"), (id_,))
+    atual = cursor.fetchone()
+    if atual is None:
+        raise ConflitoVersao(f"O registro {id_} de {tabela} foi excluído por outro terminal")
+    raise ConflitoVersao(
+        f"O registro {id_} de {tabela} foi alterado por outro terminal "
+        f"(versão {atual[0]}, lida {versao}); recarregue e tente de novo")
+
+
+def atualizar(cursor, tabela, id_, campos, versao=None):
+    """Atualiza as colunas de `campos` do registro `id_` (valor em reais).
+
+    Com `versao` (a lida junto com o registro), só grava se a linha ainda
+    estiver nessa versão, e retorna a nova; senão levanta ConflitoVersao.
+    """
+    campos = _em_centavos(tabela, campos)
+    executar_escrita(cursor, sql_atualizar(tabela, tuple(campos), versao is not None),
+                     (*campos.values(), *_parametros_versao(tabela, id_, versao)))
+    _conferir_versao(cursor, tabela, id_, versao)
+    return None if versao is None else versao + 1
+
+
+def excluir(cursor, tabela, id_, versao=None):
+    """Remove o registro `id_`; com `versao`, só se ela ainda for a atual"""
+    executar_escrita(cursor, sql_excluir(tabela, versao is not None),
+                     _parametros_versao(tabela, id_, versao))
+    _conferir_versao(cursor, tabela, id_, versao)
+
+
+def selecionar(cursor, tabela, filtro, parametros, colunas=None):
+    """Linhas tipadas (namedtuple) de `tabela` que atendem ao filtro.
+
+    O valor volta em reais.
+    """
+    colunas = COLUNAS_RELATORIO[tabela] if colunas is None else tuple(colunas)
+    linha = tipo_linha(tabela, colunas)
+    cursor.execute(sql_selecionar(tabela, colunas, filtro), parametros)
+    linhas = [linha._make(registro) for registro in cursor.fetchall()]
+    if tabela in TABELAS_MONETARIAS and "valor" in colunas:
+        linhas = [l._replace(valor=reais(l.valor)) for l in linhas]
+    return linhas
@@ -1,264 +1,720 @@
-import streamlit as st
-import pandas as pd
-import sqlite3
-from datetime import datetime, date
-from calendar import monthrange
-from fpdf import FPDF
-import io
-import os
-from PIL import Image
-import atexit
+import perfil
+perfil.iniciar_execucao()
+
+# fpdf, xlsxwriter e PIL são importados só quando uma exportação ou a logo
+# precisam deles, e não a cada execução do script
+with perfil.etapa("imports"):
+    import streamlit as st
+    import pandas as pd
+    from datetime import datetime, date
+    from calendar import monthrange
+    import io
+    import os
+    from banco import obter_pool
+    from dados import ConflitoVersao, inserir
+    from migracoes import aplicar_migracoes
+    from versoes import versoes_tabelas
+    from lancamentos import (METODOS_PAGAMENTO, ErroValidacao, adicionar_entradas,
+                             colunas_lancamento, ler_csv_lancamentos)
+    from tarefas import FilaTarefas
+    from catalogo import (CatalogoInsumos, LIMITE_OPCOES, SQL_PAGINA_INSUMOS,
+                          SQL_TOTAL_INSUMOS, padrao_busca)
+    from estoque import (cadastrar_insumo, registrar_baixa, salvar_insumos,
+                         movimentos_insumo)
+    from instrumentacao import INSTRUMENTACAO, instrumentar, medida_dataframe
+    from caza import CaixaService, RelatorioService
+    from caza.servico import TABELAS_LANCAMENTOS
+    from notificacoes import INTERVALO_S, Notificador
 
 # =============================================
 # CONFIGURAÇÃO DO BANCO DE DADOS
 # =============================================
 
 
+@st.cache_resource
 def configurar_banco_dados():
-    """Configura a conexão com o banco de dados"""
-    if not os.path.exists('data'):
-        os.makedirs('data')
-
-    conn = sqlite3.connect('data/caza.db', check_same_thread=False)
-    cursor = conn.cursor()
-    return conn, cursor
-
-
-def verificar_estrutura_bd(cursor):
-    """Verifica e corrige a estrutura do banco de dados"""
-    alteracoes = [
-        ("insumos", "estoque_atual", "REAL"),
-        ("gastos_insumos", "quantidade", "REAL"),
-        ("gastos_insumos", "tipo", "TEXT"),
-        ("gastos_insumos", "unidade_medida", "TEXT"),
-        ("estoque", "sabor", "TEXT")
-    ]
-
-    for tabela, coluna, tipo in alteracoes:
-        try:
-            cursor.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {tipo}")
-            print(f"Coluna '{coluna}' adicionada à tabela {tabela}")
-        except sqlite3.OperationalError:
-            pass  # Coluna já existe
-
-
-def criar_tabelas(cursor):
-    """Cria todas as tabelas necessárias se não existirem"""
-    tabelas = {
-        'saldo_inicial': '''
-            CREATE TABLE IF NOT EXISTS saldo_inicial (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                data TEXT UNIQUE,
-                valor REAL,
-                observacao TEXT
-            )
-        ''',
-        'recebimentos': '''
-            CREATE TABLE IF NOT EXISTS recebimentos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                data TEXT,
-                valor REAL,
-                metodo TEXT,
-                tipo TEXT,
-                observacao TEXT,
-                nome_cliente TEXT
-            )
-        ''',
-        'consumo_clientes': '''
-            CREATE TABLE IF NOT EXISTS consumo_clientes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                data TEXT,
-                nome_cliente TEXT,
-                descricao TEXT,
-                valor REAL,
-                tipo TEXT,
-                observacao TEXT
-            )
-        ''',
-        'gastos_insumos': '''
-            CREATE TABLE IF NOT EXISTS gastos_insumos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                data TEXT,
-                item TEXT,
-                valor REAL,
-                tipo TEXT,
-                quantidade REAL,
-                unidade_medida TEXT,
-                observacao TEXT
-            )
-        ''',
-        'gastos_fixos': '''
-            CREATE TABLE IF NOT EXISTS gastos_fixos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                data TEXT,
-                descricao TEXT,
-                valor REAL,
-                tipo TEXT
-            )
-        ''',
-        'insumos': '''
-            CREATE TABLE IF NOT EXISTS insumos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nome TEXT UNIQUE,
-                unidade_medida TEXT,
-                estoque_minimo REAL,
-                observacao TEXT
-            )
-        ''',
-        'estoque': '''
-            CREATE TABLE IF NOT EXISTS estoque (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                produto TEXT,
-                quantidade REAL,
-                unidade TEXT,
-                sabor TEXT,
-                data_atualizacao TEXT
-            )
-        '''
-    }
+    """Retorna o pool de conexões compartilhado pelo processo.
 
-    for tabela, schema in tabelas.items():
-        cursor.execute(schema)
+    O pool é criado uma única vez (WAL, synchronous=NORMAL, busy timeout)
+    e suas conexões são reaproveitadas entre as execuções do script. As
+    migrações pendentes do esquema são aplicadas nesse momento, e não a
+    cada interação.
+    """
+    pool = obter_pool()
+    with pool.conexao() as conn:
+        aplicar_migracoes(conn)
+    return pool
 
-    cursor.connection.commit()
 
 # =============================================
 # FUNÇÕES DE OPERAÇÕES NO BANCO DE DADOS
 # =============================================
 
 
+@instrumentar("adicionar_entrada")
 def adicionar_entrada(cursor, tabela, dados):
     """Adiciona um novo registro na tabela especificada"""
     try:
-        colunas = ", ".join(dados.keys())
-        placeholders = ", ".join("?" * len(dados))
-        valores = tuple(dados.values())
-        cursor.execute(
-            f"INSERT INTO {tabela} ({colunas}) VALUES ({placeholders})", valores)
-        cursor.connection.commit()
+        inserir(cursor, tabela, dados)
         return True
     except Exception as e:
         st.error(f"Erro ao adicionar entrada: {str(e)}")
         return False
 
 
-def editar_registro(cursor, tabela, id_, campos):
-    """Edita um registro existente"""
-    try:
-        set_clause = ", ".join([f"{c} = ?" for c in campos.keys()])
-        valores = tuple(campos.values()) + (id_,)
-        cursor.execute(
-            f"UPDATE {tabela} SET {set_clause} WHERE id = ?", valores)
-        cursor.connection.commit()
-        return True
-    except Exception as e:
-        st.error(f"Erro ao editar registro: {str(e)}")
-        return False
+@instrumentar("ler_consulta", medida_dataframe)
+def ler_consulta(sql, params=(), tabelas=None):
+    """pd.read_sql_query passando pelo memo dos serviços.
 
+    O resultado é reaproveitado enquanto as tabelas lidas não forem
+    alteradas (ver Servico.consulta).
+    """
+    return servicos()[1].consulta(sql, params, tabelas)
 
-def deletar_registro(cursor, tabela, id_):
-    """Remove um registro do banco de dados"""
-    try:
-        cursor.execute(f"DELETE FROM {tabela} WHERE id = ?", (id_,))
-        cursor.connection.commit()
-        return True
-    except Exception as e:
-        st.error(f"Erro ao deletar registro: {str(e)}")
-        return False
 
+@st.cache_resource(max_entries=4)
+def catalogo_insumos(_conn, versao):
+    """Catálogo de insumos compartilhado por todas as abas e sessões.
+
+    `versao` (versão da tabela insumos) faz parte da chave: qualquer
+    escrita em insumos, inclusive as de saldo do livro de estoque, gera um
+    catálogo novo.
+    """
+    return CatalogoInsumos.carregar(_conn)
+
+
+def obter_catalogo(conn, cursor):
+    return catalogo_insumos(conn, versoes_tabelas(cursor, ["insumos"]))
+
+
+def opcoes_insumo(catalogo, chave):
+    """Ids para o seletor de insumo; catálogos grandes ganham um campo de busca.
+
+    Deve ser chamada fora de formulários, para a busca atualizar a lista.
+    """
+    termo = ""
+    if len(catalogo) > LIMITE_OPCOES:
+        termo = st.text_input("🔎 Buscar insumo", key=f"busca_{chave}",
+                              placeholder="Digite parte do nome")
+    return catalogo.opcoes(termo)
 
-def obter_saldo_inicial(cursor, data):
-    """Obtém o saldo inicial para uma data específica"""
-    cursor.execute("SELECT valor FROM saldo_inicial WHERE data = ?", (data,))
-    resultado = cursor.fetchone()
-    return resultado[0] if resultado else 0.0
+
+@st.cache_resource
+def servicos():
+    """Serviços de caixa e de relatórios, compartilhados por todas as sessões.
+
+    Os resultados memorizados pelos serviços (séries, detalhamentos,
+    arquivos exportados) valem para qualquer sessão enquanto as versões das
+    tabelas não mudarem.
+    """
+    pool = configurar_banco_dados()
+    return CaixaService(pool), RelatorioService(pool)
 
 # =============================================
-# FUNÇÕES PARA GERAÇÃO DE RELATÓRIOS
+# EXPORTAÇÕES SOB DEMANDA
 # =============================================
 
+MIME_EXCEL = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def botao_exportacao(nome, rotulo, rotulo_download, chave, gerar, nome_arquivo, mime):
+    """Gera o arquivo só quando pedido e então oferece o download.
+
+    Depois de gerado, o botão de download continua disponível enquanto a
+    `chave` (período e versões das tabelas) não mudar; ao mudar, volta a
+    ser preciso pedir a geração.
+    """
+    estado = f"exportacao_{nome}"
+    if st.session_state.get(estado) != chave:
+        if not st.button(rotulo, key=f"gerar_{nome}"):
+            return
+        st.session_state[estado] = chave
+
+    # O arquivo fica memorizado no serviço de relatórios enquanto as tabelas
+    # não mudarem, então os reruns seguintes não o geram de novo
+    with st.spinner("Gerando arquivo..."):
+        dados = gerar()
+    st.download_button(
+        rotulo_download,
+        data=dados,
+        file_name=nome_arquivo,
+        mime=mime,
+        key=f"baixar_{nome}"
+    )
+
+
+# =============================================
+# TAREFAS EM SEGUNDO PLANO
+# =============================================
+
+
+@st.cache_resource
+def fila_tarefas():
+    """Fila de tarefas do processo (exportações, PDFs, reconstruções, importações)"""
+    return FilaTarefas(configurar_banco_dados())
+
+
+def acompanhar_tarefa(chave, concluida):
+    """Progresso da tarefa cujo id está em `st.session_state[chave]`.
+
+    Enquanto a tarefa não termina, um fragmento se atualiza a cada segundo
+    (sem refazer a tela inteira) e oferece o cancelamento; ao terminar, a
+    tela é redesenhada uma vez e `concluida(tarefa)` mostra o resultado.
+    """
+    id_tarefa = st.session_state.get(chave)
+    if id_tarefa is None:
+        return
+    tarefa = fila_tarefas().tarefa(id_tarefa)
+    if tarefa is None:
+        # Expirou e foi apagada
+        del st.session_state[chave]
+        return
+    st.fragment(_acompanhar_tarefa, run_every=None if tarefa.finalizada else 1.0)(
+        chave, concluida)
+
+
+def _acompanhar_tarefa(chave, concluida):
+    fila = fila_tarefas()
+    tarefa = fila.tarefa(st.session_state[chave])
+    if tarefa is None:
+        return
+    acompanhando = f"{chave}_acompanhando"
+    if not tarefa.finalizada:
+        st.session_state[acompanhando] = True
+        col_barra, col_cancelar = st.columns([4, 1])
+        with col_barra:
+            st.progress(tarefa.progresso,
+                        text=tarefa.mensagem or ("Na fila..." if tarefa.estado == "pendente"
+                                                 else "Processando..."))
+        with col_cancelar:
+            if st.button("✖️ Cancelar", key=f"cancelar_{chave}"):
+                fila.cancelar(tarefa.id)
+        return
+    if st.session_state.pop(acompanhando, False):
+        # Terminou durante o acompanhamento: redesenha a tela inteira, que
+        # pode depender do resultado, e deixa de atualizar periodicamente
+        st.rerun()
+    if tarefa.estado == "concluida":
+        concluida(tarefa)
+    elif tarefa.estado == "cancelada":
+        st.info("Tarefa cancelada.")
+    else:
+        st.error(f"❌ Erro na tarefa: {tarefa.erro}")
+
+
+def oferecer_download(rotulo, mime, chave):
+    """Função de `acompanhar_tarefa` que oferece o arquivo do resultado"""
+    def mostrar(tarefa):
+        if tarefa.mensagem:
+            st.caption(tarefa.mensagem)
+        try:
+            with open(tarefa.arquivo, "rb") as arquivo:
+                st.download_button(rotulo, data=arquivo, file_name=tarefa.nome_arquivo,
+                                   mime=mime, key=chave)
+        except OSError:
+            st.info("O arquivo expirou; gere novamente.")
+    return mostrar
+
+
+def mostrar_relatorio_extrato(tarefa):
+    """Relatório de uma importação (ou simulação) de extrato concluída"""
+    relatorio = tarefa.resultado
+    acao = "seriam importados" if relatorio["simulado"] else "importados"
+    st.success(
+        f"✅ {relatorio['novos']} recebimentos {acao}, "
+        f"{relatorio['duplicados']} já existentes, "
+        f"{relatorio['debitos']} débitos ignorados, "
+        f"{relatorio['invalidos']} linhas inválidas.")
+    for numero, erro in relatorio["erros"]:
+        st.error(f"❌ Linha {numero}: {erro}")
+
+
+def renderizar_lote_pdf(ano, mes):
+    """PDF dos fechamentos de um período, gerado pela fila de tarefas"""
+    col_lote1, col_lote2, col_lote3 = st.columns(3)
+    with col_lote1:
+        inicio_lote = st.date_input("De", date(ano, mes, 1), key="inicio_lote_pdf")
+    with col_lote2:
+        fim_lote = st.date_input("Até", date(ano, mes, monthrange(ano, mes)[1]),
+                                 key="fim_lote_pdf")
+    with col_lote3:
+        vazios = st.checkbox("Incluir dias sem movimento", key="lote_pdf_vazios")
+
+    if st.button("🗂️ Gerar PDF dos Fechamentos", key="gerar_lote_pdf"):
+        if fim_lote < inicio_lote:
+            st.error("❌ A data final deve ser posterior à inicial!")
+        else:
+            st.session_state.tarefa_lote_pdf = fila_tarefas().enviar(
+                "pdf_periodo", inicio=inicio_lote.isoformat(),
+                fim=fim_lote.isoformat(), vazios=vazios)
+
+    acompanhar_tarefa("tarefa_lote_pdf", oferecer_download(
+        "⬇️ Baixar PDF dos Fechamentos", "application/pdf", "baixar_lote_pdf"))
+
+
+# =============================================
+# ATUALIZAÇÃO AO VIVO ENTRE SESSÕES
+# =============================================
+
+
+@st.cache_resource
+def notificador():
+    """Notificador de alterações do processo (ver notificacoes)"""
+    return Notificador(configurar_banco_dados().caminho)
+
+
+def ao_vivo(chave, tabelas, carregar, mostrar):
+    """Parte da tela que se atualiza sozinha quando `tabelas` mudam.
+
+    Um fragmento roda a cada INTERVALO_S sem refazer a tela inteira, em
+    todas as sessões abertas, então uma escrita aparece nelas em até
+    INTERVALO_S. Ele só chama `carregar()` quando as versões publicadas
+    pelo notificador mudam, com uma conexão emprestada só durante a
+    atualização (na execução completa, a da renderização); nas demais
+    vezes `mostrar(dados, versao)` recebe o resultado guardado na sessão,
+    sem consultar o banco.
+    """
+    # Execução completa do script: publica escritas ainda não vistas
+    notificador().conferir()
+    st.fragment(_ao_vivo, run_every=INTERVALO_S)(chave, tabelas, carregar, mostrar)
+
+
+def _ao_vivo(chave, tabelas, carregar, mostrar):
+    versao = notificador().versoes(tabelas)
+    guardado = st.session_state.get(chave)
+    if guardado is None or guardado[0] != versao:
+        with configurar_banco_dados().conexao_reentrante():
+            guardado = (versao, carregar())
+        st.session_state[chave] = guardado
+    mostrar(guardado[1], guardado[0])
+
+
+def mostrar_resumo_dia(relatorios, resumo, lancamentos, versao):
+    """Métricas do Resumo do Dia, a lista de lançamentos e a exportação.
+
+    `versao` (versões das tabelas de lançamentos) entra na chave dos
+    arquivos exportados.
+    """
+    totais = resumo.totais()
+
+    # Exibição em colunas com cores condicionais
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.metric("Saldo Inicial",
+                  f"R$ {resumo.saldo_inicial:.2f}", delta="Saldo inicial do dia")
+        st.metric("Total Recebimentos",
+                  f"R$ {totais['recebimentos']:.2f}", delta=f"R$ {totais['recebimentos']:.2f}")
+        st.metric(
+            "Total Consumo", f"R$ {totais['consumo']:.2f}", delta=f"R$ {totais['consumo']:.2f}")
+        st.metric(
+            "Total Entradas", f"R$ {totais['entrada']:.2f}", delta=f"R$ {totais['entrada']:.2f}")
+
+    with col2:
+        st.metric("Gastos com Insumos",
+                  f"R$ {totais['gastos_insumos']:.2f}", delta=f"R$ {totais['gastos_insumos']:.2f}")
+        st.metric(
+            "Gastos Fixos", f"R$ {totais['gastos_fixos']:.2f}", delta=f"R$ {totais['gastos_fixos']:.2f}")
+        st.metric(
+            "Total Gastos", f"R$ {totais['gastos']:.2f}", delta=f"R$ {totais['gastos']:.2f}")
+
+        saldo_delta = totais['saldo_final'] - resumo.saldo_inicial
+        st.metric("Saldo Final",
+                  f"R$ {totais['saldo_final']:.2f}",
+                  delta=f"R$ {saldo_delta:.2f}",
+                  delta_color="normal" if saldo_delta >= 0 else "inverse")
+
+    with st.expander(f"📋 Lançamentos de Hoje ({len(lancamentos)})"):
+        if lancamentos.empty:
+            st.info("Nenhum lançamento registrado hoje.")
+        else:
+            st.dataframe(
+                lancamentos, use_container_width=True, hide_index=True,
+                column_config={"Valor (R$)": st.column_config.NumberColumn(format="R$ %.2f")})
+
+    # Seção de exportação
+    st.markdown("---")
+    st.subheader("📤 Exportar Relatório")
+
+    dia = resumo.periodo
+    col_exp1, col_exp2 = st.columns(2)
+
+    with col_exp1:
+        botao_exportacao(
+            "pdf_diario",
+            "📄 Gerar PDF do Resumo",
+            "⬇️ Baixar PDF",
+            ("pdf_diario", dia, resumo.saldo_inicial, versao),
+            lambda: relatorios.pdf_resumo(resumo, 'diario'),
+            f"resumo_caixa_{dia}.pdf",
+            "application/pdf"
+        )
+
+    with col_exp2:
+        botao_exportacao(
+            "excel_diario",
+            "📊 Gerar Excel Completo",
+            "⬇️ Baixar Excel Completo",
+            ("excel_diario", dia, resumo.saldo_inicial, versao),
+            lambda: relatorios.planilha_caixa_diario(resumo),
+            f"resumo_caixa_{dia}.xlsx",
+            MIME_EXCEL
+        )
+
+
+@st.fragment
+def registrar_lancamentos(hoje):
+    """Formulários de lançamento do Caixa Diário.
+
+    Rodam em um fragmento: gravar um lançamento refaz só os formulários,
+    e o Resumo do Dia (ver `ao_vivo`) o mostra no próximo ciclo, sem
+    refazer a tela inteira. Na execução completa o fragmento usa a conexão
+    da renderização; quando roda sozinho, empresta uma pelo tempo da
+    execução.
+    """
+    with configurar_banco_dados().conexao_reentrante() as conn:
+        _registrar_lancamentos(conn, conn.cursor(), hoje)
+
+
+def _registrar_lancamentos(conn, cursor, hoje):
+    opcao_lancamento = st.radio(
+        "Tipo de Lançamento:",
+        ["💵 Recebimento", "👥 Consumo por Cliente",
+            "🛒 Gasto com Insumos", "🏢 Gasto Fixo"],
+        horizontal=True,
+        label_visibility="collapsed"
+    )
+
+    if opcao_lancamento == "💵 Recebimento":
+        with st.form("form_recebimento", clear_on_submit=True):
+            col1, col2 = st.columns(2)
+            with col1:
+                metodo_pagamento = st.selectbox(
+                    "Método de Pagamento*",
+                    METODOS_PAGAMENTO
+                )
+            with col2:
+                valor_recebimento = st.number_input(
+                    "Valor Recebido (R$)*",
+                    min_value=0.01,
+                    step=0.01
+                )
+
+            observacao = st.text_input(
+                "Observação (opcional)",
+                placeholder="Ex: Feirinha, Evento especial"
+            )
 
-def gerar_pdf_resumo(data, saldo_inicial, totais, tipo='diario'):
-    """Gera um PDF com o resumo financeiro"""
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", "B", 16)
-
-    titulo = "Resumo Diário CAZÁ" if tipo == 'diario' else f"Resumo Mensal CAZÁ - {data}"
-    pdf.cell(0, 10, titulo, ln=True, align="C")
-    pdf.ln(10)
-
-    pdf.set_font("Arial", size=12)
-    pdf.cell(0, 10, f"Data: {data}", ln=True)
-    pdf.ln(5)
-
-    pdf.set_fill_color(255, 255, 255)
-
-    linhas = [
-        ("Saldo Inicial", saldo_inicial),
-        ("Total Recebimentos", totais['recebimentos']),
-        ("Total Consumo Clientes", totais['consumo']),
-        ("Total Entrada", totais['entrada']),
-        ("Total Gastos Insumos", totais['gastos_insumos']),
-        ("Total Gastos Fixos", totais['gastos_fixos']),
-        ("Total Gastos", totais['gastos']),
-        ("Saldo Final", totais['saldo_final'])
-    ]
-
-    for desc, val in linhas:
-        if val < 0:
-            pdf.set_text_color(255, 0, 0)
+            if st.form_submit_button("💾 Registrar Recebimento"):
+                if valor_recebimento <= 0:
+                    st.error("❌ O valor deve ser maior que zero!")
+                else:
+                    if adicionar_entrada(cursor, "recebimentos", {
+                        "data": hoje,
+                        "valor": valor_recebimento,
+                        "metodo": metodo_pagamento,
+                        "tipo": "recebimento",
+                        "observacao": observacao.strip(),
+                        "nome_cliente": ""
+                    }):
+                        st.success("✅ Recebimento registrado com sucesso!")
+                        notificador().avisar()
+
+    elif opcao_lancamento == "👥 Consumo por Cliente":
+        with st.form("form_consumo", clear_on_submit=True):
+            col1, col2 = st.columns(2)
+            with col1:
+                nome_cliente = st.text_input("Nome do Cliente*")
+            with col2:
+                valor_consumo = st.number_input(
+                    "Valor do Consumo (R$)*",
+                    min_value=0.01,
+                    step=0.01
+                )
+
+            descricao_consumo = st.text_input(
+                "Descrição (opcional)",
+                placeholder="Ex: 2 porções de feijoada"
+            )
+
+            observacao = st.text_input(
+                "Observação (opcional)",
+                placeholder="Ex: Consumo no local"
+            )
+
+            if st.form_submit_button("💾 Registrar Consumo"):
+                if not nome_cliente.strip():
+                    st.error("❌ Informe o nome do cliente!")
+                elif valor_consumo <= 0:
+                    st.error("❌ O valor deve ser maior que zero!")
+                else:
+                    if adicionar_entrada(cursor, "consumo_clientes", {
+                        "data": hoje,
+                        "nome_cliente": nome_cliente.strip(),
+                        "descricao": descricao_consumo.strip(),
+                        "valor": valor_consumo,
+                        "tipo": "consumo",
+                        "observacao": observacao.strip()
+                    }):
+                        st.success("✅ Consumo registrado com sucesso!")
+                        notificador().avisar()
+
+    elif opcao_lancamento == "🛒 Gasto com Insumos":
+        catalogo = obter_catalogo(conn, cursor)
+        opcoes_gasto = opcoes_insumo(catalogo, "gasto") if catalogo else []
+
+        with st.form("form_gasto_insumo", clear_on_submit=True):
+            col1, col2 = st.columns(2)
+            with col1:
+                if catalogo:
+                    insumo_id = st.selectbox(
+                        "Insumo*",
+                        opcoes_gasto,
+                        format_func=catalogo.rotulo
+                    )
+                    insumo = catalogo.por_id.get(insumo_id)
+                    item_selecionado = insumo.nome if insumo else ""
+                    unidade = insumo.unidade_medida if insumo else "kg"
+                else:
+                    item_selecionado = st.text_input(
+                        "Insumo*", placeholder="Ex: Farinha, Açúcar")
+                    unidade = st.text_input("Unidade*", value="kg")
+                    insumo_id = None
+
+                quantidade = st.number_input(
+                    f"Quantidade ({unidade})",
+                    min_value=0.001,
+                    step=0.001,
+                    format="%.3f"
+                )
+
+            with col2:
+                valor_insumo = st.number_input(
+                    "Valor Total (R$)*", min_value=0.01, step=0.01)
+                tipo_evento = st.text_input(
+                    "Tipo de Evento (opcional)", placeholder="Ex: Feirinha, Compra semanal")
+
+            if st.form_submit_button("💾 Registrar Gasto"):
+                if not item_selecionado:
+                    st.error("❌ Selecione ou informe um insumo!")
+                elif valor_insumo <= 0:
+                    st.error("❌ O valor deve ser maior que zero!")
+                else:
+                    if adicionar_entrada(cursor, "gastos_insumos", {
+                        "data": hoje,
+                        "item": item_selecionado.strip(),
+                        "valor": valor_insumo,
+                        "tipo": tipo_evento.strip(),
+                        "quantidade": quantidade,
+                        "unidade_medida": unidade.strip(),
+                        "observacao": f"Compra: {tipo_evento.strip()}" if tipo_evento.strip() else "Compra",
+                        # A trigger da compra dá entrada no estoque do insumo
+                        "insumo_id": insumo_id
+                    }):
+                        st.success(
+                            "✅ Gasto com insumo registrado com sucesso!")
+                        notificador().avisar()
+
+    elif opcao_lancamento == "🏢 Gasto Fixo":
+        with st.form("form_gasto_fixo", clear_on_submit=True):
+            col1, col2 = st.columns(2)
+            with col1:
+                descricao_fixo = st.text_input(
+                    "Descrição*",
+                    placeholder="Ex: Aluguel, Luz, Internet"
+                )
+            with col2:
+                valor_fixo = st.number_input(
+                    "Valor (R$)*",
+                    min_value=0.01,
+                    step=0.01
+                )
+
+            tipo_evento_fixo = st.text_input(
+                "Tipo de Evento (opcional)",
+                placeholder="Ex: Mensalidade, Conta de água"
+            )
+
+            if st.form_submit_button("💾 Registrar Gasto Fixo"):
+                if not descricao_fixo.strip():
+                    st.error("❌ Informe a descrição do gasto fixo!")
+                elif valor_fixo <= 0:
+                    st.error("❌ O valor deve ser maior que zero!")
+                else:
+                    if adicionar_entrada(cursor, "gastos_fixos", {
+                        "data": hoje,
+                        "descricao": descricao_fixo.strip(),
+                        "valor": valor_fixo,
+                        "tipo": tipo_evento_fixo.strip() if tipo_evento_fixo.strip() else "fixo"
+                    }):
+                        st.success("✅ Gasto fixo registrado com sucesso!")
+                        notificador().avisar()
+
+    # Lançamento em lote do tipo selecionado, gravado em uma transação
+    tabela_lote = {
+        "💵 Recebimento": "recebimentos",
+        "👥 Consumo por Cliente": "consumo_clientes",
+        "🛒 Gasto com Insumos": "gastos_insumos",
+        "🏢 Gasto Fixo": "gastos_fixos"
+    }[opcao_lancamento]
+    colunas_lote = colunas_lancamento(tabela_lote)
+
+    with st.expander(f"📋 Lançamento em Lote ({opcao_lancamento})"):
+        modo_lote = st.radio(
+            "Forma de entrada",
+            ["Planilha", "Colar CSV"],
+            horizontal=True,
+            key="modo_lote"
+        )
+
+        chave_lote = f"lote_{tabela_lote}_{modo_lote}"
+        if modo_lote == "Planilha":
+            df_lote = st.data_editor(
+                pd.DataFrame({
+                    c: pd.Series(dtype="float" if c in ("valor", "quantidade") else "object")
+                    for c in colunas_lote
+                }),
+                num_rows="dynamic",
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "data": st.column_config.TextColumn("data", default=hoje),
+                    "valor": st.column_config.NumberColumn(
+                        "valor", min_value=0.01, step=0.01, format="R$ %.2f"),
+                    "metodo": st.column_config.SelectboxColumn(
+                        "metodo", options=METODOS_PAGAMENTO)
+                },
+                key=chave_lote
+            )
+            linhas_lote = df_lote.to_dict("records")
         else:
-            pdf.set_text_color(0, 0, 0)
-
-        pdf.cell(130, 10, desc, 0, 0)
-        pdf.cell(40, 10, f"R$ {val:.2f}", 0, 1, 'R')
-        pdf.set_text_color(0, 0, 0)
-
-    buffer = io.BytesIO()
-    pdf_output = pdf.output(dest='S').encode('latin1')
-    buffer.write(pdf_output)
-    buffer.seek(0)
-    return buffer
-
-
-def gerar_excel_resumo(dados, nome_arquivo):
-    """Gera um arquivo Excel com os dados consolidados"""
-    buffer = io.BytesIO()
-    with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-        for sheet_name, df in dados.items():
-            if not df.empty:
-                df.to_excel(writer, index=False, sheet_name=sheet_name[:31])
-
-                workbook = writer.book
-                worksheet = writer.sheets[sheet_name[:31]]
-                format_negativo = workbook.add_format(
-                    {'num_format': '[Red]R$ #,##0.00'})
-
-                for col_num, col_name in enumerate(df.columns):
-                    if pd.api.types.is_numeric_dtype(df[col_name]):
-                        worksheet.set_column(
-                            col_num, col_num, None, format_negativo)
-    buffer.seek(0)
-    return buffer
+            texto_lote = st.text_area(
+                "Linhas em CSV (com cabeçalho)",
+                placeholder=";".join(colunas_lote),
+                key=chave_lote
+            )
+            linhas_lote = ler_csv_lancamentos(texto_lote)
+
+        if st.button("💾 Registrar Lote", key="btn_registrar_lote"):
+            try:
+                gravadas = adicionar_entradas(cursor, tabela_lote, linhas_lote)
+            except ErroValidacao as e:
+                for indice, mensagem in e.erros:
+                    st.error(f"❌ Linha {indice + 1}: {mensagem}")
+            except Exception as e:
+                st.error(f"Erro ao registrar lote: {str(e)}")
+            else:
+                if gravadas:
+                    st.session_state.pop(chave_lote, None)
+                    st.success(f"✅ {gravadas} lançamentos registrados!")
+                    notificador().avisar()
+                    st.rerun(scope="fragment")
+                else:
+                    st.warning("Nenhuma linha preenchida para registrar.")
+
 
 # =============================================
 # INTERFACE DO USUÁRIO
 # =============================================
 
 
+CAMINHO_LOGO = "IMG_5950.jpg"  # ajuste o caminho se necessário
+LARGURA_LOGO = 200  # ajuste o width conforme preferir
+
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def carregar_logo(caminho, largura, modificado_em):
+    """Logo decodificada e reduzida uma única vez por processo.
+
+    Devolve os bytes da imagem já no tamanho exibido (2x a largura, para
+    telas de alta densidade); `modificado_em` renova o cache quando o
+    arquivo é trocado.
+    """
+    from PIL import Image
+
+    with Image.open(caminho) as imagem:
+        imagem.thumbnail((largura * 2, largura * 2))
+        buffer = io.BytesIO()
+        imagem.save(buffer, format="JPEG" if imagem.mode == "RGB" else "PNG")
+    return buffer.getvalue()
+
+
+ABA_DESEMPENHO = "⚙️ Desempenho"
+
+
+def desempenho_visivel():
+    """A aba de desempenho só aparece com ?desempenho=1 na URL ou
+    CAZA_DESEMPENHO=1 no ambiente"""
+    return (st.query_params.get("desempenho") == "1"
+            or os.environ.get("CAZA_DESEMPENHO") == "1")
+
+
+def renderizar_desempenho():
+    st.header(ABA_DESEMPENHO)
+    st.caption("Latência das operações de banco e das exportações desde que o "
+               "servidor iniciou (últimas chamadas de cada operação).")
+
+    resumo = INSTRUMENTACAO.resumo()
+    if resumo:
+        df_resumo = pd.DataFrame(resumo).rename(columns={
+            "operacao": "Operação", "chamadas": "Chamadas", "p50_ms": "p50 (ms)",
+            "p95_ms": "p95 (ms)", "max_ms": "Máx. (ms)",
+            "linhas_media": "Linhas (média)", "bytes_media": "Bytes (média)"})
+        st.dataframe(df_resumo.sort_values("p95 (ms)", ascending=False),
+                     use_container_width=True, hide_index=True)
+    else:
+        st.info("Nenhuma operação medida ainda.")
+
+    if st.button("🧹 Zerar métricas", key="btn_zerar_metricas"):
+        INSTRUMENTACAO.limpar()
+        st.rerun()
+
+    st.subheader("🐢 Chamadas lentas")
+    st.caption(f"Chamadas a partir de {INSTRUMENTACAO.limite_lenta_ms:.0f} ms, "
+               f"registradas em `{INSTRUMENTACAO.caminho_log}`.")
+    lentas = INSTRUMENTACAO.lentas()
+    if lentas:
+        st.dataframe(pd.DataFrame(lentas), use_container_width=True, hide_index=True)
+    else:
+        st.info("Nenhuma chamada lenta registrada.")
+
+    st.subheader("🧵 Tarefas em segundo plano")
+    if st.button("🔁 Reconstruir resumos e estoque", key="btn_reconstruir"):
+        st.session_state.tarefa_reconstrucao = fila_tarefas().enviar("reconstruir_resumos")
+    acompanhar_tarefa("tarefa_reconstrucao", lambda tarefa: st.success(f"✅ {tarefa.mensagem}"))
+
+    tarefas = fila_tarefas().recentes()
+    if tarefas:
+        st.dataframe(pd.DataFrame([{
+            "Id": t.id, "Tipo": t.tipo, "Estado": t.estado,
+            "Progresso": f"{t.progresso:.0%}", "Criada em": t.criada_em,
+            "Concluída em": t.concluida_em, "Expira em": t.expira_em,
+            "Mensagem": t.erro or t.mensagem} for t in tarefas]),
+            use_container_width=True, hide_index=True)
+    else:
+        st.info("Nenhuma tarefa registrada.")
+
+
 def main():
+    with perfil.etapa("pool e migrações"):
+        pool = configurar_banco_dados()
+    # Serviços, fila de tarefas e fragmentos usam esta mesma conexão
+    with pool.conexao_reentrante() as conn:
+        with perfil.etapa("renderização"):
+            renderizar_app(conn, conn.cursor())
+    perfil.relatorio_execucao()
+
+
+def renderizar_app(conn, cursor):
     # Configuração inicial
-    conn, cursor = configurar_banco_dados()
-    criar_tabelas(cursor)
-    verificar_estrutura_bd(cursor)
     hoje = datetime.now().strftime("%Y-%m-%d")
+    caixa, relatorios = servicos()
 
     # Carregar logo
     try:
-        logo = Image.open("IMG_5950.jpg")  # ajuste o caminho se necessário
-        st.image(logo, width=200)  # ajuste o width conforme preferir
-    except:
+        logo = carregar_logo(CAMINHO_LOGO, LARGURA_LOGO, os.path.getmtime(CAMINHO_LOGO))
+        st.image(logo, width=LARGURA_LOGO)
+    except OSError:
         st.sidebar.warning("Logo não encontrada")
 
     # Interface principal
@@ -267,10 +723,13 @@ def main():
     # Menu lateral
     with st.sidebar:
         st.header("Navegação")
+        abas = ["📊 Caixa Diário", "📅 Relatório Mensal",
+                "📦 Controle de Insumos", "❓ Ajuda"]
+        if desempenho_visivel():
+            abas.append(ABA_DESEMPENHO)
         aba = st.radio(
             "Selecione a aba",
-            ["📊 Caixa Diário", "📅 Relatório Mensal",
-                "📦 Controle de Insumos", "❓ Ajuda"],
+            abas,
             index=0
         )
 
@@ -278,18 +737,35 @@ def main():
         st.caption(
             f"Última atualização: {datetime.now().strftime('%d/%m/%Y %H:%M')}")
 
+        with st.expander("🔌 Conexões do banco"):
+            st.json(configurar_banco_dados().estatisticas())
+
+        with st.expander("🧮 Consultas e relatórios memorizados"):
+            st.json(relatorios.estatisticas())
+
+        with st.expander("🔔 Atualização automática"):
+            st.json(notificador().estatisticas())
+
+    # --- ABA DESEMPENHO (oculta) ---
+    if aba == ABA_DESEMPENHO:
+        renderizar_desempenho()
+
     # --- ABA AJUDA ---
-    if aba == "❓ Ajuda":
+    elif aba == "❓ Ajuda":
         st.header("❓ Guia de Ajuda")
 
         with st.expander("📌 Como usar o sistema", expanded=True):
             st.markdown("""
             **1. Configuração Inicial:**
             - Comece cadastrando todos os insumos utilizados na aba 'Controle de Insumos'
-            - No primeiro dia, defina seu saldo inicial (pode ser negativo se necessário)
+            - No primeiro dia, defina seu saldo inicial (pode ser negativo se necessário);
+              nos dias seguintes ele é o fechamento do dia anterior, e só precisa ser
+              salvo de novo para corrigir o valor contado no caixa
             
             **2. Fluxo Diário:**
-            - Registre todos os recebimentos e gastos na aba 'Caixa Diário'
+            - Registre todos os recebimentos e gastos na aba 'Caixa Diário'; o
+              Resumo do Dia se atualiza sozinho, inclusive com os lançamentos
+              feitos em outros computadores
             - Atualize o estoque na aba 'Controle de Insumos'
             - Saldos negativos são normais nos dias de compra (especialmente domingos)
             
@@ -340,79 +816,120 @@ def main():
                     if not nome.strip():
                         st.error("O nome do insumo é obrigatório!")
                     else:
-                        if adicionar_entrada(cursor, "insumos", {
-                            "nome": nome.strip(),
-                            "unidade_medida": unidade,
-                            "estoque_minimo": estoque_minimo,
-                            "estoque_atual": estoque_atual,
-                            "observacao": observacao.strip()
-                        }):
+                        try:
+                            cadastrar_insumo(conn, nome.strip(), unidade, estoque_minimo,
+                                             estoque_atual, observacao.strip())
+                        except Exception as e:
+                            st.error(f"Erro ao cadastrar insumo: {str(e)}")
+                        else:
                             st.success("✅ Insumo cadastrado com sucesso!")
                             st.rerun()
 
             st.markdown("---")
             st.subheader("🗂️ Insumos Cadastrados")
 
-            df_insumos = pd.read_sql_query(
-                "SELECT id, nome, unidade_medida, estoque_minimo, estoque_atual, observacao FROM insumos ORDER BY nome", conn)
-
-            if not df_insumos.empty:
-                for idx, row in df_insumos.iterrows():
-                    col1, col2, col3 = st.columns([4, 1, 1])
-                    with col1:
-                        estoque_atual = row['estoque_atual'] if row['estoque_atual'] is not None else 0.0
-                        estoque_minimo = row['estoque_minimo'] if row['estoque_minimo'] is not None else 0.0
-                        st.write(
-                            f"**{row['nome']}** ({row['unidade_medida']}) | Estoque Atual: {estoque_atual:.2f} | Mínimo: {estoque_minimo:.2f}")
-                        if row['observacao']:
-                            st.caption(f"Obs: {row['observacao']}")
-                    with col2:
-                        if st.button(f"✏️ Editar", key=f"edit_{row['id']}"):
-                            novo_nome = st.text_input(
-                                "Novo nome", value=row['nome'], key=f"novo_nome_{row['id']}")
-                            nova_unidade = st.text_input(
-                                "Nova unidade", value=row['unidade_medida'], key=f"nova_unidade_{row['id']}")
-                            novo_minimo = st.number_input(
-                                "Novo estoque mínimo", value=row['estoque_minimo'], key=f"novo_minimo_{row['id']}")
-                            novo_atual = st.number_input(
-                                "Novo estoque atual", value=row['estoque_atual'], key=f"novo_atual_{row['id']}")
-                            nova_obs = st.text_input(
-                                "Nova observação", value=row['observacao'], key=f"nova_obs_{row['id']}")
-                            if st.button("Salvar alterações", key=f"salvar_{row['id']}"):
-                                editar_registro(cursor, "insumos", row['id'], {
-                                    "nome": novo_nome,
-                                    "unidade_medida": nova_unidade,
-                                    "estoque_minimo": novo_minimo,
-                                    "estoque_atual": novo_atual,
-                                    "observacao": nova_obs
-                                })
-                                st.success("✅ Insumo editado com sucesso!")
-                                st.rerun()
-                    with col3:
-                        if st.button(f"🗑️ Excluir", key=f"del_{row['id']}"):
-                            deletar_registro(cursor, "insumos", row['id'])
-                            st.success("✅ Insumo excluído!")
+            col_busca, col_tamanho = st.columns([3, 1])
+            with col_busca:
+                busca_insumos = st.text_input(
+                    "🔎 Buscar por nome", key="busca_insumos_cadastrados")
+            with col_tamanho:
+                tamanho_pagina = st.selectbox(
+                    "Por página", [25, 50, 100], index=1, key="tamanho_pagina_insumos")
+
+            if "aviso_insumos" in st.session_state:
+                st.warning(st.session_state.pop("aviso_insumos"))
+
+            padrao = padrao_busca(busca_insumos)
+            total_insumos = int(ler_consulta(SQL_TOTAL_INSUMOS, (padrao,))["total"].iloc[0])
+            total_paginas = max((total_insumos + tamanho_pagina - 1) // tamanho_pagina, 1)
+
+            if total_insumos:
+                pagina = st.number_input(
+                    f"Página (de {total_paginas})", min_value=1, max_value=total_paginas,
+                    value=1, step=1, key="pagina_insumos")
+                df_insumos = ler_consulta(
+                    SQL_PAGINA_INSUMOS,
+                    (padrao, tamanho_pagina, (pagina - 1) * tamanho_pagina))
+                df_insumos["excluir"] = False
+
+                # A chave muda com a página e a busca, descartando edições pendentes
+                chave_grade = f"grade_insumos_{padrao}_{tamanho_pagina}_{pagina}"
+                st.data_editor(
+                    df_insumos,
+                    key=chave_grade,
+                    use_container_width=True,
+                    hide_index=True,
+                    num_rows="fixed",
+                    disabled=["id"],
+                    column_order=["nome", "unidade_medida", "estoque_minimo",
+                                  "estoque_atual", "observacao", "excluir"],
+                    column_config={
+                        "nome": st.column_config.TextColumn("Insumo", required=True),
+                        "unidade_medida": st.column_config.SelectboxColumn(
+                            "Unidade", options=["kg", "g", "L", "ml", "un", "cx", "pct"]),
+                        "estoque_minimo": st.column_config.NumberColumn(
+                            "Mínimo", min_value=0.0, format="%.3f"),
+                        "estoque_atual": st.column_config.NumberColumn(
+                            "Estoque Atual", format="%.3f"),
+                        "observacao": st.column_config.TextColumn("Observação"),
+                        "excluir": st.column_config.CheckboxColumn("🗑️ Excluir"),
+                    }
+                )
+                st.caption(f"{total_insumos} insumo(s) encontrado(s)")
+
+                if st.button("💾 Salvar Alterações", key="btn_salvar_insumos"):
+                    # Só as linhas e colunas editadas, em uma única transação
+                    alteracoes, excluidos = {}, []
+                    for posicao, campos in st.session_state[chave_grade]["edited_rows"].items():
+                        insumo_id = int(df_insumos["id"].iloc[int(posicao)])
+                        campos = dict(campos)
+                        if campos.pop("excluir", False):
+                            excluidos.append(insumo_id)
+                        elif campos:
+                            alteracoes[insumo_id] = campos
+                    if not alteracoes and not excluidos:
+                        st.info("Nenhuma alteração para salvar.")
+                    else:
+                        # Versões lidas com a página: recusa se outro terminal gravou antes
+                        versoes = dict(zip(df_insumos["id"].astype(int),
+                                           df_insumos["versao"].astype(int)))
+                        try:
+                            gravados = salvar_insumos(conn, alteracoes, excluidos,
+                                                      versoes=versoes)
+                        except ConflitoVersao as e:
+                            # Descarta as edições e mostra a grade com os valores atuais
+                            st.session_state["aviso_insumos"] = (
+                                f"⚠️ {str(e)}. As edições foram descartadas.")
+                            del st.session_state[chave_grade]
+                            st.rerun()
+                        except Exception as e:
+                            st.error(f"Erro ao salvar insumos: {str(e)}")
+                        else:
+                            st.success(f"✅ {gravados} insumo(s) atualizado(s)!")
                             st.rerun()
+            elif busca_insumos.strip():
+                st.info("Nenhum insumo encontrado com esse nome.")
             else:
                 st.info("Nenhum insumo cadastrado.")
 
         with tab2:
             st.subheader("Registrar Baixa de Estoque")
-            df_insumos = pd.read_sql_query(
-                "SELECT id, nome, unidade_medida FROM insumos ORDER BY nome", conn)
+            catalogo = obter_catalogo(conn, cursor)
 
-            if not df_insumos.empty:
+            if catalogo:
+                opcoes_baixa = opcoes_insumo(catalogo, "baixa")
                 with st.form("form_baixa_estoque", clear_on_submit=True):
                     col1, col2, col3 = st.columns(3)
 
                     with col1:
-                        insumo_selecionado = st.selectbox(
+                        insumo_id = st.selectbox(
                             "Insumo*",
-                            df_insumos['nome'],
-                            format_func=lambda x: f"{x} ({df_insumos[df_insumos['nome'] == x]['unidade_medida'].iloc[0]})"
+                            opcoes_baixa,
+                            format_func=catalogo.rotulo
                         )
-                        unidade = df_insumos[df_insumos['nome'] ==
-                                             insumo_selecionado]['unidade_medida'].iloc[0]
+                        insumo = catalogo.por_id.get(insumo_id)
+                        insumo_selecionado = insumo.nome if insumo else ""
+                        unidade = insumo.unidade_medida if insumo else ""
 
                     with col2:
                         quantidade = st.number_input(
@@ -430,24 +947,18 @@ def main():
                         "Motivo (opcional)", placeholder="Ex: Produção diária")
 
                     if st.form_submit_button("📉 Registrar Baixa"):
-                        if quantidade <= 0:
+                        if insumo is None:
+                            st.error("❌ Selecione um insumo!")
+                        elif quantidade <= 0:
                             st.error("A quantidade deve ser maior que zero!")
                         else:
-                            if adicionar_entrada(cursor, "gastos_insumos", {
-                                "data": data_baixa.strftime("%Y-%m-%d"),
-                                "item": insumo_selecionado,
-                                "valor": 0,
-                                "tipo": "baixa_estoque",
-                                "quantidade": -abs(quantidade),
-                                "unidade_medida": unidade,
-                                "observacao": motivo.strip()
-                            }):
-                                # Atualiza o estoque atual do insumo
-                                cursor.execute(
-                                    "UPDATE insumos SET estoque_atual = estoque_atual - ? WHERE nome = ?",
-                                    (quantidade, insumo_selecionado)
-                                )
-                                conn.commit()
+                            # Lançamento e saída do estoque na mesma transação
+                            try:
+                                registrar_baixa(conn, int(insumo_id), quantidade,
+                                                data_baixa.strftime("%Y-%m-%d"), motivo.strip())
+                            except Exception as e:
+                                st.error(f"Erro ao registrar baixa: {str(e)}")
+                            else:
                                 st.success(
                                     f"✅ Baixa de {quantidade} {unidade} de {insumo_selecionado} registrada!")
                                 st.rerun()
@@ -458,26 +969,14 @@ def main():
             st.subheader("Nível de Estoque Atual")
 
             try:
-                df_estoque = pd.read_sql_query('''
-                    SELECT 
-                        i.nome AS Insumo,
-                        i.unidade_medida AS Unidade,
-                        i.estoque_atual AS Estoque_Atual,
-                        i.estoque_minimo AS Estoque_Mínimo,
-                        CASE 
-                            WHEN i.estoque_atual <= i.estoque_minimo THEN '⚠️ Repor'
-                            ELSE '✅ OK'
-                        END AS Status
-                    FROM insumos i
-                    ORDER BY Status DESC, i.nome
-                ''', conn)
+                df_estoque = relatorios.status_estoque()
 
                 if not df_estoque.empty:
                     def color_status(val):
                         color = 'red' if val == '⚠️ Repor' else 'green'
                         return f'color: {color}'
 
-                    styled_df = df_estoque.style.applymap(
+                    styled_df = df_estoque.style.map(
                         color_status, subset=['Status'])
 
                     st.dataframe(
@@ -501,13 +1000,30 @@ def main():
                             color="#FF4B4B"
                         )
 
+                    with st.expander("📜 Movimentos do Insumo"):
+                        catalogo = obter_catalogo(conn, cursor)
+                        id_movimentos = st.selectbox(
+                            "Insumo", opcoes_insumo(catalogo, "movimentos"),
+                            format_func=catalogo.rotulo, key="insumo_movimentos")
+                        df_movimentos = pd.DataFrame(
+                            movimentos_insumo(cursor, id_movimentos) if id_movimentos else [],
+                            columns=["Data", "Tipo", "Quantidade", "Observação"])
+                        if df_movimentos.empty:
+                            st.info("Nenhum movimento registrado para este insumo.")
+                        else:
+                            st.dataframe(df_movimentos, use_container_width=True,
+                                         hide_index=True)
+
                     st.markdown("---")
-                    st.download_button(
-                        label="📥 Exportar Relatório de Estoque (Excel)",
-                        data=gerar_excel_resumo(
-                            {"Estoque": df_estoque}, "estoque_atual.xlsx"),
-                        file_name=f"estoque_caza_{hoje}.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    versao = versoes_tabelas(cursor, ["insumos"])
+                    botao_exportacao(
+                        "estoque",
+                        "📥 Exportar Relatório de Estoque (Excel)",
+                        "⬇️ Baixar Relatório de Estoque",
+                        ("estoque", versao),
+                        relatorios.planilha_estoque,
+                        f"estoque_caza_{hoje}.xlsx",
+                        MIME_EXCEL
                     )
                 else:
                     st.info(
@@ -523,7 +1039,7 @@ def main():
 
         # Seção de Saldo Inicial
         with st.expander("💰 SALDO INICIAL DO DIA", expanded=True):
-            saldo_existente = obter_saldo_inicial(cursor, hoje)
+            abertura = caixa.abertura(hoje)
 
             col1, col2 = st.columns(2)
             with col1:
@@ -531,10 +1047,18 @@ def main():
                     "Valor em Caixa (R$)*",
                     min_value=-100000.0,
                     step=0.01,
-                    value=float(saldo_existente),
+                    value=float(abertura.valor),
                     key="saldo_inicial"
                 )
 
+                if abertura.manual:
+                    st.caption("✍️ Saldo informado manualmente para hoje")
+                elif abertura.informado_em:
+                    st.caption("🔁 Fechamento do dia anterior, a partir do saldo informado em "
+                               f"{datetime.strptime(abertura.informado_em, '%Y-%m-%d').strftime('%d/%m/%Y')}")
+                else:
+                    st.caption("🔁 Fechamento do dia anterior (nenhum saldo informado ainda)")
+
                 if saldo_inicial < 0:
                     st.warning(
                         "💡 Saldo negativo é normal para dias de compra (como domingos)")
@@ -545,300 +1069,83 @@ def main():
                     placeholder="Ex: Saldo da semana anterior, compras de domingo"
                 )
 
-            if st.button("💾 Salvar Saldo Inicial", key="btn_saldo_inicial"):
-                try:
-                    cursor.execute(
-                        "INSERT OR REPLACE INTO saldo_inicial (data, valor, observacao) VALUES (?, ?, ?)",
-                        (hoje, saldo_inicial, obs_saldo.strip())
-                    )
-                    conn.commit()
-                    st.success("✅ Saldo inicial salvo com sucesso!")
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"❌ Erro ao salvar: {str(e)}")
+            col_salvar, col_automatico = st.columns(2)
+            with col_salvar:
+                if st.button("💾 Salvar Saldo Inicial", key="btn_saldo_inicial"):
+                    try:
+                        caixa.salvar_saldo_inicial(hoje, saldo_inicial, obs_saldo.strip(),
+                                                   versao=abertura.versao)
+                        st.success("✅ Saldo inicial salvo com sucesso!")
+                        st.rerun()
+                    except ConflitoVersao as e:
+                        st.warning(f"⚠️ {str(e)}")
+                    except Exception as e:
+                        st.error(f"❌ Erro ao salvar: {str(e)}")
+            with col_automatico:
+                if abertura.manual and st.button("🔁 Usar fechamento do dia anterior",
+                                                 key="btn_saldo_automatico"):
+                    try:
+                        caixa.remover_saldo_inicial(hoje, versao=abertura.versao)
+                        st.rerun()
+                    except ConflitoVersao as e:
+                        st.warning(f"⚠️ {str(e)}")
+                    except Exception as e:
+                        st.error(f"❌ Erro ao remover: {str(e)}")
 
         # Seção de Lançamentos
         st.markdown("---")
         st.subheader("📝 Registrar Lançamentos")
-
-        opcao_lancamento = st.radio(
-            "Tipo de Lançamento:",
-            ["💵 Recebimento", "👥 Consumo por Cliente",
-                "🛒 Gasto com Insumos", "🏢 Gasto Fixo"],
-            horizontal=True,
-            label_visibility="collapsed"
-        )
-
-        if opcao_lancamento == "💵 Recebimento":
-            with st.form("form_recebimento", clear_on_submit=True):
-                col1, col2 = st.columns(2)
-                with col1:
-                    metodo_pagamento = st.selectbox(
-                        "Método de Pagamento*",
-                        ["Dinheiro", "PIX", "Cartão", "Transferência"]
-                    )
-                with col2:
-                    valor_recebimento = st.number_input(
-                        "Valor Recebido (R$)*",
-                        min_value=0.01,
-                        step=0.01
-                    )
-
-                observacao = st.text_input(
-                    "Observação (opcional)",
-                    placeholder="Ex: Feirinha, Evento especial"
-                )
-
-                if st.form_submit_button("💾 Registrar Recebimento"):
-                    if valor_recebimento <= 0:
-                        st.error("❌ O valor deve ser maior que zero!")
-                    else:
-                        if adicionar_entrada(cursor, "recebimentos", {
-                            "data": hoje,
-                            "valor": valor_recebimento,
-                            "metodo": metodo_pagamento,
-                            "tipo": "recebimento",
-                            "observacao": observacao.strip(),
-                            "nome_cliente": ""
-                        }):
-                            st.success("✅ Recebimento registrado com sucesso!")
-                            st.rerun()
-
-        elif opcao_lancamento == "👥 Consumo por Cliente":
-            with st.form("form_consumo", clear_on_submit=True):
-                col1, col2 = st.columns(2)
-                with col1:
-                    nome_cliente = st.text_input("Nome do Cliente*")
-                with col2:
-                    valor_consumo = st.number_input(
-                        "Valor do Consumo (R$)*",
-                        min_value=0.01,
-                        step=0.01
-                    )
-
-                descricao_consumo = st.text_input(
-                    "Descrição (opcional)",
-                    placeholder="Ex: 2 porções de feijoada"
-                )
-
-                observacao = st.text_input(
-                    "Observação (opcional)",
-                    placeholder="Ex: Consumo no local"
-                )
-
-                if st.form_submit_button("💾 Registrar Consumo"):
-                    if not nome_cliente.strip():
-                        st.error("❌ Informe o nome do cliente!")
-                    elif valor_consumo <= 0:
-                        st.error("❌ O valor deve ser maior que zero!")
-                    else:
-                        if adicionar_entrada(cursor, "consumo_clientes", {
-                            "data": hoje,
-                            "nome_cliente": nome_cliente.strip(),
-                            "descricao": descricao_consumo.strip(),
-                            "valor": valor_consumo,
-                            "tipo": "consumo",
-                            "observacao": observacao.strip()
-                        }):
-                            st.success("✅ Consumo registrado com sucesso!")
-                            st.rerun()
-
-        elif opcao_lancamento == "🛒 Gasto com Insumos":
-            df_insumos = pd.read_sql_query(
-                "SELECT nome, unidade_medida FROM insumos ORDER BY nome", conn)
-
-            with st.form("form_gasto_insumo", clear_on_submit=True):
-                col1, col2 = st.columns(2)
-                with col1:
-                    if not df_insumos.empty:
-                        item_selecionado = st.selectbox(
-                            "Insumo*",
-                            df_insumos['nome'],
-                            format_func=lambda x: f"{x} ({df_insumos[df_insumos['nome'] == x]['unidade_medida'].iloc[0]})"
-                        )
-                        unidade = df_insumos[df_insumos['nome'] ==
-                                             item_selecionado]['unidade_medida'].iloc[0]
-                    else:
-                        item_selecionado = st.text_input(
-                            "Insumo*", placeholder="Ex: Farinha, Açúcar")
-                        unidade = st.text_input("Unidade*", value="kg")
-
-                    quantidade = st.number_input(
-                        f"Quantidade ({unidade})",
-                        min_value=0.001,
-                        step=0.001,
-                        format="%.3f"
-                    )
-
-                with col2:
-                    valor_insumo = st.number_input(
-                        "Valor Total (R$)*", min_value=0.01, step=0.01)
-                    tipo_evento = st.text_input(
-                        "Tipo de Evento (opcional)", placeholder="Ex: Feirinha, Compra semanal")
-
-                if st.form_submit_button("💾 Registrar Gasto"):
-                    if not item_selecionado:
-                        st.error("❌ Selecione ou informe um insumo!")
-                    elif valor_insumo <= 0:
-                        st.error("❌ O valor deve ser maior que zero!")
-                    else:
-                        if adicionar_entrada(cursor, "gastos_insumos", {
-                            "data": hoje,
-                            "item": item_selecionado.strip(),
-                            "valor": valor_insumo,
-                            "tipo": tipo_evento.strip(),
-                            "quantidade": quantidade,
-                            "unidade_medida": unidade.strip(),
-                            "observacao": f"Compra: {tipo_evento.strip()}" if tipo_evento.strip() else "Compra"
-                        }):
-                            st.success(
-                                "✅ Gasto com insumo registrado com sucesso!")
-                            st.rerun()
-
-        elif opcao_lancamento == "🏢 Gasto Fixo":
-            with st.form("form_gasto_fixo", clear_on_submit=True):
-                col1, col2 = st.columns(2)
-                with col1:
-                    descricao_fixo = st.text_input(
-                        "Descrição*",
-                        placeholder="Ex: Aluguel, Luz, Internet"
-                    )
-                with col2:
-                    valor_fixo = st.number_input(
-                        "Valor (R$)*",
-                        min_value=0.01,
-                        step=0.01
-                    )
-
-                tipo_evento_fixo = st.text_input(
-                    "Tipo de Evento (opcional)",
-                    placeholder="Ex: Mensalidade, Conta de água"
-                )
-
-                if st.form_submit_button("💾 Registrar Gasto Fixo"):
-                    if not descricao_fixo.strip():
-                        st.error("❌ Informe a descrição do gasto fixo!")
-                    elif valor_fixo <= 0:
-                        st.error("❌ O valor deve ser maior que zero!")
-                    else:
-                        if adicionar_entrada(cursor, "gastos_fixos", {
-                            "data": hoje,
-                            "descricao": descricao_fixo.strip(),
-                            "valor": valor_fixo,
-                            "tipo": tipo_evento_fixo.strip() if tipo_evento_fixo.strip() else "fixo"
-                        }):
-                            st.success("✅ Gasto fixo registrado com sucesso!")
-                            st.rerun()
+        registrar_lancamentos(hoje)
+
+        with st.expander("📥 Importar Extratos (CSV/OFX)"):
+            st.caption(
+                "Créditos de extratos do banco, PIX ou maquininha viram recebimentos. "
+                "Linhas já importadas são reconhecidas e não são duplicadas; "
+                "débitos são ignorados.")
+            col_imp1, col_imp2 = st.columns([2, 1])
+            with col_imp1:
+                arquivo_extrato = st.file_uploader(
+                    "Arquivo do extrato", type=["csv", "ofx", "txt"], key="arquivo_extrato")
+            with col_imp2:
+                metodo_extrato = st.selectbox(
+                    "Forma de pagamento",
+                    ["auto", *METODOS_PAGAMENTO],
+                    format_func=lambda m: "Deduzir da descrição" if m == "auto" else m,
+                    key="metodo_extrato")
+
+            col_imp3, col_imp4 = st.columns(2)
+            with col_imp3:
+                simular_extrato = st.button("🔍 Simular Importação", key="btn_simular_extrato")
+            with col_imp4:
+                gravar_extrato = st.button("📥 Importar Extrato", key="btn_importar_extrato")
+
+            if (simular_extrato or gravar_extrato) and arquivo_extrato is None:
+                st.warning("Selecione um arquivo de extrato.")
+            elif simular_extrato or gravar_extrato:
+                # O arquivo enviado vai para a pasta da fila; a tarefa o apaga
+                fila = fila_tarefas()
+                caminho_extrato = fila.arquivo_entrada(os.path.splitext(arquivo_extrato.name)[1])
+                with open(caminho_extrato, "wb") as destino:
+                    destino.write(arquivo_extrato.getvalue())
+                st.session_state.tarefa_extrato = fila.enviar(
+                    "importar_extrato", caminho=caminho_extrato, nome=arquivo_extrato.name,
+                    metodo=metodo_extrato, simular=simular_extrato)
+
+            acompanhar_tarefa("tarefa_extrato", mostrar_relatorio_extrato)
 
         # Resumo financeiro do dia
         st.markdown("---")
         st.subheader("📊 Resumo do Dia")
 
-        # Buscar dados do dia
-        df_recebimentos = pd.read_sql_query(
-            f"SELECT * FROM recebimentos WHERE data = '{hoje}'", conn)
-        df_consumo = pd.read_sql_query(
-            f"SELECT * FROM consumo_clientes WHERE data = '{hoje}'", conn)
-        df_gastos_insumos = pd.read_sql_query(
-            f"SELECT * FROM gastos_insumos WHERE data = '{hoje}'", conn)
-        df_gastos_fixos = pd.read_sql_query(
-            f"SELECT * FROM gastos_fixos WHERE data = '{hoje}'", conn)
-
-        # Cálculo de totais
-        totais = {
-            'recebimentos': df_recebimentos["valor"].sum() if not df_recebimentos.empty else 0.0,
-            'consumo': df_consumo["valor"].sum() if not df_consumo.empty else 0.0,
-            'gastos_insumos': df_gastos_insumos["valor"].sum() if not df_gastos_insumos.empty else 0.0,
-            'gastos_fixos': df_gastos_fixos["valor"].sum() if not df_gastos_fixos.empty else 0.0
-        }
-
-        totais['entrada'] = totais['recebimentos'] + totais['consumo']
-        totais['gastos'] = totais['gastos_insumos'] + totais['gastos_fixos']
-        totais['saldo_final'] = saldo_inicial + \
-            totais['entrada'] - totais['gastos']
-
-        # Exibição em colunas com cores condicionais
-        col1, col2 = st.columns(2)
-
-        with col1:
-            st.metric("Saldo Inicial",
-                      f"R$ {saldo_inicial:.2f}", delta="Saldo inicial do dia")
-            st.metric("Total Recebimentos",
-                      f"R$ {totais['recebimentos']:.2f}", delta=f"R$ {totais['recebimentos']:.2f}")
-            st.metric(
-                "Total Consumo", f"R$ {totais['consumo']:.2f}", delta=f"R$ {totais['consumo']:.2f}")
-            st.metric(
-                "Total Entradas", f"R$ {totais['entrada']:.2f}", delta=f"R$ {totais['entrada']:.2f}")
-
-        with col2:
-            st.metric("Gastos com Insumos",
-                      f"R$ {totais['gastos_insumos']:.2f}", delta=f"R$ {totais['gastos_insumos']:.2f}")
-            st.metric(
-                "Gastos Fixos", f"R$ {totais['gastos_fixos']:.2f}", delta=f"R$ {totais['gastos_fixos']:.2f}")
-            st.metric(
-                "Total Gastos", f"R$ {totais['gastos']:.2f}", delta=f"R$ {totais['gastos']:.2f}")
-
-            saldo_delta = totais['saldo_final'] - saldo_inicial
-            st.metric("Saldo Final",
-                      f"R$ {totais['saldo_final']:.2f}",
-                      delta=f"R$ {saldo_delta:.2f}",
-                      delta_color="normal" if saldo_delta >= 0 else "inverse")
-
-        # Seção de exportação
-        st.markdown("---")
-        st.subheader("📤 Exportar Relatório")
-
-        col_exp1, col_exp2 = st.columns(2)
-
-        with col_exp1:
-            if st.button("📄 Gerar PDF do Resumo"):
-                pdf_buffer = gerar_pdf_resumo(
-                    hoje, saldo_inicial, totais, 'diario')
-                st.download_button(
-                    "⬇️ Baixar PDF",
-                    data=pdf_buffer,
-                    file_name=f"resumo_caixa_{hoje}.pdf",
-                    mime="application/pdf"
-                )
-
-        with col_exp2:
-            dados_excel = {
-                "Resumo Diário": pd.DataFrame({
-                    "Descrição": [
-                        "Saldo Inicial",
-                        "Total Recebimentos",
-                        "Total Consumo",
-                        "Total Entradas",
-                        "Gastos com Insumos",
-                        "Gastos Fixos",
-                        "Total Gastos",
-                        "Saldo Final"
-                    ],
-                    "Valor (R$)": [
-                        saldo_inicial,
-                        totais['recebimentos'],
-                        totais['consumo'],
-                        totais['entrada'],
-                        totais['gastos_insumos'],
-                        totais['gastos_fixos'],
-                        totais['gastos'],
-                        totais['saldo_final']
-                    ]
-                }),
-                "Recebimentos": df_recebimentos,
-                "Consumos": df_consumo,
-                "Gastos Insumos": df_gastos_insumos,
-                "Gastos Fixos": df_gastos_fixos
-            }
-
-            excel_buffer = gerar_excel_resumo(
-                dados_excel, f"resumo_caixa_{hoje}.xlsx")
-            st.download_button(
-                label="⬇️ Baixar Excel Completo",
-                data=excel_buffer,
-                file_name=f"resumo_caixa_{hoje}.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
+        # Totais do dia, lidos da linha do resumo diário agregado, com o
+        # saldo inicial digitado (ainda que não salvo), e a exportação, que
+        # depende das mesmas versões; atualizados sozinhos quando esta ou
+        # outra sessão grava um lançamento
+        ao_vivo(f"ao_vivo_resumo_{hoje}", TABELAS_LANCAMENTOS,
+                lambda: (caixa.resumo_dia(hoje), relatorios.lancamentos_dia(hoje)),
+                lambda dados, versao: mostrar_resumo_dia(
+                    relatorios, dados[0]._replace(saldo_inicial=saldo_inicial), dados[1],
+                    versao))
 
     # --- ABA RELATÓRIO MENSAL ---
     elif aba == "📅 Relatório Mensal":
@@ -853,31 +1160,16 @@ def main():
             ano = st.selectbox("Ano", range(
                 2020, hoje.year + 1), index=hoje.year - 2020)
 
-        data_selecionada = f"{ano}-{mes:02d}"
-        filtro_data = f"strftime('%Y-%m', data) = '{data_selecionada}'"
-
-        # Buscar dados do mês
-        df_recebimentos_mes = pd.read_sql_query(
-            f"SELECT * FROM recebimentos WHERE {filtro_data}", conn)
-        df_gastos_insumos_mes = pd.read_sql_query(
-            f"SELECT * FROM gastos_insumos WHERE {filtro_data}", conn)
-        df_gastos_fixos_mes = pd.read_sql_query(
-            f"SELECT * FROM gastos_fixos WHERE {filtro_data}", conn)
-
-        # Calcular saldo inicial do mês (primeiro dia)
-        primeiro_dia = f"{ano}-{mes:02d}-01"
-        saldo_inicial_mes = obter_saldo_inicial(cursor, primeiro_dia)
+        mes_selecionado = f"{ano}-{mes:02d}"
 
-        # Cálculo de totais
-        total_recebido = df_recebimentos_mes["valor"].sum(
-        ) if not df_recebimentos_mes.empty else 0.0
-        total_gasto_insumos = df_gastos_insumos_mes["valor"].sum(
-        ) if not df_gastos_insumos_mes.empty else 0.0
-        total_gasto_fixos = df_gastos_fixos_mes["valor"].sum(
-        ) if not df_gastos_fixos_mes.empty else 0.0
-
-        total_gastos = total_gasto_insumos + total_gasto_fixos
-        saldo_final_mes = saldo_inicial_mes + total_recebido - total_gastos
+        # Totais do mês (rollup mensal) e saldo inicial do primeiro dia
+        resumo_mes = caixa.resumo_mes(ano, mes)
+        saldo_inicial_mes = resumo_mes.saldo_inicial
+        total_recebido = resumo_mes.recebimentos
+        total_gasto_insumos = resumo_mes.gastos_insumos
+        total_gasto_fixos = resumo_mes.gastos_fixos
+        total_gastos = resumo_mes.gastos
+        saldo_final_mes = resumo_mes.saldo_final
 
         st.subheader(f"📊 Resumo Mensal - {mes:02d}/{ano}")
 
@@ -887,6 +1179,8 @@ def main():
             st.metric("Saldo Inicial do Mês", f"R$ {saldo_inicial_mes:.2f}")
             st.metric(
                 "Total Recebido", f"R$ {total_recebido:.2f}", delta=f"R$ {total_recebido:.2f}")
+            st.metric("Total Consumo",
+                      f"R$ {resumo_mes.consumo:.2f}", delta=f"R$ {resumo_mes.consumo:.2f}")
             st.metric("Gastos com Insumos",
                       f"R$ {total_gasto_insumos:.2f}", delta=f"R$ {total_gasto_insumos:.2f}")
 
@@ -899,14 +1193,16 @@ def main():
                       f"R$ {saldo_final_mes:.2f}",
                       delta=f"R$ {saldo_final_mes - saldo_inicial_mes:.2f}",
                       delta_color="normal" if (saldo_final_mes - saldo_inicial_mes) >= 0 else "inverse")
+            if resumo_mes.ajuste_saldo:
+                st.caption(f"Inclui R$ {resumo_mes.ajuste_saldo:.2f} de ajuste pelos saldos "
+                           "informados durante o mês.")
 
         st.markdown("---")
         st.subheader("💳 Detalhamento por Forma de Pagamento")
 
-        if not df_recebimentos_mes.empty:
-            df_formas_pagamento = df_recebimentos_mes.groupby(
-                'metodo')['valor'].sum().reset_index()
-            df_formas_pagamento.columns = ['Forma de Pagamento', 'Total (R$)']
+        df_formas_pagamento = relatorios.formas_pagamento_mes(ano, mes)
+
+        if not df_formas_pagamento.empty:
 
             col_det1, col_det2 = st.columns(2)
 
@@ -920,73 +1216,109 @@ def main():
         else:
             st.info("ℹ️ Nenhum recebimento registrado neste período.")
 
+        st.markdown("---")
+        st.subheader("📈 Tendência e Comparação Anual")
+
+        meses_tendencia = st.radio(
+            "Período da tendência",
+            [12, 24],
+            format_func=lambda n: f"Últimos {n} meses",
+            horizontal=True
+        )
+
+        serie = relatorios.serie_mensal(ano, mes, meses_tendencia)
+        st.line_chart(serie[["recebimentos", "consumo", "gastos_insumos", "gastos_fixos", "saldo"]].rename(columns={
+            "recebimentos": "Recebimentos",
+            "consumo": "Consumo",
+            "gastos_insumos": "Gastos Insumos",
+            "gastos_fixos": "Gastos Fixos",
+            "saldo": "Saldo"
+        }))
+
+        df_metodos = relatorios.serie_formas_pagamento(ano, mes, meses_tendencia)
+        if not df_metodos.empty and len(df_metodos.columns) > 0:
+            st.caption("Recebimentos por forma de pagamento")
+            st.bar_chart(df_metodos)
+
+        df_comparacao = serie[[
+            "recebimentos", "recebimentos_ano_anterior", "var_recebimentos",
+            "saldo", "saldo_ano_anterior", "var_saldo"
+        ]].rename(columns={
+            "recebimentos": "Recebido",
+            "recebimentos_ano_anterior": "Recebido (ano anterior)",
+            "var_recebimentos": "Variação Recebido",
+            "saldo": "Saldo",
+            "saldo_ano_anterior": "Saldo (ano anterior)",
+            "var_saldo": "Variação Saldo"
+        })
+        st.dataframe(
+            df_comparacao.iloc[::-1].style.format("R$ {:.2f}", na_rep="-"),
+            use_container_width=True
+        )
+
         st.markdown("---")
         st.subheader("📤 Exportar Relatório Mensal")
 
+        versao = versoes_tabelas(cursor, TABELAS_LANCAMENTOS + ("saldo_inicial",))
+
         col_exp1, col_exp2 = st.columns(2)
 
         with col_exp1:
-            if st.button("📄 Gerar PDF do Relatório"):
-                pdf_buffer = gerar_pdf_resumo(f"{mes:02d}/{ano}", saldo_inicial_mes, {
-                    'recebimentos': total_recebido,
-                    'consumo': 0,
-                    'entrada': total_recebido,
-                    'gastos_insumos': total_gasto_insumos,
-                    'gastos_fixos': total_gasto_fixos,
-                    'gastos': total_gastos,
-                    'saldo_final': saldo_final_mes
-                }, 'mensal')
-
-                st.download_button(
-                    "⬇️ Baixar PDF Mensal",
-                    data=pdf_buffer,
-                    file_name=f"resumo_mensal_{mes:02d}_{ano}.pdf",
-                    mime="application/pdf"
-                )
+            botao_exportacao(
+                "pdf_mensal",
+                "📄 Gerar PDF do Relatório",
+                "⬇️ Baixar PDF Mensal",
+                ("pdf_mensal", mes_selecionado, saldo_inicial_mes, versao),
+                lambda: relatorios.pdf_resumo(resumo_mes, 'mensal'),
+                f"resumo_mensal_{mes:02d}_{ano}.pdf",
+                "application/pdf"
+            )
 
         with col_exp2:
-            dados_excel = {
-                "Resumo Mensal": pd.DataFrame({
-                    "Descrição": [
-                        "Saldo Inicial",
-                        "Total Recebido",
-                        "Gastos com Insumos",
-                        "Gastos Fixos",
-                        "Total Gastos",
-                        "Saldo Final"
-                    ],
-                    "Valor (R$)": [
-                        saldo_inicial_mes,
-                        total_recebido,
-                        total_gasto_insumos,
-                        total_gasto_fixos,
-                        total_gastos,
-                        saldo_final_mes
-                    ]
-                }),
-                "Recebimentos": df_recebimentos_mes,
-                "Gastos Insumos": df_gastos_insumos_mes,
-                "Gastos Fixos": df_gastos_fixos_mes
-            }
-
-            if not df_recebimentos_mes.empty:
-                dados_excel["Formas Pagamento"] = df_formas_pagamento
-
-            excel_buffer = gerar_excel_resumo(
-                dados_excel, f"resumo_mensal_{mes:02d}_{ano}.xlsx")
-            st.download_button(
-                label="⬇️ Baixar Excel Completo",
-                data=excel_buffer,
-                file_name=f"resumo_mensal_{mes:02d}_{ano}.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            botao_exportacao(
+                "excel_mensal",
+                "📊 Gerar Excel Completo",
+                "⬇️ Baixar Excel Completo",
+                ("excel_mensal", mes_selecionado, saldo_inicial_mes, versao),
+                lambda: relatorios.planilha_relatorio_mensal(ano, mes, resumo_mes),
+                f"resumo_mensal_{mes:02d}_{ano}.xlsx",
+                MIME_EXCEL
             )
 
-    # Fechar conexão quando o app for encerrado
-    def fechar_conexao():
-        if conn:
-            conn.close()
-
-    atexit.register(fechar_conexao)
+        with st.expander("🗂️ PDF dos Fechamentos Diários"):
+            st.caption(
+                "Um PDF com uma capa por mês e uma página por dia, com o resumo do "
+                "caixa e os lançamentos detalhados. A geração roda em segundo plano.")
+            renderizar_lote_pdf(ano, mes)
+
+        with st.expander("📦 Exportar Período Longo"):
+            st.caption(
+                "Para um ano ou todo o histórico: os lançamentos são lidos em lotes e "
+                "gravados direto em arquivo, sem carregar tudo na memória.")
+            col_per1, col_per2, col_per3 = st.columns(3)
+            with col_per1:
+                inicio_exportacao = st.date_input(
+                    "De", date(ano, 1, 1), key="inicio_exportacao")
+            with col_per2:
+                fim_exportacao = st.date_input(
+                    "Até", date(ano, 12, 31), key="fim_exportacao")
+            with col_per3:
+                formato_exportacao = st.selectbox(
+                    "Formato", ["xlsx", "csv"],
+                    format_func=lambda f: "Excel (.xlsx)" if f == "xlsx" else "CSV (.zip)")
+
+            if st.button("📦 Gerar Arquivo do Período"):
+                if fim_exportacao < inicio_exportacao:
+                    st.error("❌ A data final deve ser posterior à inicial!")
+                else:
+                    st.session_state.tarefa_exportacao = fila_tarefas().enviar(
+                        "exportar_periodo", inicio=inicio_exportacao.isoformat(),
+                        fim=fim_exportacao.isoformat(), formato=formato_exportacao)
+
+            acompanhar_tarefa("tarefa_exportacao", oferecer_download(
+                "⬇️ Baixar Arquivo do Período",
+                MIME_EXCEL if formato_exportacao == "xlsx" else "application/zip",
+                "baixar_exportacao"))
 
 
 if __name__ == "__main__":
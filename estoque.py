@@ -0,0 +1,262 @@
+import argparse
+from datetime import date
+
+from banco import CAMINHO_BANCO, PoolConexoes, executar_transacao
+from dados import ConflitoVersao
+from migracoes import aplicar_migracoes
+
+# =============================================
+# LIVRO DE MOVIMENTOS DE ESTOQUE
+# =============================================
+#
+# Cada entrada ou saída de um insumo é uma linha de `movimentos_estoque`
+# (quantidade positiva para entradas, negativa para saídas), identificada
+# pelo id do insumo. `insumos.estoque_atual` é o saldo materializado desse
+# livro, mantido pelas triggers da migração 007 na mesma transação da
+# escrita. Compras e baixas lançadas em gastos_insumos geram o movimento
+# pela própria trigger, de modo que o lançamento do caixa e o estoque nunca
+# ficam dessincronizados. Este módulo grava os movimentos que não passam
+# pelo caixa (abertura, ajustes) e confere/reconstrói os saldos.
+#
+# Todo movimento incrementa a versão de linha do insumo (migração 011).
+# Ajustes e edições que partem de um saldo lido na tela recebem essa
+# versão e são recusados com ConflitoVersao se outra baixa ou edição foi
+# gravada depois da leitura, em vez de sobrescrevê-la.
+
+# Tolerância para comparar somas em ponto flutuante
+TOLERANCIA = 0.0005
+
+# Colunas de insumos editáveis diretamente; estoque_atual só por movimento
+CAMPOS_EDITAVEIS_INSUMO = ("nome", "unidade_medida", "estoque_minimo", "observacao")
+
+SQL_SALDOS_RECALCULADOS = '''
+    SELECT i.id, i.nome, COALESCE(i.estoque_atual, 0),
+           COALESCE((SELECT SUM(m.quantidade) FROM movimentos_estoque m
+                     WHERE m.insumo_id = i.id), 0)
+    FROM insumos i
+'''
+
+
+# Visão do estoque atual exibida na aba de insumos
+SQL_VISAO_ESTOQUE = '''
+    SELECT
+        i.nome AS Insumo,
+        i.unidade_medida AS Unidade,
+        i.estoque_atual AS Estoque_Atual,
+        i.estoque_minimo AS Estoque_Mínimo,
+        CASE
+            WHEN i.estoque_atual <= i.estoque_minimo THEN '⚠️ Repor'
+            ELSE '✅ OK'
+        END AS Status
+    FROM insumos i
+    ORDER BY Status DESC, i.nome
+'''
+
+
+def _conferir_versoes(cursor, versoes):
+    """Levanta ConflitoVersao se algum insumo mudou desde a versão lida"""
+    conflitos = []
+    for insumo_id, versao in versoes.items():
+        cursor.execute("SELECT nome, versao FROM insumos WHERE id = ?", (insumo_id,))
+        linha = cursor.fetchone()
+        if linha is None:
+            conflitos.append(f"id {insumo_id} (excluído)")
+        elif linha[1] != versao:
+            conflitos.append(linha[0])
+    if conflitos:
+        raise ConflitoVersao(
+            "Insumo(s) alterado(s) por outro terminal desde a leitura: "
+            f"{', '.join(conflitos)}; recarregue e tente de novo")
+
+
+def _inserir_movimento(cursor, insumo_id, quantidade, tipo, data, observacao):
+    cursor.execute(
+        "INSERT INTO movimentos_estoque (insumo_id, data, quantidade, tipo, observacao) "
+        "VALUES (?, ?, ?, ?, ?)",
+        (insumo_id, data, quantidade, tipo, observacao))
+
+
+def cadastrar_insumo(conn, nome, unidade_medida, estoque_minimo=0.0,
+                     estoque_inicial=0.0, observacao="", data=None):
+    """Cadastra o insumo e seu saldo inicial em uma transação; retorna o id"""
+    data = data or date.today().isoformat()
+
+    def gravar(cursor):
+        cursor.execute(
+            "INSERT INTO insumos (nome, unidade_medida, estoque_minimo, estoque_atual, observacao) "
+            "VALUES (?, ?, ?, 0, ?)",
+            (nome, unidade_medida, estoque_minimo, observacao))
+        insumo_id = cursor.lastrowid
+        if estoque_inicial:
+            _inserir_movimento(cursor, insumo_id, estoque_inicial, "abertura",
+                               data, "Estoque inicial")
+        return insumo_id
+
+    return executar_transacao(conn, gravar)
+
+
+def registrar_baixa(conn, insumo_id, quantidade, data, motivo=""):
+    """Registra a saída do insumo como um lançamento de gastos_insumos.
+
+    Uma única instrução: a trigger do lançamento grava o movimento e
+    atualiza o saldo na mesma transação.
+    """
+    if quantidade <= 0:
+        raise ValueError("A quantidade deve ser maior que zero")
+
+    def gravar(cursor):
+        cursor.execute('''
+            INSERT INTO gastos_insumos
+                (data, item, valor, tipo, quantidade, unidade_medida, observacao, insumo_id)
+            SELECT ?, nome, 0, 'baixa_estoque', ?, unidade_medida, ?, id
+            FROM insumos WHERE id = ?
+        ''', (data, -abs(quantidade), motivo, insumo_id))
+        if cursor.rowcount == 0:
+            raise ValueError(f"Insumo {insumo_id} não encontrado")
+
+    executar_transacao(conn, gravar)
+
+
+def ajustar_estoque(conn, insumo_id, novo_saldo, data=None,
+                    observacao="Ajuste manual", versao=None):
+    """Leva o saldo do insumo a `novo_saldo` com um movimento de ajuste.
+
+    Com `versao` (a lida junto com o saldo), recusa o ajuste se o insumo
+    mudou depois da leitura. Retorna a diferença lançada (zero quando o
+    saldo já era esse).
+    """
+    data = data or date.today().isoformat()
+
+    def gravar(cursor):
+        if versao is not None:
+            _conferir_versoes(cursor, {insumo_id: versao})
+        cursor.execute("SELECT COALESCE(estoque_atual, 0) FROM insumos WHERE id = ?",
+                       (insumo_id,))
+        linha = cursor.fetchone()
+        if linha is None:
+            raise ValueError(f"Insumo {insumo_id} não encontrado")
+        diferenca = round(novo_saldo - linha[0], 6)
+        if diferenca:
+            _inserir_movimento(cursor, insumo_id, diferenca, "ajuste", data, observacao)
+        return diferenca
+
+    return executar_transacao(conn, gravar)
+
+
+def salvar_insumos(conn, alteracoes, excluidos=(), data=None, versoes=None):
+    """Grava em uma transação as edições da grade de insumos.
+
+    `alteracoes` é {insumo_id: {coluna: novo_valor}} apenas com as colunas
+    alteradas; cada insumo recebe um único UPDATE com essas colunas, e uma
+    mudança em `estoque_atual` vira um movimento de ajuste. `excluidos`
+    lista ids a remover. `versoes` ({insumo_id: versão lida}) faz a
+    transação inteira ser recusada com ConflitoVersao se algum desses
+    insumos mudou depois da leitura. Retorna o número de insumos gravados.
+    """
+    data = data or date.today().isoformat()
+    for campos in alteracoes.values():
+        invalidos = set(campos) - set(CAMPOS_EDITAVEIS_INSUMO) - {"estoque_atual"}
+        if invalidos:
+            raise ValueError(f"Colunas não editáveis: {', '.join(sorted(invalidos))}")
+
+    def gravar(cursor):
+        if versoes:
+            _conferir_versoes(cursor, {insumo_id: versoes[insumo_id]
+                                       for insumo_id in (*alteracoes, *excluidos)
+                                       if insumo_id in versoes})
+        for insumo_id, campos in alteracoes.items():
+            campos = dict(campos)
+            novo_saldo = campos.pop("estoque_atual", None)
+            if campos:
+                atribuicoes = ", ".join(f"{coluna} = ?" for coluna in campos)
+                cursor.execute(f"UPDATE insumos SET {atribuicoes}, versao = versao + 1, "
+                               "atualizado_em = datetime('now', 'localtime') WHERE id = ?",
+                               (*campos.values(), insumo_id))
+            if novo_saldo is not None:
+                cursor.execute("SELECT COALESCE(estoque_atual, 0) FROM insumos WHERE id = ?",
+                               (insumo_id,))
+                linha = cursor.fetchone()
+                diferenca = round(novo_saldo - linha[0], 6) if linha else 0
+                if diferenca:
+                    _inserir_movimento(cursor, insumo_id, diferenca, "ajuste", data,
+                                       "Ajuste manual")
+        if excluidos:
+            cursor.executemany("DELETE FROM insumos WHERE id = ?",
+                               [(insumo_id,) for insumo_id in excluidos])
+        return len(set(alteracoes) | set(excluidos))
+
+    return executar_transacao(conn, gravar)
+
+
+def movimentos_insumo(cursor, insumo_id, limite=50):
+    """Últimos movimentos do insumo: (data, tipo, quantidade, observacao)"""
+    cursor.execute('''
+        SELECT data, tipo, quantidade, observacao FROM movimentos_estoque
+        WHERE insumo_id = ? ORDER BY data DESC, id DESC LIMIT ?
+    ''', (insumo_id, limite))
+    return cursor.fetchall()
+
+
+def verificar_estoque(conn):
+    """Compara o saldo materializado com a soma dos movimentos.
+
+    Retorna uma lista de (insumo_id, nome, saldo, soma_dos_movimentos) para
+    cada divergência; lista vazia indica consistência.
+    """
+    return [linha for linha in conn.execute(SQL_SALDOS_RECALCULADOS)
+            if abs(linha[2] - linha[3]) > TOLERANCIA]
+
+
+def reconstruir_estoque(conn):
+    """Recalcula `estoque_atual` de todos os insumos a partir do livro.
+
+    Retorna o número de insumos cujo saldo foi corrigido.
+    """
+    def gravar(cursor):
+        cursor.execute(f'''
+            UPDATE insumos SET estoque_atual = (
+                SELECT COALESCE(SUM(quantidade), 0) FROM movimentos_estoque
+                WHERE insumo_id = insumos.id), versao = versao + 1
+            WHERE abs(COALESCE(estoque_atual, 0) - (
+                SELECT COALESCE(SUM(quantidade), 0) FROM movimentos_estoque
+                WHERE insumo_id = insumos.id)) > {TOLERANCIA}
+        ''')
+        return cursor.rowcount
+
+    return executar_transacao(conn, gravar)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Reconstrói ou confere o saldo de estoque pelo livro de movimentos")
+    parser.add_argument("--banco", default=CAMINHO_BANCO,
+                        help="caminho do arquivo SQLite")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("reconstruir",
+                   help="recalcula o estoque atual a partir dos movimentos")
+    sub.add_parser("verificar",
+                   help="lista insumos com saldo diferente da soma dos movimentos")
+    args = parser.parse_args()
+
+    pool = PoolConexoes(args.banco, tamanho_maximo=1)
+    try:
+        with pool.conexao() as conn:
+            aplicar_migracoes(conn)
+            if args.comando == "reconstruir":
+                corrigidos = reconstruir_estoque(conn)
+                print(f"Estoque reconstruído ({corrigidos} insumo(s) corrigido(s))")
+            else:
+                divergencias = verificar_estoque(conn)
+    finally:
+        pool.fechar()
+
+    if args.comando == "verificar":
+        for insumo_id, nome, saldo, soma in divergencias:
+            print(f"{nome} (id {insumo_id}): estoque_atual={saldo} movimentos={soma}")
+        if divergencias:
+            parser.exit(1, f"{len(divergencias)} divergência(s) encontrada(s)\n")
+        print("Estoque consistente com os movimentos")
+
+
+if __name__ == "__main__":
+    main()
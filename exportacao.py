@@ -0,0 +1,204 @@
+import argparse
+import csv
+import io
+import os
+import tempfile
+import zipfile
+from datetime import date, timedelta
+
+from banco import CAMINHO_BANCO, PoolConexoes
+from dados import COLUNAS_CONTROLE
+from migracoes import aplicar_migracoes
+
+# =============================================
+# EXPORTAÇÃO EM STREAMING (PERÍODOS LONGOS)
+# =============================================
+#
+# Para um ano ou todo o histórico, montar DataFrames e um BytesIO com a
+# planilha inteira consome memória proporcional ao número de linhas. Aqui
+# as linhas são lidas do SQLite em lotes (fetchmany) e gravadas direto em
+# um arquivo temporário, com o xlsxwriter em modo `constant_memory` (ou em
+# CSVs dentro de um .zip), mantendo o pico de memória estável.
+
+# (nome da aba, tabela)
+TABELAS_EXPORTACAO = [
+    ("Recebimentos", "recebimentos"),
+    ("Consumos", "consumo_clientes"),
+    ("Gastos Insumos", "gastos_insumos"),
+    ("Gastos Fixos", "gastos_fixos"),
+]
+
+# Colunas exibidas como moeda; as demais numéricas usam formato decimal
+COLUNAS_MONETARIAS = {"valor"}
+
+LIMITE_LINHAS_EXCEL = 1_048_576
+TAMANHO_LOTE = 5_000
+
+
+# Colunas de controle interno (hash da importação, vínculo com o insumo,
+# versão de linha), fora da exportação, como nos relatórios
+COLUNAS_OMITIDAS = set(COLUNAS_CONTROLE)
+
+
+def colunas_tabela(conn, tabela):
+    """Lista (nome, tipo declarado) das colunas exportadas da tabela"""
+    return [(linha[1], (linha[2] or "").upper())
+            for linha in conn.execute(f"PRAGMA table_info({tabela})")
+            if linha[1] not in COLUNAS_OMITIDAS]
+
+
+def _formato_coluna(nome, tipo):
+    """Tipo de formatação da coluna, decidido pelo esquema"""
+    if nome in COLUNAS_MONETARIAS:
+        return "moeda"
+    if nome == "id" or nome.endswith("_id"):
+        return "inteiro"
+    if tipo in ("REAL", "INTEGER", "NUMERIC"):
+        return "numero"
+    return None
+
+
+def _ler_em_lotes(conn, tabela, colunas, inicio, fim, tamanho_lote):
+    # Valores monetários estão em centavos no banco (migração 008)
+    lista = ", ".join(f"{c} / 100.0 AS {c}" if c in COLUNAS_MONETARIAS else c
+                      for c in colunas)
+    cursor = conn.execute(
+        f"SELECT {lista} FROM {tabela} WHERE data >= ? AND data < ? ORDER BY data",
+        (inicio, fim))
+    while True:
+        lote = cursor.fetchmany(tamanho_lote)
+        if not lote:
+            break
+        yield lote
+
+
+def contar_linhas(conn, inicio, fim):
+    """Total de lançamentos do período, para estimar o progresso"""
+    return sum(
+        conn.execute(
+            f"SELECT COUNT(*) FROM {tabela} WHERE data >= ? AND data < ?",
+            (inicio, fim)).fetchone()[0]
+        for _, tabela in TABELAS_EXPORTACAO)
+
+
+def exportar_excel_streaming(conn, inicio, fim, destino,
+                             tamanho_lote=TAMANHO_LOTE, progresso=None):
+    """Grava em `destino` um .xlsx com os lançamentos de [inicio, fim).
+
+    Abas que passam do limite de linhas do Excel continuam em uma nova aba
+    ("Recebimentos (2)", ...). `progresso(linhas_gravadas)` é chamado a
+    cada lote. Retorna o número de linhas exportadas.
+    """
+    import xlsxwriter  # só quando há exportação para Excel
+
+    workbook = xlsxwriter.Workbook(destino, {"constant_memory": True})
+    formatos = {
+        "moeda": workbook.add_format({"num_format": "[Red]R$ #,##0.00"}),
+        "numero": workbook.add_format({"num_format": "#,##0.000"}),
+        "inteiro": workbook.add_format({"num_format": "0"}),
+        "cabecalho": workbook.add_format({"bold": True}),
+    }
+    total = 0
+
+    try:
+        for nome_aba, tabela in TABELAS_EXPORTACAO:
+            colunas = colunas_tabela(conn, tabela)
+            nomes = [nome for nome, _ in colunas]
+            formatos_colunas = [formatos.get(_formato_coluna(nome, tipo))
+                                for nome, tipo in colunas]
+
+            parte = 1
+            worksheet = None
+            linha = LIMITE_LINHAS_EXCEL
+            for lote in _ler_em_lotes(conn, tabela, nomes, inicio, fim, tamanho_lote):
+                for registro in lote:
+                    if linha >= LIMITE_LINHAS_EXCEL:
+                        titulo = nome_aba if parte == 1 else f"{nome_aba} ({parte})"
+                        worksheet = workbook.add_worksheet(titulo[:31])
+                        for col, nome in enumerate(nomes):
+                            worksheet.set_column(col, col, 14, formatos_colunas[col])
+                        worksheet.write_row(0, 0, nomes, formatos["cabecalho"])
+                        parte += 1
+                        linha = 1
+                    worksheet.write_row(linha, 0, registro)
+                    linha += 1
+                total += len(lote)
+                if progresso:
+                    progresso(total)
+    finally:
+        workbook.close()
+    return total
+
+
+def exportar_csv_streaming(conn, inicio, fim, destino,
+                           tamanho_lote=TAMANHO_LOTE, progresso=None):
+    """Grava em `destino` um .zip com um CSV por tabela do período"""
+    total = 0
+    with zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_DEFLATED) as arquivo:
+        for _, tabela in TABELAS_EXPORTACAO:
+            nomes = [nome for nome, _ in colunas_tabela(conn, tabela)]
+            with arquivo.open(f"{tabela}.csv", "w") as bruto:
+                texto = io.TextIOWrapper(bruto, encoding="utf-8", newline="")
+                escritor = csv.writer(texto)
+                escritor.writerow(nomes)
+                for lote in _ler_em_lotes(conn, tabela, nomes, inicio, fim, tamanho_lote):
+                    escritor.writerows(lote)
+                    total += len(lote)
+                    if progresso:
+                        progresso(total)
+                texto.flush()
+                texto.detach()
+    return total
+
+
+FORMATOS = {
+    "xlsx": (exportar_excel_streaming, ".xlsx"),
+    "csv": (exportar_csv_streaming, ".zip"),
+}
+
+
+def exportar_periodo(conn, inicio, fim, formato="xlsx",
+                     tamanho_lote=TAMANHO_LOTE, progresso=None):
+    """Exporta o período para um arquivo temporário e retorna seu caminho.
+
+    `fim` é exclusivo. Quem chama é responsável por apagar o arquivo.
+    """
+    exportar, sufixo = FORMATOS[formato]
+    descritor, caminho = tempfile.mkstemp(prefix="caza_", suffix=sufixo)
+    os.close(descritor)
+    try:
+        exportar(conn, inicio, fim, caminho, tamanho_lote, progresso)
+    except Exception:
+        os.remove(caminho)
+        raise
+    return caminho
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Exporta os lançamentos de um período longo em streaming")
+    parser.add_argument("--banco", default=CAMINHO_BANCO,
+                        help="caminho do arquivo SQLite")
+    parser.add_argument("--inicio", required=True,
+                        help="primeiro dia (AAAA-MM-DD)")
+    parser.add_argument("--fim", required=True,
+                        help="último dia, inclusive (AAAA-MM-DD)")
+    parser.add_argument("--formato", choices=sorted(FORMATOS), default="xlsx")
+    parser.add_argument("--saida", required=True, help="arquivo de destino")
+    args = parser.parse_args()
+
+    fim = (date.fromisoformat(args.fim) + timedelta(days=1)).isoformat()
+    exportar, _ = FORMATOS[args.formato]
+
+    pool = PoolConexoes(args.banco, tamanho_maximo=1)
+    try:
+        with pool.conexao() as conn:
+            aplicar_migracoes(conn)
+            linhas = exportar(conn, args.inicio, fim, args.saida)
+    finally:
+        pool.fechar()
+    print(f"{linhas} lançamentos exportados para {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+import argparse
+import codecs
+import csv
+import hashlib
+import io
+import itertools
+import os
+import unicodedata
+
+from banco import CAMINHO_BANCO, PoolConexoes
+from migracoes import aplicar_migracoes
+from lancamentos import (adicionar_entradas, normalizar_data,
+                         normalizar_valor, METODOS_PAGAMENTO)
+
+# =============================================
+# IMPORTAÇÃO DE EXTRATOS (CSV / OFX)
+# =============================================
+#
+# Extratos de banco, PIX e maquininha viram recebimentos. O arquivo é lido
+# em streaming (linha a linha no CSV, em blocos no OFX) e gravado em lotes,
+# cada lote em uma única transação via `adicionar_entradas`. Cada linha
+# recebe um hash do seu conteúdo, guardado em `recebimentos.hash_conteudo`
+# (índice único da migração 006): reimportar o mesmo extrato, ou extratos
+# com período sobreposto, não duplica lançamentos. Débitos (valores
+# negativos) são ignorados, pois não são recebimentos.
+
+TAMANHO_LOTE = 5_000
+
+# Máximo de variáveis por consulta do SQLite, com folga
+LIMITE_PARAMETROS = 900
+
+# Quantos erros de linha o relatório guarda como exemplo
+MAXIMO_ERROS = 20
+
+# Nome de coluna do CSV (sem acentos, minúsculo) -> campo da transação
+ALIASES_CSV = {
+    "data": "data", "date": "data", "dt": "data",
+    "data lancamento": "data", "data do lancamento": "data",
+    "data movimento": "data", "data da transacao": "data",
+    "valor": "valor", "valor (r$)": "valor", "amount": "valor",
+    "quantia": "valor", "montante": "valor",
+    "descricao": "descricao", "historico": "descricao", "memo": "descricao",
+    "lancamento": "descricao", "detalhes": "descricao", "description": "descricao",
+    "id": "identificador", "fitid": "identificador", "nsu": "identificador",
+    "identificador": "identificador", "documento": "identificador",
+    "id transacao": "identificador", "codigo": "identificador",
+}
+
+# Palavras da descrição usadas para deduzir a forma de pagamento
+PALAVRAS_CARTAO = ("cartao", "credito", "debito", "visa", "master",
+                   "maquininha", "stone", "cielo", "rede ", "getnet")
+
+
+def _sem_acentos(texto):
+    decomposto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def deduzir_metodo(descricao):
+    """Forma de pagamento provável a partir da descrição do extrato"""
+    texto = _sem_acentos(descricao or "").lower()
+    if "pix" in texto:
+        return "PIX"
+    if any(palavra in texto for palavra in PALAVRAS_CARTAO):
+        return "Cartão"
+    return "Transferência"
+
+
+def abrir_texto(bruto, tamanho=65536):
+    """Envolve um arquivo binário em texto, em UTF-8 ou Latin-1.
+
+    A codificação é decidida pelo arquivo inteiro, lido em blocos sem ir
+    todo para a memória: um byte Latin-1 perto do fim não pode interromper
+    a importação no meio, com lotes anteriores já gravados.
+    """
+    decodificador = codecs.getincrementaldecoder("utf-8")()
+    codificacao = "utf-8-sig"
+    try:
+        while True:
+            bloco = bruto.read(tamanho)
+            decodificador.decode(bloco, final=not bloco)
+            if not bloco:
+                break
+    except UnicodeDecodeError:
+        codificacao = "latin-1"
+    bruto.seek(0)
+    return io.TextIOWrapper(bruto, encoding=codificacao, newline="")
+
+
+def detectar_formato(nome, inicio):
+    """'ofx' ou 'csv', pela extensão ou pelo começo do conteúdo"""
+    extensao = os.path.splitext(nome or "")[1].lower()
+    if extensao in (".ofx", ".qfx"):
+        return "ofx"
+    if extensao in (".csv", ".txt"):
+        return "csv"
+    cabecalho = inicio.lstrip().upper()
+    return "ofx" if cabecalho.startswith(("OFXHEADER", "<OFX", "<?XML")) else "csv"
+
+
+def ler_csv_extrato(texto):
+    """Gera (nº da linha, transação) de um extrato CSV.
+
+    O separador (';', ',' ou tabulação) é detectado pela primeira linha, e
+    as colunas são reconhecidas pelos nomes usuais dos bancos (ALIASES_CSV).
+    """
+    primeira = texto.readline()
+    if not primeira.strip():
+        return
+    try:
+        dialeto = csv.Sniffer().sniff(primeira, delimiters=";,\t")
+    except csv.Error:
+        dialeto = csv.excel
+    leitor = csv.reader(itertools.chain([primeira], texto), dialect=dialeto)
+
+    cabecalho = [ALIASES_CSV.get(_sem_acentos(c).strip().lower())
+                 for c in next(leitor)]
+    if "data" not in cabecalho or "valor" not in cabecalho:
+        raise ValueError("O CSV precisa de colunas de data e valor")
+    campos = [(i, campo) for i, campo in enumerate(cabecalho) if campo]
+
+    for linha in leitor:
+        if not any(c.strip() for c in linha):
+            continue
+        transacao = {campo: linha[i].strip() if i < len(linha) else ""
+                     for i, campo in campos}
+        yield leitor.line_num, transacao
+
+
+def _tokens_ofx(texto, tamanho=65536):
+    """Fragmentos 'TAG>valor' do OFX, lidos em blocos"""
+    resto = ""
+    while True:
+        bloco = texto.read(tamanho)
+        if not bloco:
+            break
+        partes = (resto + bloco).split("<")
+        resto = partes.pop()
+        yield from partes
+    if resto:
+        yield resto
+
+
+def ler_ofx(texto):
+    """Gera (nº da transação, transação) de um extrato OFX (SGML ou XML)"""
+    campos = {"DTPOSTED": "data", "TRNAMT": "valor", "FITID": "identificador",
+              "MEMO": "descricao", "NAME": "nome"}
+    atual = None
+    numero = 0
+    for token in _tokens_ofx(texto):
+        tag, _, valor = token.partition(">")
+        tag = tag.strip().upper()
+        if tag == "STMTTRN":
+            atual = {}
+        elif tag == "/STMTTRN" and atual is not None:
+            numero += 1
+            data = atual.get("data", "")
+            if len(data) >= 8 and data[:8].isdigit():
+                atual["data"] = f"{data[:4]}-{data[4:6]}-{data[6:8]}"
+            nome = atual.pop("nome", "")
+            if not atual.get("descricao"):
+                atual["descricao"] = nome
+            yield numero, atual
+            atual = None
+        elif atual is not None and tag in campos:
+            atual[campos[tag]] = valor.strip()
+
+
+def ler_extrato(bruto, nome=None):
+    """Gera (nº, transação) de um arquivo binário de extrato CSV ou OFX.
+
+    O arquivo binário não é fechado ao final.
+    """
+    texto = abrir_texto(bruto)
+    try:
+        inicio = texto.read(512)
+        texto.seek(0)
+        if detectar_formato(nome, inicio) == "ofx":
+            yield from ler_ofx(texto)
+        else:
+            yield from ler_csv_extrato(texto)
+    finally:
+        texto.detach()
+
+
+def _hash_conteudo(data, valor, identificador, descricao, ocorrencia):
+    chave = f"{data}|{valor:.2f}|{identificador}|{descricao}|{ocorrencia}"
+    return hashlib.sha1(chave.encode("utf-8")).hexdigest()
+
+
+def _hashes_existentes(cursor, hashes):
+    existentes = set()
+    for i in range(0, len(hashes), LIMITE_PARAMETROS):
+        parte = hashes[i:i + LIMITE_PARAMETROS]
+        cursor.execute(
+            "SELECT hash_conteudo FROM recebimentos WHERE hash_conteudo IN "
+            f"({', '.join('?' * len(parte))})", parte)
+        existentes.update(linha[0] for linha in cursor.fetchall())
+    return existentes
+
+
+def importar_extrato(conn, transacoes, metodo="auto", tamanho_lote=TAMANHO_LOTE,
+                     simular=False, progresso=None):
+    """Grava como recebimentos as transações de crédito de um extrato.
+
+    `transacoes` é o gerador de `ler_extrato`. `metodo` é uma das formas de
+    pagamento ou "auto" (deduzida da descrição). Linhas já importadas são
+    reconhecidas pelo hash de conteúdo e contadas como duplicadas; transações
+    idênticas dentro do mesmo arquivo (sem identificador) são distinguidas
+    pela ordem de ocorrência. Com `simular`, nada é gravado e o relatório
+    mostra o que seria importado. `progresso(linhas_lidas)` é chamado a
+    cada lote. Retorna o relatório (dict).
+    """
+    if metodo != "auto" and metodo not in METODOS_PAGAMENTO:
+        raise ValueError(f"Forma de pagamento inválida: {metodo}")
+
+    relatorio = {"lidos": 0, "novos": 0, "duplicados": 0, "debitos": 0,
+                 "invalidos": 0, "erros": [], "simulado": simular}
+    ocorrencias = {}
+    cursor = conn.cursor()
+
+    def gravar(lote):
+        if simular:
+            existentes = _hashes_existentes(cursor, [r["hash_conteudo"] for r in lote])
+            novos = len(lote) - len(existentes)
+        else:
+            novos = adicionar_entradas(cursor, "recebimentos", lote,
+                                       ignorar_duplicados=True)
+        relatorio["novos"] += novos
+        relatorio["duplicados"] += len(lote) - novos
+        if progresso:
+            progresso(relatorio["lidos"])
+
+    lote = []
+    for numero, transacao in transacoes:
+        relatorio["lidos"] += 1
+        try:
+            data = normalizar_data((transacao.get("data") or "").split()[0].split("T")[0])
+            valor = normalizar_valor(transacao.get("valor") or "")
+        except (ValueError, IndexError) as e:
+            relatorio["invalidos"] += 1
+            if len(relatorio["erros"]) < MAXIMO_ERROS:
+                relatorio["erros"].append((numero, str(e) or "data ou valor ausente"))
+            continue
+        if valor <= 0:
+            relatorio["debitos"] += 1
+            continue
+
+        identificador = transacao.get("identificador", "")
+        descricao = transacao.get("descricao", "")
+        chave = (data, valor, identificador, descricao)
+        ocorrencia = ocorrencias.get(chave, 0)
+        ocorrencias[chave] = ocorrencia + 1
+
+        lote.append({
+            "data": data,
+            "valor": valor,
+            "metodo": deduzir_metodo(descricao) if metodo == "auto" else metodo,
+            "observacao": descricao,
+            "hash_conteudo": _hash_conteudo(data, valor, identificador,
+                                            descricao, ocorrencia),
+        })
+        if len(lote) >= tamanho_lote:
+            gravar(lote)
+            lote = []
+
+    if lote:
+        gravar(lote)
+    elif progresso:
+        progresso(relatorio["lidos"])
+    return relatorio
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Importa extratos CSV/OFX de banco, PIX e cartão como recebimentos")
+    parser.add_argument("arquivo", help="extrato .csv ou .ofx")
+    parser.add_argument("--banco", default=CAMINHO_BANCO,
+                        help="caminho do arquivo SQLite")
+    parser.add_argument("--metodo", default="auto",
+                        choices=["auto", *METODOS_PAGAMENTO],
+                        help="forma de pagamento (auto: deduz pela descrição)")
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE,
+                        help="linhas gravadas por transação")
+    parser.add_argument("--simular", action="store_true",
+                        help="só mostra o que seria importado")
+    args = parser.parse_args()
+
+    pool = PoolConexoes(args.banco, tamanho_maximo=1)
+    try:
+        with pool.conexao() as conn, open(args.arquivo, "rb") as bruto:
+            aplicar_migracoes(conn)
+            relatorio = importar_extrato(
+                conn, ler_extrato(bruto, args.arquivo), args.metodo,
+                args.lote, args.simular)
+    except ValueError as e:
+        parser.exit(1, f"{e}\n")
+    finally:
+        pool.fechar()
+
+    for numero, erro in relatorio["erros"]:
+        print(f"linha {numero}: {erro}")
+    acao = "seriam importados" if args.simular else "importados"
+    print(f"{relatorio['lidos']} lidos, {relatorio['novos']} {acao}, "
+          f"{relatorio['duplicados']} já existentes, {relatorio['debitos']} débitos "
+          f"ignorados, {relatorio['invalidos']} inválidos")
+
+
+if __name__ == "__main__":
+    main()
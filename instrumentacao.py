@@ -0,0 +1,170 @@
+import functools
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+from banco import CAMINHO_BANCO
+
+# =============================================
+# INSTRUMENTAÇÃO DOS CAMINHOS QUENTES
+# =============================================
+#
+# Mede a latência de cada chamada das operações de banco e dos geradores
+# de exportação, com as linhas lidas e os bytes produzidos. As últimas
+# amostras de cada operação ficam em memória, compartilhadas pelo processo
+# (a aba oculta "⚙️ Desempenho" mostra p50/p95 por operação), e as
+# chamadas acima do limite vão para um log de lentidão em disco, uma linha
+# JSON por chamada.
+
+# Chamadas a partir desta duração entram no log de lentidão
+LIMITE_LENTA_MS = float(os.environ.get("CAZA_LIMITE_LENTA_MS", "250"))
+CAMINHO_LOG_LENTAS = os.environ.get(
+    "CAZA_LOG_LENTAS",
+    os.path.join(os.path.dirname(CAMINHO_BANCO), "consultas_lentas.jsonl"))
+# O log é rotacionado (um arquivo .1) ao passar deste tamanho
+TAMANHO_MAXIMO_LOG = 1024 * 1024
+
+AMOSTRAS_POR_OPERACAO = 500
+
+
+def _percentil(ordenadas, fracao):
+    """Percentil pelo posto mais próximo de uma lista já ordenada"""
+    return ordenadas[max(0, math.ceil(fracao * len(ordenadas)) - 1)]
+
+
+def _resumir_sql(sql, tamanho=120):
+    return " ".join(sql.split())[:tamanho]
+
+
+class Instrumentacao:
+    """Amostras de latência por operação e log de chamadas lentas"""
+
+    def __init__(self, limite_lenta_ms=LIMITE_LENTA_MS, caminho_log=CAMINHO_LOG_LENTAS,
+                 amostras=AMOSTRAS_POR_OPERACAO):
+        self.limite_lenta_ms = limite_lenta_ms
+        self.caminho_log = caminho_log
+        self.amostras = amostras
+        self._lock = threading.Lock()
+        self._operacoes = {}
+
+    def registrar(self, operacao, duracao_ms, linhas=None, bytes_=None, detalhe=""):
+        """Registra uma chamada; as lentas também vão para o log em disco"""
+        with self._lock:
+            amostras = self._operacoes.get(operacao)
+            if amostras is None:
+                amostras = self._operacoes[operacao] = deque(maxlen=self.amostras)
+            amostras.append((duracao_ms, linhas, bytes_))
+        if duracao_ms >= self.limite_lenta_ms:
+            self._registrar_lenta({
+                "quando": datetime.now().isoformat(timespec="seconds"),
+                "operacao": operacao,
+                "ms": round(duracao_ms, 1),
+                "linhas": linhas,
+                "bytes": bytes_,
+                "detalhe": detalhe,
+            })
+
+    def _registrar_lenta(self, entrada):
+        if not self.caminho_log:
+            return
+        try:
+            with self._lock:
+                if (os.path.exists(self.caminho_log)
+                        and os.path.getsize(self.caminho_log) > TAMANHO_MAXIMO_LOG):
+                    os.replace(self.caminho_log, self.caminho_log + ".1")
+                with open(self.caminho_log, "a", encoding="utf-8") as arquivo:
+                    arquivo.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+        except OSError:
+            # O log é diagnóstico: falhar ao gravá-lo não pode derrubar a operação
+            pass
+
+    @contextmanager
+    def medir(self, operacao, detalhe=""):
+        """Cronometra o bloco; quem chama pode preencher "linhas" e "bytes"
+        no dicionário devolvido"""
+        medicao = {"linhas": None, "bytes": None}
+        inicio = time.perf_counter()
+        try:
+            yield medicao
+        finally:
+            self.registrar(operacao, (time.perf_counter() - inicio) * 1000,
+                           medicao["linhas"], medicao["bytes"], detalhe)
+
+    def instrumentar(self, operacao, medida=None):
+        """Decorador que registra cada chamada da função.
+
+        `medida(resultado)` devolve (linhas, bytes) do resultado.
+        """
+        def decorador(funcao):
+            @functools.wraps(funcao)
+            def envoltorio(*args, **kwargs):
+                with self.medir(operacao) as medicao:
+                    resultado = funcao(*args, **kwargs)
+                    if medida is not None:
+                        medicao["linhas"], medicao["bytes"] = medida(resultado)
+                return resultado
+            return envoltorio
+        return decorador
+
+    def resumo(self):
+        """Uma linha por operação: chamadas, p50/p95/máximo (ms), médias de
+        linhas e bytes"""
+        with self._lock:
+            operacoes = {nome: list(amostras) for nome, amostras in self._operacoes.items()}
+        linhas = []
+        for nome, amostras in sorted(operacoes.items()):
+            duracoes = sorted(a[0] for a in amostras)
+            qtd_linhas = [a[1] for a in amostras if a[1] is not None]
+            qtd_bytes = [a[2] for a in amostras if a[2] is not None]
+            linhas.append({
+                "operacao": nome,
+                "chamadas": len(duracoes),
+                "p50_ms": round(_percentil(duracoes, 0.50), 2),
+                "p95_ms": round(_percentil(duracoes, 0.95), 2),
+                "max_ms": round(duracoes[-1], 2),
+                "linhas_media": round(sum(qtd_linhas) / len(qtd_linhas), 1) if qtd_linhas else None,
+                "bytes_media": round(sum(qtd_bytes) / len(qtd_bytes)) if qtd_bytes else None,
+            })
+        return linhas
+
+    def lentas(self, limite=50):
+        """Últimas `limite` entradas do log de lentidão, da mais recente"""
+        if not self.caminho_log or not os.path.exists(self.caminho_log):
+            return []
+        with open(self.caminho_log, encoding="utf-8") as arquivo:
+            ultimas = deque(arquivo, maxlen=limite)
+        return [json.loads(linha) for linha in reversed(ultimas)]
+
+    def limpar(self):
+        """Descarta as amostras em memória (o log em disco é mantido)"""
+        with self._lock:
+            self._operacoes.clear()
+
+
+# Instância do processo, compartilhada por todas as sessões do dashboard
+INSTRUMENTACAO = Instrumentacao()
+instrumentar = INSTRUMENTACAO.instrumentar
+medir = INSTRUMENTACAO.medir
+
+
+def medida_dataframe(df):
+    return len(df), None
+
+
+def medida_buffer(buffer):
+    return None, buffer.getbuffer().nbytes
+
+
+def ler_sql(sql, conn, params=(), operacao="read_sql_query"):
+    """`pd.read_sql_query` instrumentado (linhas retornadas, SQL no log)"""
+    with medir(operacao, _resumir_sql(sql)) as medicao:
+        df = pd.read_sql_query(sql, conn, params=params)
+        medicao["linhas"] = len(df)
+    return df
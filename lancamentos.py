@@ -0,0 +1,234 @@
+import csv
+import io
+from datetime import date, datetime
+
+from banco import executar_transacao
+from dados import centavos
+
+# =============================================
+# LANÇAMENTOS EM LOTE
+# =============================================
+#
+# API compartilhada pelo lançamento em lote do dashboard e pelos
+# importadores: as linhas são normalizadas e validadas todas antes de
+# qualquer escrita, e gravadas com um único executemany em uma transação
+# (um único fsync), em vez de um INSERT + commit por linha.
+
+METODOS_PAGAMENTO = ["Dinheiro", "PIX", "Cartão", "Transferência"]
+
+# Por tabela: campos obrigatórios e campos opcionais com seu valor padrão
+CAMPOS_LANCAMENTO = {
+    "recebimentos": {
+        "obrigatorios": ("data", "valor", "metodo"),
+        "opcionais": {"tipo": "recebimento", "observacao": "", "nome_cliente": "",
+                      "hash_conteudo": None},
+    },
+    "consumo_clientes": {
+        "obrigatorios": ("data", "nome_cliente", "valor"),
+        "opcionais": {"descricao": "", "tipo": "consumo", "observacao": ""},
+    },
+    "gastos_insumos": {
+        "obrigatorios": ("data", "item", "valor"),
+        "opcionais": {"tipo": "", "quantidade": None, "unidade_medida": "",
+                      "observacao": "Compra"},
+    },
+    "gastos_fixos": {
+        "obrigatorios": ("data", "descricao", "valor"),
+        "opcionais": {"tipo": "fixo"},
+    },
+}
+
+
+class ErroValidacao(ValueError):
+    """Linhas de um lote que não passaram na validação.
+
+    `erros` é uma lista de (índice da linha, mensagem).
+    """
+
+    def __init__(self, erros):
+        self.erros = erros
+        super().__init__("; ".join(f"linha {i + 1}: {m}" for i, m in erros))
+
+
+def colunas_lancamento(tabela):
+    """Colunas gravadas para a tabela, na ordem do INSERT"""
+    campos = CAMPOS_LANCAMENTO[tabela]
+    return campos["obrigatorios"] + tuple(campos["opcionais"])
+
+
+def _vazio(valor):
+    return valor is None or (isinstance(valor, float) and valor != valor) \
+        or (isinstance(valor, str) and not valor.strip())
+
+
+def _numero(valor):
+    """Converte número ou texto com separador "," ou "." para float.
+
+    O separador decimal é o último entre "," e "."; o outro é o de
+    milhar. Um único tipo de separador que se repete ("1.234.567") também
+    é de milhar.
+    """
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    texto = str(valor).replace("R$", "").replace(" ", "").strip()
+    posicao = max(texto.rfind(","), texto.rfind("."))
+    if posicao >= 0:
+        decimal = texto[posicao]
+        milhar = "." if decimal == "," else ","
+        if milhar not in texto and texto.count(decimal) > 1:
+            decimal, milhar = "", decimal
+        texto = texto.replace(milhar, "")
+        if decimal:
+            texto = texto.replace(decimal, ".")
+    return float(texto)
+
+
+def normalizar_valor(valor):
+    """Converte 12.5, "12,50", "R$ 1.234,56" ou "1,234.56" para float com 2 casas"""
+    return round(_numero(valor), 2)
+
+
+def normalizar_quantidade(valor):
+    """Converte 2, "0,125" ou "1.5" para float com 3 casas, como no formulário.
+
+    Levanta ValueError para texto que não é número e para quantidade zero
+    ou negativa.
+    """
+    try:
+        quantidade = round(_numero(valor), 3)
+    except ValueError:
+        quantidade = None
+    if quantidade is None or not quantidade > 0:
+        raise ValueError(f"quantidade inválida: {valor!r}")
+    return quantidade
+
+
+def normalizar_data(valor):
+    """Converte date/datetime, "AAAA-MM-DD" ou "DD/MM/AAAA" para ISO"""
+    if isinstance(valor, datetime):
+        return valor.date().isoformat()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    texto = str(valor).strip()
+    # Caminhos rápidos para os formatos mais comuns; strptime é lento em
+    # importações de centenas de milhares de linhas
+    try:
+        if len(texto) == 10 and texto[4] == "-" and texto[7] == "-":
+            return date(int(texto[:4]), int(texto[5:7]), int(texto[8:])).isoformat()
+        if len(texto) == 10 and texto[2] == "/" and texto[5] == "/":
+            return date(int(texto[6:]), int(texto[3:5]), int(texto[:2])).isoformat()
+    except ValueError:
+        pass
+    for formato in ("%Y-%m-%d", "%d/%m/%Y", "%d/%m/%y"):
+        try:
+            return datetime.strptime(texto, formato).date().isoformat()
+        except ValueError:
+            continue
+    raise ValueError(f"data inválida: {texto!r}")
+
+
+def validar_linhas(tabela, linhas):
+    """Normaliza e valida as linhas de um lote.
+
+    Retorna (linhas_validas, erros), onde erros é uma lista de
+    (índice, mensagem). Linhas totalmente vazias são ignoradas.
+    """
+    if tabela not in CAMPOS_LANCAMENTO:
+        raise ValueError(f"Tabela sem lançamento em lote: {tabela}")
+    campos = CAMPOS_LANCAMENTO[tabela]
+
+    validas, erros = [], []
+    for indice, linha in enumerate(linhas):
+        if all(_vazio(v) for v in linha.values()):
+            continue
+
+        registro = {}
+        problemas = []
+        for campo in campos["obrigatorios"]:
+            valor = linha.get(campo)
+            if _vazio(valor):
+                problemas.append(f"'{campo}' é obrigatório")
+                continue
+            try:
+                if campo == "data":
+                    valor = normalizar_data(valor)
+                elif campo == "valor":
+                    valor = normalizar_valor(valor)
+                    if valor <= 0:
+                        raise ValueError("o valor deve ser maior que zero")
+                else:
+                    valor = str(valor).strip()
+            except ValueError as e:
+                problemas.append(str(e))
+                continue
+            registro[campo] = valor
+
+        for campo, padrao in campos["opcionais"].items():
+            valor = linha.get(campo)
+            if _vazio(valor):
+                valor = padrao
+            elif campo == "quantidade":
+                try:
+                    valor = normalizar_quantidade(valor)
+                except ValueError as e:
+                    problemas.append(str(e))
+            else:
+                valor = str(valor).strip()
+            registro[campo] = valor
+
+        if tabela == "recebimentos" and registro.get("metodo") not in (None, *METODOS_PAGAMENTO):
+            problemas.append(
+                f"método '{registro['metodo']}' inválido (use {', '.join(METODOS_PAGAMENTO)})")
+
+        if problemas:
+            erros.extend((indice, p) for p in problemas)
+        else:
+            validas.append(registro)
+    return validas, erros
+
+
+def adicionar_entradas(cursor, tabela, linhas, ignorar_duplicados=False):
+    """Valida e grava um lote de lançamentos em uma única transação.
+
+    Levanta ErroValidacao (sem gravar nada) se alguma linha for inválida.
+    Com `ignorar_duplicados`, linhas que violariam um índice único (como o
+    hash de conteúdo dos recebimentos importados) são puladas. Retorna o
+    número de linhas gravadas.
+    """
+    validas, erros = validar_linhas(tabela, linhas)
+    if erros:
+        raise ErroValidacao(erros)
+    if not validas:
+        return 0
+
+    colunas = colunas_lancamento(tabela)
+    sql = (f"INSERT {'OR IGNORE ' if ignorar_duplicados else ''}INTO {tabela} "
+           f"({', '.join(colunas)}) VALUES ({', '.join('?' * len(colunas))})")
+    # O valor é gravado em centavos (migração 008)
+    parametros = [tuple(centavos(registro[c]) if c == "valor" else registro[c]
+                        for c in colunas)
+                  for registro in validas]
+
+    def gravar(c):
+        # rowcount soma apenas as linhas inseridas (ignoradas contam zero)
+        c.executemany(sql, parametros)
+        return c.rowcount
+
+    return executar_transacao(cursor.connection, gravar)
+
+
+def ler_csv_lancamentos(texto):
+    """Lê linhas coladas como CSV (cabeçalho com os nomes das colunas).
+
+    Aceita ';', ',' ou tabulação como separador.
+    """
+    texto = texto.strip()
+    if not texto:
+        return []
+    try:
+        dialeto = csv.Sniffer().sniff(texto.splitlines()[0], delimiters=";,\t")
+    except csv.Error:
+        dialeto = csv.excel
+    leitor = csv.DictReader(io.StringIO(texto), dialect=dialeto)
+    return [{(k or "").strip().lower(): v for k, v in linha.items()}
+            for linha in leitor]
@@ -0,0 +1,1011 @@
+import argparse
+import json
+import re
+import sqlite3
+import zlib
+
+from banco import CAMINHO_BANCO, PoolConexoes
+
+# =============================================
+# MIGRAÇÕES DO ESQUEMA (PRAGMA user_version)
+# =============================================
+#
+# Cada migração recebe um cursor e roda dentro de uma transação própria;
+# ao final, `user_version` passa a ser o número da migração. Novas
+# migrações devem ser acrescentadas ao fim de MIGRACOES, nunca editadas
+# depois de publicadas.
+
+
+def _colunas(cursor, tabela):
+    return {linha[1] for linha in cursor.execute(f"PRAGMA table_info({tabela})")}
+
+
+def _adicionar_coluna(cursor, tabela, coluna, tipo):
+    """Adiciona a coluna apenas se ela ainda não existir"""
+    if coluna not in _colunas(cursor, tabela):
+        cursor.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {tipo}")
+
+
+def _migracao_001_esquema_base(cursor):
+    """Tabelas originais do sistema e colunas adicionadas depois"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS saldo_inicial (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            data TEXT UNIQUE,
+            valor REAL,
+            observacao TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS recebimentos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            data TEXT,
+            valor REAL,
+            metodo TEXT,
+            tipo TEXT,
+            observacao TEXT,
+            nome_cliente TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS consumo_clientes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            data TEXT,
+            nome_cliente TEXT,
+            descricao TEXT,
+            valor REAL,
+            tipo TEXT,
+            observacao TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS gastos_insumos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            data TEXT,
+            item TEXT,
+            valor REAL,
+            tipo TEXT,
+            quantidade REAL,
+            unidade_medida TEXT,
+            observacao TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS gastos_fixos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            data TEXT,
+            descricao TEXT,
+            valor REAL,
+            tipo TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS insumos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT UNIQUE,
+            unidade_medida TEXT,
+            estoque_minimo REAL,
+            observacao TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS estoque (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            produto TEXT,
+            quantidade REAL,
+            unidade TEXT,
+            sabor TEXT,
+            data_atualizacao TEXT
+        )
+    ''')
+
+    # Bancos criados por versões antigas não têm estas colunas
+    _adicionar_coluna(cursor, "insumos", "estoque_atual", "REAL")
+    _adicionar_coluna(cursor, "gastos_insumos", "quantidade", "REAL")
+    _adicionar_coluna(cursor, "gastos_insumos", "tipo", "TEXT")
+    _adicionar_coluna(cursor, "gastos_insumos", "unidade_medida", "TEXT")
+    _adicionar_coluna(cursor, "gastos_insumos", "observacao", "TEXT")
+    _adicionar_coluna(cursor, "estoque", "sabor", "TEXT")
+
+
+def _migracao_002_indices_data(cursor):
+    """Índices por data para os filtros diários e mensais dos relatórios"""
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_recebimentos_data_metodo
+        ON recebimentos (data, metodo)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_consumo_clientes_data
+        ON consumo_clientes (data)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_gastos_insumos_data_item
+        ON gastos_insumos (data, item)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_gastos_fixos_data
+        ON gastos_fixos (data)
+    ''')
+
+
+def _migracao_003_resumo_diario(cursor):
+    """Tabela resumo_diario mantida por triggers nas tabelas do caixa"""
+    tabelas = {
+        "recebimentos": "recebimentos",
+        "consumo_clientes": "consumo",
+        "gastos_insumos": "gastos_insumos",
+        "gastos_fixos": "gastos_fixos",
+    }
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS resumo_diario (
+            data TEXT PRIMARY KEY,
+            total_recebimentos REAL NOT NULL DEFAULT 0,
+            qtd_recebimentos INTEGER NOT NULL DEFAULT 0,
+            total_consumo REAL NOT NULL DEFAULT 0,
+            qtd_consumo INTEGER NOT NULL DEFAULT 0,
+            total_gastos_insumos REAL NOT NULL DEFAULT 0,
+            qtd_gastos_insumos INTEGER NOT NULL DEFAULT 0,
+            total_gastos_fixos REAL NOT NULL DEFAULT 0,
+            qtd_gastos_fixos INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''')
+
+    for tabela, sufixo in tabelas.items():
+        somar = f'''
+            INSERT INTO resumo_diario (data, total_{sufixo}, qtd_{sufixo})
+            VALUES (NEW.data, COALESCE(NEW.valor, 0), 1)
+            ON CONFLICT (data) DO UPDATE SET
+                total_{sufixo} = total_{sufixo} + excluded.total_{sufixo},
+                qtd_{sufixo} = qtd_{sufixo} + 1;
+        '''
+        subtrair = f'''
+            UPDATE resumo_diario SET
+                total_{sufixo} = total_{sufixo} - COALESCE(OLD.valor, 0),
+                qtd_{sufixo} = qtd_{sufixo} - 1
+            WHERE data = OLD.data;
+        '''
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{tabela}_resumo_insert
+            AFTER INSERT ON {tabela} WHEN NEW.data IS NOT NULL
+            BEGIN {somar} END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{tabela}_resumo_delete
+            AFTER DELETE ON {tabela} WHEN OLD.data IS NOT NULL
+            BEGIN {subtrair} END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{tabela}_resumo_update_antigo
+            AFTER UPDATE OF data, valor ON {tabela} WHEN OLD.data IS NOT NULL
+            BEGIN {subtrair} END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{tabela}_resumo_update_novo
+            AFTER UPDATE OF data, valor ON {tabela} WHEN NEW.data IS NOT NULL
+            BEGIN {somar} END
+        ''')
+
+        # Carrega o histórico já existente
+        cursor.execute(f'''
+            INSERT INTO resumo_diario (data, total_{sufixo}, qtd_{sufixo})
+            SELECT data, COALESCE(SUM(valor), 0), COUNT(*)
+            FROM {tabela} WHERE data IS NOT NULL GROUP BY data
+            ON CONFLICT (data) DO UPDATE SET
+                total_{sufixo} = excluded.total_{sufixo},
+                qtd_{sufixo} = excluded.qtd_{sufixo}
+        ''')
+
+
+def _migracao_004_resumo_mensal(cursor):
+    """Rollup mensal (a partir do resumo diário) e recebimentos por método"""
+    colunas = ["total_recebimentos", "qtd_recebimentos", "total_consumo",
+               "qtd_consumo", "total_gastos_insumos", "qtd_gastos_insumos",
+               "total_gastos_fixos", "qtd_gastos_fixos"]
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS resumo_mensal (
+            mes TEXT PRIMARY KEY,
+            total_recebimentos REAL NOT NULL DEFAULT 0,
+            qtd_recebimentos INTEGER NOT NULL DEFAULT 0,
+            total_consumo REAL NOT NULL DEFAULT 0,
+            qtd_consumo INTEGER NOT NULL DEFAULT 0,
+            total_gastos_insumos REAL NOT NULL DEFAULT 0,
+            qtd_gastos_insumos INTEGER NOT NULL DEFAULT 0,
+            total_gastos_fixos REAL NOT NULL DEFAULT 0,
+            qtd_gastos_fixos INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS resumo_mensal_metodo (
+            mes TEXT NOT NULL,
+            metodo TEXT NOT NULL,
+            total REAL NOT NULL DEFAULT 0,
+            qtd INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (mes, metodo)
+        ) WITHOUT ROWID
+    ''')
+
+    lista = ", ".join(colunas)
+
+    def somar(linha):
+        valores = ", ".join(f"{linha}.{c}" for c in colunas)
+        atualizacoes = ", ".join(f"{c} = {c} + excluded.{c}" for c in colunas)
+        return f'''
+            INSERT INTO resumo_mensal (mes, {lista})
+            VALUES (substr({linha}.data, 1, 7), {valores})
+            ON CONFLICT (mes) DO UPDATE SET {atualizacoes};
+        '''
+
+    def subtrair(linha):
+        atualizacoes = ", ".join(f"{c} = {c} - {linha}.{c}" for c in colunas)
+        return f'''
+            UPDATE resumo_mensal SET {atualizacoes}
+            WHERE mes = substr({linha}.data, 1, 7);
+        '''
+
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_resumo_diario_mensal_insert
+        AFTER INSERT ON resumo_diario
+        BEGIN {somar("NEW")} END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_resumo_diario_mensal_update
+        AFTER UPDATE ON resumo_diario
+        BEGIN {subtrair("OLD")} {somar("NEW")} END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_resumo_diario_mensal_delete
+        AFTER DELETE ON resumo_diario
+        BEGIN {subtrair("OLD")} END
+    ''')
+
+    somar_metodo = '''
+        INSERT INTO resumo_mensal_metodo (mes, metodo, total, qtd)
+        VALUES (substr(NEW.data, 1, 7), COALESCE(NEW.metodo, ''),
+                COALESCE(NEW.valor, 0), 1)
+        ON CONFLICT (mes, metodo) DO UPDATE SET
+            total = total + excluded.total,
+            qtd = qtd + 1;
+    '''
+    subtrair_metodo = '''
+        UPDATE resumo_mensal_metodo SET
+            total = total - COALESCE(OLD.valor, 0),
+            qtd = qtd - 1
+        WHERE mes = substr(OLD.data, 1, 7) AND metodo = COALESCE(OLD.metodo, '');
+    '''
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_recebimentos_metodo_insert
+        AFTER INSERT ON recebimentos WHEN NEW.data IS NOT NULL
+        BEGIN {somar_metodo} END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_recebimentos_metodo_delete
+        AFTER DELETE ON recebimentos WHEN OLD.data IS NOT NULL
+        BEGIN {subtrair_metodo} END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_recebimentos_metodo_update_antigo
+        AFTER UPDATE OF data, valor, metodo ON recebimentos WHEN OLD.data IS NOT NULL
+        BEGIN {subtrair_metodo} END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_recebimentos_metodo_update_novo
+        AFTER UPDATE OF data, valor, metodo ON recebimentos WHEN NEW.data IS NOT NULL
+        BEGIN {somar_metodo} END
+    ''')
+
+    # Carrega o histórico já existente
+    somas = ", ".join(f"SUM({c})" for c in colunas)
+    cursor.execute("DELETE FROM resumo_mensal")
+    cursor.execute(f'''
+        INSERT INTO resumo_mensal (mes, {lista})
+        SELECT substr(data, 1, 7), {somas} FROM resumo_diario
+        GROUP BY substr(data, 1, 7)
+    ''')
+    cursor.execute("DELETE FROM resumo_mensal_metodo")
+    cursor.execute('''
+        INSERT INTO resumo_mensal_metodo (mes, metodo, total, qtd)
+        SELECT substr(data, 1, 7), COALESCE(metodo, ''),
+               COALESCE(SUM(valor), 0), COUNT(*)
+        FROM recebimentos WHERE data IS NOT NULL
+        GROUP BY substr(data, 1, 7), COALESCE(metodo, '')
+    ''')
+
+
+def _migracao_005_versoes_tabelas(cursor):
+    """Contador de versão por tabela, incrementado a cada escrita"""
+    tabelas = ["saldo_inicial", "recebimentos", "consumo_clientes",
+               "gastos_insumos", "gastos_fixos", "insumos", "estoque"]
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS versoes_tabelas (
+            tabela TEXT PRIMARY KEY,
+            versao INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''')
+    for tabela in tabelas:
+        cursor.execute(
+            "INSERT OR IGNORE INTO versoes_tabelas (tabela, versao) VALUES (?, 0)",
+            (tabela,))
+        for evento in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{tabela}_versao_{evento.lower()}
+                AFTER {evento} ON {tabela}
+                BEGIN
+                    UPDATE versoes_tabelas SET versao = versao + 1
+                    WHERE tabela = '{tabela}';
+                END
+            ''')
+
+
+def _migracao_006_hash_recebimentos(cursor):
+    """Hash de conteúdo para deduplicar recebimentos importados de extratos"""
+    _adicionar_coluna(cursor, "recebimentos", "hash_conteudo", "TEXT")
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_recebimentos_hash_conteudo
+        ON recebimentos (hash_conteudo) WHERE hash_conteudo IS NOT NULL
+    ''')
+
+
+def _migracao_007_movimentos_estoque(cursor):
+    """Livro de movimentos de estoque por insumo, com saldo materializado.
+
+    `insumos.estoque_atual` passa a ser mantido por triggers a partir de
+    `movimentos_estoque`. Lançamentos em gastos_insumos com quantidade
+    (compras positivas, baixas negativas) geram o movimento do insumo na
+    mesma instrução. O saldo atual de cada insumo vira um movimento de
+    abertura.
+    """
+    _adicionar_coluna(cursor, "gastos_insumos", "insumo_id", "INTEGER")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS movimentos_estoque (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            insumo_id INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            quantidade REAL NOT NULL,
+            tipo TEXT NOT NULL,
+            gasto_insumo_id INTEGER,
+            observacao TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_movimentos_estoque_insumo_data
+        ON movimentos_estoque (insumo_id, data)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_movimentos_estoque_gasto
+        ON movimentos_estoque (gasto_insumo_id) WHERE gasto_insumo_id IS NOT NULL
+    ''')
+
+    # Abertura antes das triggers, para não somar o saldo duas vezes
+    cursor.execute('''
+        INSERT INTO movimentos_estoque (insumo_id, data, quantidade, tipo, observacao)
+        SELECT id, date('now', 'localtime'), estoque_atual, 'abertura',
+               'Saldo na criação do livro de movimentos'
+        FROM insumos WHERE COALESCE(estoque_atual, 0) != 0
+    ''')
+    cursor.execute("UPDATE insumos SET estoque_atual = 0 WHERE estoque_atual IS NULL")
+
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_movimentos_estoque_insert
+        AFTER INSERT ON movimentos_estoque
+        BEGIN
+            UPDATE insumos SET estoque_atual = COALESCE(estoque_atual, 0) + NEW.quantidade
+            WHERE id = NEW.insumo_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_movimentos_estoque_delete
+        AFTER DELETE ON movimentos_estoque
+        BEGIN
+            UPDATE insumos SET estoque_atual = COALESCE(estoque_atual, 0) - OLD.quantidade
+            WHERE id = OLD.insumo_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_movimentos_estoque_update
+        AFTER UPDATE OF insumo_id, quantidade ON movimentos_estoque
+        BEGIN
+            UPDATE insumos SET estoque_atual = COALESCE(estoque_atual, 0) - OLD.quantidade
+            WHERE id = OLD.insumo_id;
+            UPDATE insumos SET estoque_atual = COALESCE(estoque_atual, 0) + NEW.quantidade
+            WHERE id = NEW.insumo_id;
+        END
+    ''')
+
+    # Movimento gerado por um lançamento de gastos_insumos: o insumo vem de
+    # insumo_id ou, na falta dele, do nome do item (índice UNIQUE de nome)
+    movimento_do_gasto = '''
+            INSERT INTO movimentos_estoque
+                (insumo_id, data, quantidade, tipo, gasto_insumo_id, observacao)
+            SELECT i.id, NEW.data, NEW.quantidade,
+                   CASE WHEN NEW.tipo = 'baixa_estoque' THEN 'baixa' ELSE 'compra' END,
+                   NEW.id, NEW.observacao
+            FROM insumos i
+            WHERE i.id = COALESCE(NEW.insumo_id,
+                                  (SELECT id FROM insumos WHERE nome = NEW.item))
+              AND COALESCE(NEW.quantidade, 0) != 0;
+    '''
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_gastos_insumos_movimento_insert
+        AFTER INSERT ON gastos_insumos
+        BEGIN
+            {movimento_do_gasto}
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_gastos_insumos_movimento_delete
+        AFTER DELETE ON gastos_insumos
+        BEGIN
+            DELETE FROM movimentos_estoque WHERE gasto_insumo_id = OLD.id;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_gastos_insumos_movimento_update
+        AFTER UPDATE OF data, item, quantidade, tipo, insumo_id ON gastos_insumos
+        BEGIN
+            DELETE FROM movimentos_estoque WHERE gasto_insumo_id = OLD.id;
+            {movimento_do_gasto}
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_insumos_movimentos_delete
+        AFTER DELETE ON insumos
+        BEGIN
+            DELETE FROM movimentos_estoque WHERE insumo_id = OLD.id;
+        END
+    ''')
+
+    cursor.execute(
+        "INSERT OR IGNORE INTO versoes_tabelas (tabela, versao) VALUES ('movimentos_estoque', 0)")
+    for evento in ("INSERT", "UPDATE", "DELETE"):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_movimentos_estoque_versao_{evento.lower()}
+            AFTER {evento} ON movimentos_estoque
+            BEGIN
+                UPDATE versoes_tabelas SET versao = versao + 1
+                WHERE tabela = 'movimentos_estoque';
+            END
+        ''')
+
+
+def _reconstruir_em_centavos(cursor, tabela, colunas):
+    """Recria `tabela` com `colunas` INTEGER, convertendo reais em centavos.
+
+    O SQLite não altera o tipo de uma coluna: a tabela é recriada a partir
+    do seu próprio DDL, os dados copiados, e os índices e triggers dela
+    recriados com o SQL original guardado em sqlite_master. O contador do
+    AUTOINCREMENT (sqlite_sequence) é preservado, para que ids de linhas
+    já excluídas não voltem a ser usados.
+    """
+    ddl = cursor.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+        (tabela,)).fetchone()[0]
+    dependentes = [sql for (sql,) in cursor.execute(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = ? "
+        "AND type IN ('index', 'trigger') AND sql IS NOT NULL", (tabela,))]
+
+    nova = f"{tabela}_centavos"
+    ddl = re.sub(r"^CREATE TABLE\s+(IF NOT EXISTS\s+)?[\"']?\w+[\"']?",
+                 f"CREATE TABLE {nova}", ddl, flags=re.IGNORECASE)
+    for coluna in colunas:
+        ddl = re.sub(rf"\b{coluna}\s+REAL\b", f"{coluna} INTEGER", ddl,
+                     flags=re.IGNORECASE)
+
+    sequencia = None
+    if cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_sequence'").fetchone():
+        linha = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?",
+                               (tabela,)).fetchone()
+        sequencia = linha[0] if linha else None
+
+    todas = list(_colunas_ordenadas(cursor, tabela))
+    origem = ", ".join(
+        f"CAST(ROUND({c} * 100) AS INTEGER)" if c in colunas else c for c in todas)
+    cursor.execute(ddl)
+    cursor.execute(
+        f"INSERT INTO {nova} ({', '.join(todas)}) SELECT {origem} FROM {tabela}")
+    cursor.execute(f"DROP TABLE {tabela}")
+    # Triggers de outras tabelas citam `tabela`, que some por um instante;
+    # no modo legado o RENAME não revalida o esquema inteiro
+    cursor.execute("PRAGMA legacy_alter_table = ON")
+    try:
+        cursor.execute(f"ALTER TABLE {nova} RENAME TO {tabela}")
+    finally:
+        cursor.execute("PRAGMA legacy_alter_table = OFF")
+    if sequencia is not None:
+        # A cópia deixa o contador no maior id existente; volta ao original
+        if cursor.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?",
+                          (sequencia, tabela)).rowcount == 0:
+            cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)",
+                           (tabela, sequencia))
+    for sql in dependentes:
+        cursor.execute(sql)
+
+
+def _colunas_ordenadas(cursor, tabela):
+    return [linha[1] for linha in cursor.execute(f"PRAGMA table_info({tabela})")]
+
+
+def _migracao_008_valores_em_centavos(cursor):
+    """Valores monetários passam a ser inteiros em centavos.
+
+    Somas de inteiros são exatas, então os resumos mantidos por triggers
+    deixam de acumular erro de arredondamento ao longo do mês. A conversão
+    para reais acontece na borda (módulos `dados` e `registros`).
+    """
+    for tabela in ("saldo_inicial", "recebimentos", "consumo_clientes",
+                   "gastos_insumos", "gastos_fixos"):
+        _reconstruir_em_centavos(cursor, tabela, ("valor",))
+
+    totais = ("total_recebimentos", "total_consumo", "total_gastos_insumos",
+              "total_gastos_fixos")
+    _reconstruir_em_centavos(cursor, "resumo_diario", totais)
+    _reconstruir_em_centavos(cursor, "resumo_mensal", totais)
+    _reconstruir_em_centavos(cursor, "resumo_mensal_metodo", ("total",))
+
+
+def _migracao_009_saldo_acumulado(cursor):
+    """Saldo acumulado por dia, mantido por triggers sobre resumo_diario.
+
+    `saldo_acumulado.acumulado` é a soma, em centavos, do líquido (entradas
+    menos gastos) de todos os dias até `data`, inclusive. O saldo de
+    abertura de qualquer data sai de duas buscas pela chave primária, sem
+    percorrer o histórico. Um lançamento no dia mais recente atualiza uma
+    linha; um lançamento retroativo desloca as linhas dos dias seguintes.
+    """
+    liquido = ("{0}.total_recebimentos + {0}.total_consumo"
+               " - {0}.total_gastos_insumos - {0}.total_gastos_fixos")
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS saldo_acumulado (
+            data TEXT PRIMARY KEY,
+            acumulado INTEGER NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_resumo_diario_saldo_insert
+        AFTER INSERT ON resumo_diario
+        BEGIN
+            INSERT INTO saldo_acumulado (data, acumulado)
+            VALUES (NEW.data, COALESCE((SELECT acumulado FROM saldo_acumulado
+                                        WHERE data < NEW.data
+                                        ORDER BY data DESC LIMIT 1), 0));
+            UPDATE saldo_acumulado SET acumulado = acumulado + ({liquido.format("NEW")})
+            WHERE data >= NEW.data;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_resumo_diario_saldo_update
+        AFTER UPDATE ON resumo_diario
+        WHEN ({liquido.format("NEW")}) != ({liquido.format("OLD")})
+        BEGIN
+            UPDATE saldo_acumulado
+            SET acumulado = acumulado + ({liquido.format("NEW")}) - ({liquido.format("OLD")})
+            WHERE data >= NEW.data;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_resumo_diario_saldo_delete
+        AFTER DELETE ON resumo_diario
+        BEGIN
+            DELETE FROM saldo_acumulado WHERE data = OLD.data;
+            UPDATE saldo_acumulado SET acumulado = acumulado - ({liquido.format("OLD")})
+            WHERE data > OLD.data;
+        END
+    ''')
+
+    # Carrega o histórico já existente
+    cursor.execute(f'''
+        INSERT OR REPLACE INTO saldo_acumulado (data, acumulado)
+        SELECT data, SUM({liquido.format("resumo_diario")}) OVER (ORDER BY data)
+        FROM resumo_diario
+    ''')
+
+
+def _migracao_010_tarefas(cursor):
+    """Fila de tarefas em segundo plano (exportações, PDFs, reconstruções).
+
+    Cada linha é uma tarefa com estado, progresso e o arquivo de resultado
+    (ver `tarefas`). `chave` identifica a tarefa pelo tipo, parâmetros e
+    versões das tabelas lidas, para reaproveitar resultados ainda válidos.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tarefas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tipo TEXT NOT NULL,
+            parametros TEXT NOT NULL,
+            chave TEXT NOT NULL,
+            estado TEXT NOT NULL DEFAULT 'pendente',
+            progresso REAL NOT NULL DEFAULT 0,
+            mensagem TEXT,
+            arquivo TEXT,
+            nome_arquivo TEXT,
+            resultado TEXT,
+            erro TEXT,
+            criada_em TEXT NOT NULL,
+            iniciada_em TEXT,
+            concluida_em TEXT,
+            expira_em TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tarefas_chave ON tarefas (chave, estado)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tarefas_expira_em ON tarefas (expira_em)
+        WHERE expira_em IS NOT NULL
+    ''')
+
+
+def _migracao_011_versao_linha(cursor):
+    """Versão de linha para edições concorrentes de vários terminais.
+
+    `versao` começa em 1 e é incrementada a cada edição (ver `dados`);
+    quem grava confere a versão lida e recebe um conflito se outro
+    terminal alterou a linha antes. O saldo de um insumo também conta
+    como edição: os movimentos de estoque passam a incrementar a versão,
+    para que um ajuste feito na grade não desfaça uma baixa gravada
+    depois da leitura.
+    """
+    for tabela in ("saldo_inicial", "recebimentos", "consumo_clientes",
+                   "gastos_insumos", "gastos_fixos", "insumos"):
+        _adicionar_coluna(cursor, tabela, "versao", "INTEGER NOT NULL DEFAULT 1")
+        _adicionar_coluna(cursor, tabela, "atualizado_em", "TEXT")
+
+    def mudar_saldo(sinal, linha):
+        return f'''
+                UPDATE insumos
+                SET estoque_atual = COALESCE(estoque_atual, 0) {sinal} {linha}.quantidade,
+                    versao = versao + 1,
+                    atualizado_em = datetime('now', 'localtime')
+                WHERE id = {linha}.insumo_id;'''
+
+    triggers = {
+        "insert": ("AFTER INSERT ON movimentos_estoque", mudar_saldo("+", "NEW")),
+        "delete": ("AFTER DELETE ON movimentos_estoque", mudar_saldo("-", "OLD")),
+        "update": ("AFTER UPDATE OF insumo_id, quantidade ON movimentos_estoque",
+                   mudar_saldo("-", "OLD") + mudar_saldo("+", "NEW")),
+    }
+    for evento, (quando, corpo) in triggers.items():
+        cursor.execute(f"DROP TRIGGER IF EXISTS trg_movimentos_estoque_{evento}")
+        cursor.execute(f'''
+            CREATE TRIGGER trg_movimentos_estoque_{evento}
+            {quando}
+            BEGIN{corpo}
+            END
+        ''')
+
+
+def _migracao_012_auditoria(cursor):
+    """Registro de alterações dos lançamentos, somente inclusão.
+
+    Triggers gravam em `auditoria` cada inclusão (a linha inteira),
+    alteração (só as colunas alteradas) e exclusão dos lançamentos e dos
+    saldos informados, em JSON compacto, com o dia do lançamento: uma
+    alteração que troca a data vira uma saída do dia antigo e uma entrada
+    no novo. `auditoria_instantaneos` guarda o estado de um dia (JSON
+    comprimido com zlib) até uma entrada do registro, para reconstruir um
+    dia a partir do instantâneo mais próximo (ver `auditoria`). O estado
+    atual de cada dia vira o instantâneo de partida, anterior a qualquer
+    momento registrado.
+    """
+    auditadas = {
+        "saldo_inicial": ("data", "valor", "observacao"),
+        "recebimentos": ("data", "valor", "metodo", "tipo", "observacao", "nome_cliente"),
+        "consumo_clientes": ("data", "nome_cliente", "descricao", "valor", "tipo",
+                             "observacao"),
+        "gastos_insumos": ("data", "item", "valor", "tipo", "quantidade",
+                           "unidade_medida", "observacao"),
+        "gastos_fixos": ("data", "descricao", "valor", "tipo"),
+    }
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS auditoria (
+            id INTEGER PRIMARY KEY,
+            momento TEXT NOT NULL,
+            tabela TEXT NOT NULL,
+            registro_id INTEGER NOT NULL,
+            dia TEXT,
+            operacao TEXT NOT NULL,
+            dados TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_auditoria_tabela_momento
+        ON auditoria (tabela, momento)
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_auditoria_dia ON auditoria (dia, id)")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS auditoria_instantaneos (
+            dia TEXT NOT NULL,
+            id_auditoria INTEGER NOT NULL,
+            momento TEXT NOT NULL,
+            conteudo BLOB NOT NULL,
+            PRIMARY KEY (dia, id_auditoria)
+        ) WITHOUT ROWID
+    ''')
+    for evento in ("UPDATE", "DELETE"):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_auditoria_somente_inclusao_{evento.lower()}
+            BEFORE {evento} ON auditoria
+            BEGIN
+                SELECT RAISE(ABORT, 'A auditoria aceita somente inclusões');
+            END
+        ''')
+
+    agora = "strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')"
+    registrar = ("INSERT INTO auditoria (momento, tabela, registro_id, dia, operacao, dados) "
+                 f"SELECT {agora}, ")
+    for tabela, colunas in auditadas.items():
+        def linha(prefixo):
+            pares = ", ".join(f"'{c}', {prefixo}.{c}" for c in colunas)
+            return f"json_patch('{{}}', json_object({pares}))"
+
+        alteradas = ", ".join(
+            f"CASE WHEN OLD.{c} IS NEW.{c} THEN '$.{c}' ELSE '$._' END" for c in colunas)
+        mudou = " OR ".join(f"OLD.{c} IS NOT NEW.{c}" for c in colunas)
+        todas = ", ".join(f"'{c}', NEW.{c}" for c in colunas)
+
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{tabela}_auditoria_insert
+            AFTER INSERT ON {tabela}
+            BEGIN
+                {registrar}'{tabela}', NEW.id, NEW.data, 'I', {linha("NEW")};
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{tabela}_auditoria_update
+            AFTER UPDATE ON {tabela}
+            WHEN {mudou}
+            BEGIN
+                {registrar}'{tabela}', OLD.id, OLD.data, 'D', NULL
+                WHERE OLD.data IS NOT NEW.data;
+                {registrar}'{tabela}', NEW.id, NEW.data, 'I', {linha("NEW")}
+                WHERE OLD.data IS NOT NEW.data;
+                {registrar}'{tabela}', NEW.id, NEW.data, 'U',
+                    json_remove(json_object({todas}), {alteradas})
+                WHERE OLD.data IS NEW.data;
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{tabela}_auditoria_delete
+            AFTER DELETE ON {tabela}
+            BEGIN
+                {registrar}'{tabela}', OLD.id, OLD.data, 'D', NULL;
+            END
+        ''')
+
+    # Instantâneo de partida: o estado de cada dia antes do registro começar
+    dias = {}
+    for tabela, colunas in auditadas.items():
+        pares = ", ".join(f"'{c}', {c}" for c in colunas)
+        for dia, linhas in cursor.execute(f'''
+                SELECT data, json_group_object(id, json_patch('{{}}', json_object({pares})))
+                FROM {tabela} WHERE data IS NOT NULL GROUP BY data'''):
+            dias.setdefault(dia, {})[tabela] = json.loads(linhas)
+    cursor.executemany(
+        "INSERT OR IGNORE INTO auditoria_instantaneos (dia, id_auditoria, momento, conteudo) "
+        "VALUES (?, 0, '', ?)",
+        [(dia, zlib.compress(json.dumps(estado, separators=(",", ":")).encode()))
+         for dia, estado in dias.items()])
+
+
+def _migracao_013_movimento_gastos_legados(cursor):
+    """Edição e exclusão de gastos com insumos anteriores ao livro de estoque.
+
+    Lançamentos gravados antes da migração 007 não têm movimento próprio.
+    Naquela época só a baixa de estoque descontava de `estoque_atual` (a
+    compra não somava), então apenas as baixas antigas estão dentro do
+    movimento de abertura. As triggers da 007 trocavam o movimento do
+    lançamento editado (apagar e inserir), o que para uma baixa antiga
+    descontava a quantidade nova inteira de novo. Agora, ao editar ou
+    excluir uma baixa antiga, um movimento de ajuste estorna a quantidade
+    antiga (OLD) antes do movimento novo, e o estoque muda só pela
+    diferença. Compras antigas não têm o que estornar: a edição aplica só a
+    quantidade nova e a exclusão não mexe no estoque. Os lançamentos
+    legados são os sem movimento com id até o maior existente nesta
+    migração.
+    """
+    limite, = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM gastos_insumos").fetchone()
+    estorno_legado = f'''
+            INSERT INTO movimentos_estoque (insumo_id, data, quantidade, tipo, observacao)
+            SELECT i.id, OLD.data, -OLD.quantidade, 'ajuste',
+                   'Estorno de lançamento anterior ao livro de movimentos'
+            FROM insumos i
+            WHERE OLD.id <= {limite}
+              AND OLD.tipo = 'baixa_estoque'
+              AND i.id = COALESCE(OLD.insumo_id,
+                                  (SELECT id FROM insumos WHERE nome = OLD.item))
+              AND COALESCE(OLD.quantidade, 0) != 0
+              AND NOT EXISTS (SELECT 1 FROM movimentos_estoque
+                              WHERE gasto_insumo_id = OLD.id);
+    '''
+    movimento_do_gasto = '''
+            INSERT INTO movimentos_estoque
+                (insumo_id, data, quantidade, tipo, gasto_insumo_id, observacao)
+            SELECT i.id, NEW.data, NEW.quantidade,
+                   CASE WHEN NEW.tipo = 'baixa_estoque' THEN 'baixa' ELSE 'compra' END,
+                   NEW.id, NEW.observacao
+            FROM insumos i
+            WHERE i.id = COALESCE(NEW.insumo_id,
+                                  (SELECT id FROM insumos WHERE nome = NEW.item))
+              AND COALESCE(NEW.quantidade, 0) != 0;
+    '''
+    triggers = {
+        "delete": ("AFTER DELETE ON gastos_insumos",
+                   estorno_legado
+                   + "DELETE FROM movimentos_estoque WHERE gasto_insumo_id = OLD.id;"),
+        "update": ("AFTER UPDATE OF data, item, quantidade, tipo, insumo_id ON gastos_insumos",
+                   estorno_legado
+                   + "DELETE FROM movimentos_estoque WHERE gasto_insumo_id = OLD.id;"
+                   + movimento_do_gasto),
+    }
+    for evento, (quando, corpo) in triggers.items():
+        cursor.execute(f"DROP TRIGGER IF EXISTS trg_gastos_insumos_movimento_{evento}")
+        cursor.execute(f'''
+            CREATE TRIGGER trg_gastos_insumos_movimento_{evento}
+            {quando}
+            BEGIN{corpo}
+            END
+        ''')
+
+
+MIGRACOES = [
+    (1, "Esquema base", _migracao_001_esquema_base),
+    (2, "Índices por data nas tabelas de lançamentos", _migracao_002_indices_data),
+    (3, "Resumo diário agregado mantido por triggers", _migracao_003_resumo_diario),
+    (4, "Resumos mensais e por forma de pagamento", _migracao_004_resumo_mensal),
+    (5, "Versões das tabelas para invalidar caches", _migracao_005_versoes_tabelas),
+    (6, "Hash de conteúdo dos recebimentos importados", _migracao_006_hash_recebimentos),
+    (7, "Livro de movimentos de estoque por insumo", _migracao_007_movimentos_estoque),
+    (8, "Valores monetários em centavos inteiros", _migracao_008_valores_em_centavos),
+    (9, "Saldo acumulado por dia para o saldo de abertura", _migracao_009_saldo_acumulado),
+    (10, "Fila de tarefas em segundo plano", _migracao_010_tarefas),
+    (11, "Versão de linha para edição concorrente", _migracao_011_versao_linha),
+    (12, "Registro de alterações dos lançamentos (auditoria)", _migracao_012_auditoria),
+    (13, "Estorno dos gastos com insumos anteriores ao livro de estoque",
+     _migracao_013_movimento_gastos_legados),
+]
+
+VERSAO_ESQUEMA = MIGRACOES[-1][0]
+
+
+def versao_atual(conn):
+    """Versão do esquema gravada no banco"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migracoes_pendentes(conn):
+    """Lista (numero, descricao) das migrações ainda não aplicadas"""
+    versao = versao_atual(conn)
+    return [(numero, descricao) for numero, descricao, _ in MIGRACOES
+            if numero > versao]
+
+
+def aplicar_migracoes(conn, ate=None):
+    """Aplica as migrações pendentes e retorna os números aplicados.
+
+    Quando o esquema já está atualizado, custa apenas um PRAGMA.
+    """
+    alvo = VERSAO_ESQUEMA if ate is None else ate
+    if versao_atual(conn) >= alvo:
+        return []
+
+    aplicadas = []
+    cursor = conn.cursor()
+    for numero, descricao, migracao in MIGRACOES:
+        if numero > alvo:
+            break
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            # Outro processo pode ter migrado enquanto aguardávamos o lock
+            if versao_atual(conn) >= numero:
+                conn.rollback()
+                continue
+            migracao(cursor)
+            cursor.execute(f"PRAGMA user_version = {int(numero)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        aplicadas.append(numero)
+    return aplicadas
+
+
+def conferir_estoque_legado():
+    """Confere, num banco em memória, o estoque dos lançamentos antigos.
+
+    Simula um insumo com estoque 10, uma compra (5) e uma baixa (2)
+    gravadas antes do livro de movimentos, migra até a versão atual e
+    exclui ou edita os lançamentos. Retorna uma lista de (etapa, esperado,
+    obtido) divergentes; lista vazia indica que compras e baixas antigas
+    mexem no estoque só pelo que de fato mudou.
+    """
+    def cenario(conn):
+        aplicar_migracoes(conn, ate=6)
+        conn.execute("INSERT INTO insumos (nome, estoque_atual) VALUES ('Farinha', 8)")
+        conn.execute("INSERT INTO gastos_insumos (data, item, tipo, quantidade) "
+                     "VALUES ('2024-01-10', 'Farinha', 'compra', 5)")
+        conn.execute("INSERT INTO gastos_insumos (data, item, tipo, quantidade) "
+                     "VALUES ('2024-01-11', 'Farinha', 'baixa_estoque', -2)")
+        conn.commit()
+        aplicar_migracoes(conn)
+
+    etapas = {
+        "exclusão": [
+            ("migrado", None, 8),
+            ("compra antiga excluída", "DELETE FROM gastos_insumos WHERE id = 1", 8),
+            ("baixa antiga excluída", "DELETE FROM gastos_insumos WHERE id = 2", 10),
+        ],
+        "edição": [
+            ("compra antiga 5 -> 7",
+             "UPDATE gastos_insumos SET quantidade = 7 WHERE id = 1", 15),
+            ("baixa antiga 2 -> 3",
+             "UPDATE gastos_insumos SET quantidade = -3 WHERE id = 2", 14),
+            ("ambas excluídas", "DELETE FROM gastos_insumos", 10),
+        ],
+    }
+    divergencias = []
+    for nome, passos in etapas.items():
+        conn = sqlite3.connect(":memory:")
+        try:
+            cenario(conn)
+            for etapa, sql, esperado in passos:
+                if sql:
+                    conn.execute(sql)
+                obtido, = conn.execute(
+                    "SELECT estoque_atual FROM insumos WHERE nome = 'Farinha'").fetchone()
+                if round(obtido, 3) != esperado:
+                    divergencias.append((f"{nome}: {etapa}", esperado, obtido))
+        finally:
+            conn.close()
+    return divergencias
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Aplica ou inspeciona as migrações do banco do CAZÁ")
+    parser.add_argument("--banco", default=CAMINHO_BANCO,
+                        help="caminho do arquivo SQLite")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("status", help="mostra a versão e as migrações pendentes")
+    aplicar = sub.add_parser("aplicar", help="aplica as migrações pendentes")
+    aplicar.add_argument("--ate", type=int,
+                         help="aplica somente até esta versão")
+    sub.add_parser("conferir",
+                   help="simula um banco antigo e confere o estoque dos lançamentos legados")
+    args = parser.parse_args()
+
+    if args.comando == "conferir":
+        divergencias = conferir_estoque_legado()
+        for etapa, esperado, obtido in divergencias:
+            print(f"{etapa}: estoque {obtido}, esperado {esperado}")
+        if divergencias:
+            parser.exit(1)
+        print("Estoque dos lançamentos legados confere")
+        return
+
+    pool = PoolConexoes(args.banco, tamanho_maximo=1)
+    try:
+        with pool.conexao() as conn:
+            if args.comando == "status":
+                print(f"Versão do esquema: {versao_atual(conn)} "
+                      f"(mais recente: {VERSAO_ESQUEMA})")
+                for numero, descricao in migracoes_pendentes(conn):
+                    print(f"  pendente {numero:03d}: {descricao}")
+            else:
+                try:
+                    aplicadas = aplicar_migracoes(conn, args.ate)
+                except sqlite3.Error as e:
+                    parser.exit(1, f"Erro ao aplicar migrações: {e}\n")
+                if aplicadas:
+                    for numero in aplicadas:
+                        print(f"Migração {numero:03d} aplicada")
+                else:
+                    print("Esquema já está atualizado")
+    finally:
+        pool.fechar()
+
+
+if __name__ == "__main__":
+    main()
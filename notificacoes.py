@@ -0,0 +1,124 @@
+import argparse
+import os
+import threading
+import time
+
+from banco import CAMINHO_BANCO, PoolConexoes
+from versoes import SQL_VERSOES
+
+# =============================================
+# NOTIFICAÇÃO DE ALTERAÇÕES ENTRE SESSÕES
+# =============================================
+#
+# Um Notificador por processo vigia o banco em uma thread, com uma conexão
+# própria que nunca grava: `PRAGMA data_version` nessa conexão muda sempre
+# que qualquer outra conexão (outra sessão, outro terminal, a fila de
+# tarefas) confirma uma escrita, e não custa leitura de página. Só quando
+# ele muda a thread relê `versoes_tabelas` (migração 005) e publica as
+# versões em memória. As partes da tela que se atualizam sozinhas
+# (fragmentos do Streamlit) comparam essas versões com as que exibiram e
+# só voltam ao banco quando as suas tabelas mudaram; sem alteração, uma
+# sessão aberta não faz nenhuma consulta.
+
+# Intervalo da vigilância e da atualização das telas abertas
+INTERVALO_S = float(os.environ.get("CAZA_ATUALIZACAO_S", "2"))
+
+
+class Notificador:
+    """Versões das tabelas do banco, mantidas em memória por uma thread"""
+
+    def __init__(self, caminho=CAMINHO_BANCO, intervalo=INTERVALO_S):
+        self.intervalo = intervalo
+        self._pool = PoolConexoes(caminho, tamanho_maximo=1)
+        self._conn = self._pool.adquirir()
+        self._lock = threading.Lock()
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._data_version = None
+        self._versoes = {}
+        self._estatisticas = {"verificacoes": 0, "alteracoes": 0, "erros": 0}
+        self.conferir()
+        self._thread = threading.Thread(target=self._vigiar, name="caza-notificador",
+                                        daemon=True)
+        self._thread.start()
+
+    def conferir(self):
+        """Relê as versões se o banco mudou; indica se houve alteração"""
+        with self._lock:
+            self._estatisticas["verificacoes"] += 1
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return False
+            self._versoes = dict(self._conn.execute(SQL_VERSOES).fetchall())
+            self._data_version = data_version
+            self._estatisticas["alteracoes"] += 1
+            return True
+
+    def _vigiar(self):
+        while not self._parar.is_set():
+            self._acordar.wait(self.intervalo)
+            self._acordar.clear()
+            if self._parar.is_set():
+                break
+            try:
+                self.conferir()
+            except Exception:
+                # Banco ocupado ou indisponível: tenta de novo no próximo ciclo
+                with self._lock:
+                    self._estatisticas["erros"] += 1
+
+    def avisar(self):
+        """Chamado por quem acabou de gravar: publica as versões novas sem
+        esperar a thread. As telas abertas (inclusive a de quem gravou) as
+        veem no próximo ciclo dos seus fragmentos, em até INTERVALO_S."""
+        self.conferir()
+
+    def versoes(self, tabelas):
+        """Tupla com a última versão conhecida de cada tabela"""
+        with self._lock:
+            return tuple(self._versoes.get(tabela, 0) for tabela in tabelas)
+
+    def todas(self):
+        """{tabela: versão} de todas as tabelas conhecidas"""
+        with self._lock:
+            return dict(self._versoes)
+
+    def estatisticas(self):
+        with self._lock:
+            return {**self._estatisticas, "intervalo_s": self.intervalo,
+                    "data_version": self._data_version}
+
+    def encerrar(self):
+        self._parar.set()
+        self._acordar.set()
+        self._thread.join(timeout=5)
+        self._pool.devolver(self._conn)
+        self._pool.fechar()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Mostra as tabelas alteradas no banco, à medida que mudam")
+    parser.add_argument("--banco", default=CAMINHO_BANCO,
+                        help="caminho do arquivo SQLite")
+    parser.add_argument("--intervalo", type=float, default=INTERVALO_S)
+    args = parser.parse_args()
+
+    notificador = Notificador(args.banco, args.intervalo)
+    anteriores = notificador.todas()
+    try:
+        while True:
+            time.sleep(args.intervalo)
+            atuais = notificador.todas()
+            alteradas = sorted(t for t, v in atuais.items() if anteriores.get(t) != v)
+            if alteradas:
+                print(f"{time.strftime('%H:%M:%S')} {', '.join(alteradas)}", flush=True)
+            anteriores = atuais
+    except KeyboardInterrupt:
+        pass
+    finally:
+        notificador.encerrar()
+
+
+if __name__ == "__main__":
+    main()
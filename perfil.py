@@ -0,0 +1,107 @@
+import argparse
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+# =============================================
+# PERFIL DE INICIALIZAÇÃO
+# =============================================
+#
+# Com CAZA_PROFILE_STARTUP=1, o dashboard cronometra suas etapas (imports,
+# pool e migrações, renderização) e imprime no stderr, ao fim de cada
+# execução do script, o tempo de cada uma e o total contra o orçamento:
+# a primeira execução do processo é a inicialização a frio; as seguintes
+# são reruns, em que os módulos já estão carregados e os recursos em
+# cache. Sem a variável, `etapa` não mede nada.
+#
+#     python perfil.py [--banco caminho/do/banco.db]
+#
+# executa o dashboard duas vezes (frio + rerun) com o perfil ligado e sai
+# com código 1 se alguma execução estourar o orçamento.
+
+ATIVO = os.environ.get("CAZA_PROFILE_STARTUP") == "1"
+
+# Orçamentos em segundos
+ORCAMENTO_INICIO_FRIO = 2.0
+ORCAMENTO_RERUN = 0.5
+
+_etapas = []
+_estado = {"inicio": None, "execucoes": 0, "estouros": 0}
+
+
+def iniciar_execucao():
+    """Marca o início de uma execução do script"""
+    if ATIVO:
+        _etapas.clear()
+        _estado["inicio"] = time.perf_counter()
+
+
+@contextmanager
+def etapa(nome):
+    """Cronometra o bloco como uma etapa da execução atual"""
+    if not ATIVO:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        _etapas.append((nome, time.perf_counter() - inicio))
+
+
+def relatorio_execucao(saida=None):
+    """Imprime as etapas e o total da execução contra o orçamento.
+
+    Retorna True se a execução ficou dentro do orçamento.
+    """
+    if not ATIVO or _estado["inicio"] is None:
+        return True
+    saida = saida or sys.stderr
+    total = time.perf_counter() - _estado["inicio"]
+    frio = _estado["execucoes"] == 0
+    orcamento = ORCAMENTO_INICIO_FRIO if frio else ORCAMENTO_RERUN
+    _estado["execucoes"] += 1
+    _estado["inicio"] = None
+
+    print(f"[perfil] {'inicialização a frio' if frio else 'rerun'}", file=saida)
+    for nome, duracao in _etapas:
+        print(f"[perfil]   {nome:<28} {duracao * 1000:8.1f} ms", file=saida)
+    dentro = total <= orcamento
+    if not dentro:
+        _estado["estouros"] += 1
+    print(f"[perfil]   {'total':<28} {total * 1000:8.1f} ms "
+          f"(orçamento {orcamento * 1000:.0f} ms{'' if dentro else ', ESTOURADO'})",
+          file=saida)
+    return dentro
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Mede a inicialização a frio e um rerun do dashboard")
+    parser.add_argument("--banco", help="caminho do arquivo SQLite (padrão: o do app)")
+    args = parser.parse_args()
+
+    # O dashboard importa `perfil` (não este __main__): liga o perfil antes
+    # do import e lê dele o número de estouros
+    os.environ["CAZA_PROFILE_STARTUP"] = "1"
+    if args.banco:
+        os.environ["CAZA_DB"] = args.banco
+
+    import perfil
+    from streamlit.testing.v1 import AppTest
+
+    caminho = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dashboard_caza.py")
+    app = AppTest.from_file(caminho, default_timeout=60)
+    for _ in range(2):
+        app.run()
+        if app.exception:
+            parser.exit(1, f"Erro ao executar o dashboard: {app.exception[0].message}\n")
+
+    if perfil._estado["estouros"]:
+        parser.exit(1, f"{perfil._estado['estouros']} execução(ões) acima do orçamento\n")
+    print("Inicialização dentro do orçamento")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+from datetime import date
+
+import pandas as pd
+
+from dados import centavos, reais, sql_selecionar
+
+# =============================================
+# REGISTROS DO CAIXA
+# =============================================
+#
+# Objetos compactos (`__slots__`) para as linhas das tabelas de
+# lançamentos. Guardam o valor como centavos inteiros, como no banco
+# (migração 008), e a data como `datetime.date`; a conversão acontece na
+# borda: `de_linha` ao ler do banco, `parametros` ao gravar e `como_dict`
+# ao exibir (valor em reais, data ISO).
+
+
+class Registro:
+    __slots__ = ("id", "data", "centavos")
+
+    TABELA = ""
+    # Colunas no banco, na ordem em que as linhas são lidas e gravadas
+    COLUNAS = ()
+
+    def __init__(self, id=None, data=None, valor=None, **campos):
+        self.id = id
+        self.data = date.fromisoformat(data) if isinstance(data, str) else data
+        self.centavos = centavos(valor)
+        for coluna in self.COLUNAS:
+            if coluna not in ("id", "data", "valor"):
+                setattr(self, coluna, campos.pop(coluna, None))
+        if campos:
+            raise TypeError(f"Campos desconhecidos: {', '.join(sorted(campos))}")
+
+    @property
+    def valor(self):
+        """Valor em reais"""
+        return reais(self.centavos)
+
+    @classmethod
+    def de_linha(cls, linha):
+        """Registro a partir de uma linha do banco (valor em centavos, data ISO)"""
+        registro = cls.__new__(cls)
+        for coluna, valor in zip(cls.COLUNAS, linha):
+            if coluna == "valor":
+                registro.centavos = valor
+            elif coluna == "data":
+                registro.data = date.fromisoformat(valor) if valor else None
+            else:
+                setattr(registro, coluna, valor)
+        return registro
+
+    def _coluna(self, coluna):
+        if coluna == "valor":
+            return self.centavos
+        if coluna == "data":
+            return self.data.isoformat() if self.data else None
+        return getattr(self, coluna)
+
+    def parametros(self, colunas=None):
+        """Tupla para INSERT/UPDATE, com o valor em centavos"""
+        return tuple(self._coluna(c) for c in (colunas or self.COLUNAS))
+
+    def como_dict(self):
+        """Dicionário para exibição, com o valor em reais e a data ISO"""
+        campos = {c: self._coluna(c) for c in self.COLUNAS}
+        campos["valor"] = self.valor
+        return campos
+
+    def __repr__(self):
+        campos = ", ".join(f"{c}={v!r}" for c, v in self.como_dict().items())
+        return f"{type(self).__name__}({campos})"
+
+    def __eq__(self, outro):
+        return type(self) is type(outro) and self.parametros() == outro.parametros()
+
+
+class Recebimento(Registro):
+    __slots__ = ("metodo", "tipo", "observacao", "nome_cliente")
+    TABELA = "recebimentos"
+    COLUNAS = ("id", "data", "valor", "metodo", "tipo", "observacao", "nome_cliente")
+
+
+class Consumo(Registro):
+    __slots__ = ("nome_cliente", "descricao", "tipo", "observacao")
+    TABELA = "consumo_clientes"
+    COLUNAS = ("id", "data", "nome_cliente", "descricao", "valor", "tipo", "observacao")
+
+
+class GastoInsumo(Registro):
+    __slots__ = ("item", "tipo", "quantidade", "unidade_medida", "observacao")
+    TABELA = "gastos_insumos"
+    COLUNAS = ("id", "data", "item", "valor", "tipo", "quantidade",
+               "unidade_medida", "observacao")
+
+
+class GastoFixo(Registro):
+    __slots__ = ("descricao", "tipo")
+    TABELA = "gastos_fixos"
+    COLUNAS = ("id", "data", "descricao", "valor", "tipo")
+
+
+REGISTROS = {classe.TABELA: classe
+             for classe in (Recebimento, Consumo, GastoInsumo, GastoFixo)}
+
+
+def ler_registros(cursor, classe, filtro, parametros):
+    """Registros de `classe` que atendem ao filtro ("dia", "periodo" ou "id")"""
+    cursor.execute(sql_selecionar(classe.TABELA, classe.COLUNAS, filtro), parametros)
+    return [classe.de_linha(linha) for linha in cursor.fetchall()]
+
+
+def dataframe_registros(classe, registros):
+    """DataFrame para relatórios, com o valor em reais"""
+    return pd.DataFrame.from_records(
+        [registro.como_dict() for registro in registros], columns=list(classe.COLUNAS))
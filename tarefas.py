@@ -0,0 +1,426 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+from banco import CAMINHO_BANCO, PoolConexoes, executar_escrita
+from instrumentacao import medir
+from migracoes import aplicar_migracoes
+from versoes import versoes_tabelas
+
+# =============================================
+# FILA DE TAREFAS EM SEGUNDO PLANO
+# =============================================
+#
+# Exportações, PDFs em lote, reconstruções de resumos e importações de
+# extrato rodam em threads do processo, fora da execução do script do
+# Streamlit. Cada tarefa é uma linha da tabela `tarefas` (migração 010),
+# com estado e progresso que a tela consulta periodicamente. O resultado
+# vai para um arquivo em PASTA_TAREFAS, reaproveitado por quem pedir a
+# mesma tarefa (mesmo tipo, parâmetros e versões das tabelas lidas) até
+# expirar; arquivos expirados são apagados na próxima tarefa enviada.
+# O cancelamento é verificado a cada relato de progresso.
+
+PASTA_TAREFAS = os.environ.get(
+    "CAZA_TAREFAS", os.path.join(os.path.dirname(CAMINHO_BANCO), "tarefas"))
+VALIDADE_S = int(os.environ.get("CAZA_TAREFAS_VALIDADE_S", "3600"))
+TRABALHADORES = 2
+# Intervalo mínimo entre gravações de progresso de uma tarefa
+INTERVALO_PROGRESSO_S = 0.25
+
+PENDENTE = "pendente"
+EXECUTANDO = "executando"
+CONCLUIDA = "concluida"
+FALHOU = "falhou"
+CANCELADA = "cancelada"
+FINAIS = (CONCLUIDA, FALHOU, CANCELADA)
+
+COLUNAS_TAREFA = ("id", "tipo", "parametros", "estado", "progresso", "mensagem",
+                  "arquivo", "nome_arquivo", "resultado", "erro", "criada_em",
+                  "iniciada_em", "concluida_em", "expira_em")
+
+
+class TarefaCancelada(Exception):
+    """Levantada no relato de progresso de uma tarefa cancelada"""
+
+
+class Tarefa(namedtuple("Tarefa", COLUNAS_TAREFA)):
+    """Linha da tabela `tarefas`, com parâmetros e resultado decodificados"""
+    __slots__ = ()
+
+    @classmethod
+    def de_linha(cls, linha):
+        tarefa = cls(*linha)
+        return tarefa._replace(
+            parametros=json.loads(tarefa.parametros),
+            resultado=json.loads(tarefa.resultado) if tarefa.resultado else None)
+
+    @property
+    def finalizada(self):
+        return self.estado in FINAIS
+
+
+# `executar(execucao, **parametros)` devolve um Resultado. `tabelas` são as
+# tabelas lidas: com elas, um resultado concluído e não expirado é
+# reaproveitado enquanto suas versões não mudarem; sem elas (None), só
+# uma tarefa idêntica ainda na fila ou em execução é reaproveitada.
+TipoTarefa = namedtuple("TipoTarefa", ("executar", "tabelas"))
+
+Resultado = namedtuple("Resultado", ("arquivo", "nome_arquivo", "mensagem", "dados"),
+                       defaults=(None, None, "", None))
+
+
+def _agora():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+class Execucao:
+    """O que uma tarefa em execução recebe: conexão, progresso e destino"""
+
+    def __init__(self, fila, id_tarefa, conn, cancelamento):
+        self.fila = fila
+        self.id = id_tarefa
+        self.conn = conn
+        self._cancelamento = cancelamento
+        self._ultimo_relato = 0.0
+
+    def cancelada(self):
+        return self._cancelamento.is_set()
+
+    def progresso(self, fracao, mensagem=None):
+        """Registra o progresso (0 a 1); levanta TarefaCancelada se pedido"""
+        if self.cancelada():
+            raise TarefaCancelada()
+        agora = time.monotonic()
+        if fracao < 1 and agora - self._ultimo_relato < INTERVALO_PROGRESSO_S:
+            return
+        self._ultimo_relato = agora
+        self.fila._atualizar(self.id, progresso=min(max(fracao, 0.0), 1.0),
+                             mensagem=mensagem)
+
+    def arquivo(self, sufixo):
+        """Caminho do arquivo de resultado desta tarefa"""
+        return os.path.join(self.fila.pasta, f"tarefa_{self.id}{sufixo}")
+
+
+class FilaTarefas:
+    """Fila de tarefas do processo, registrada na tabela `tarefas`.
+
+    As tarefas rodam em um ThreadPoolExecutor com `trabalhadores` threads;
+    cada uma empresta do pool uma conexão para o trabalho, e as mudanças
+    de estado são gravadas por outra conexão, fora da transação da tarefa.
+    Tarefas que estavam na fila ou em execução quando o processo anterior
+    terminou são marcadas como falhas ao criar a fila.
+    """
+
+    def __init__(self, pool, pasta=PASTA_TAREFAS, trabalhadores=TRABALHADORES,
+                 validade_s=VALIDADE_S, tipos=None):
+        self.pool = pool
+        self.pasta = pasta
+        self.validade_s = validade_s
+        self.tipos = dict(TIPOS if tipos is None else tipos)
+        self._cancelamentos = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(trabalhadores, thread_name_prefix="caza-tarefa")
+        os.makedirs(pasta, exist_ok=True)
+        self._escrever(
+            "UPDATE tarefas SET estado = ?, erro = ?, concluida_em = ?, expira_em = ? "
+            "WHERE estado IN (?, ?)",
+            (FALHOU, "Interrompida: o processo foi encerrado", _agora(), self._expira_em(),
+             PENDENTE, EXECUTANDO))
+
+    # --- gravação do estado -------------------------------------------
+
+    def _escrever(self, sql, parametros):
+        with self.pool.conexao() as conn:
+            cursor = conn.cursor()
+            executar_escrita(cursor, sql, parametros)
+            return cursor
+
+    def _atualizar(self, id_tarefa, **campos):
+        campos = {k: v for k, v in campos.items() if v is not None}
+        atribuicoes = ", ".join(f"{coluna} = ?" for coluna in campos)
+        self._escrever(f"UPDATE tarefas SET {atribuicoes} WHERE id = ?",
+                       (*campos.values(), id_tarefa))
+
+    def _expira_em(self):
+        return (datetime.now() + timedelta(seconds=self.validade_s)).isoformat(timespec="seconds")
+
+    # --- envio e execução ---------------------------------------------
+
+    def enviar(self, tipo, **parametros):
+        """Enfileira uma tarefa e retorna seu id.
+
+        Se uma tarefa igual já estiver na fila, em execução ou (para tipos
+        com `tabelas`) concluída e válida, retorna o id dela.
+        """
+        if tipo not in self.tipos:
+            raise ValueError(f"Tipo de tarefa desconhecido: {tipo}")
+        self.limpar_expiradas()
+        tabelas = self.tipos[tipo].tabelas
+        texto_parametros = json.dumps(parametros, sort_keys=True, ensure_ascii=False)
+
+        with self.pool.conexao() as conn:
+            versoes = versoes_tabelas(conn.cursor(), tabelas) if tabelas else ()
+            chave = hashlib.sha1(
+                f"{tipo}|{texto_parametros}|{versoes}".encode("utf-8")).hexdigest()
+            estados = (PENDENTE, EXECUTANDO, CONCLUIDA) if tabelas else (PENDENTE, EXECUTANDO)
+            for id_existente, arquivo in conn.execute(
+                    f"SELECT id, arquivo FROM tarefas WHERE chave = ? "
+                    f"AND estado IN ({', '.join('?' * len(estados))}) ORDER BY id DESC",
+                    (chave, *estados)):
+                if arquivo is None or os.path.exists(arquivo):
+                    return id_existente
+
+        id_tarefa = self._escrever(
+            "INSERT INTO tarefas (tipo, parametros, chave, estado, criada_em) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (tipo, texto_parametros, chave, PENDENTE, _agora())).lastrowid
+        with self._lock:
+            self._cancelamentos[id_tarefa] = threading.Event()
+        self._executor.submit(self._executar, id_tarefa, tipo, parametros)
+        return id_tarefa
+
+    def _executar(self, id_tarefa, tipo, parametros):
+        with self._lock:
+            cancelamento = self._cancelamentos[id_tarefa]
+        try:
+            inicio = self._escrever(
+                "UPDATE tarefas SET estado = ?, iniciada_em = ? WHERE id = ? AND estado = ?",
+                (EXECUTANDO, _agora(), id_tarefa, PENDENTE))
+            if inicio.rowcount == 0:
+                return  # cancelada antes de começar
+
+            execucao = None
+            try:
+                with medir(f"tarefa {tipo}", json.dumps(parametros, ensure_ascii=False)), \
+                        self.pool.conexao() as conn:
+                    execucao = Execucao(self, id_tarefa, conn, cancelamento)
+                    resultado = self.tipos[tipo].executar(execucao, **parametros)
+            except TarefaCancelada:
+                self._descartar_arquivos(id_tarefa)
+                self._atualizar(id_tarefa, estado=CANCELADA, mensagem="Cancelada",
+                                concluida_em=_agora(), expira_em=self._expira_em())
+            except Exception as e:
+                self._descartar_arquivos(id_tarefa)
+                self._atualizar(id_tarefa, estado=FALHOU, erro=str(e) or type(e).__name__,
+                                concluida_em=_agora(), expira_em=self._expira_em())
+            else:
+                self._atualizar(
+                    id_tarefa, estado=CONCLUIDA, progresso=1.0,
+                    mensagem=resultado.mensagem, arquivo=resultado.arquivo,
+                    nome_arquivo=resultado.nome_arquivo,
+                    resultado=json.dumps(resultado.dados, ensure_ascii=False)
+                    if resultado.dados is not None else None,
+                    concluida_em=_agora(), expira_em=self._expira_em())
+        finally:
+            with self._lock:
+                self._cancelamentos.pop(id_tarefa, None)
+
+    def cancelar(self, id_tarefa):
+        """Pede o cancelamento; tarefas ainda na fila nem começam"""
+        with self._lock:
+            cancelamento = self._cancelamentos.get(id_tarefa)
+        if cancelamento is not None:
+            cancelamento.set()
+        self._escrever(
+            "UPDATE tarefas SET estado = ?, mensagem = ?, concluida_em = ?, expira_em = ? "
+            "WHERE id = ? AND estado = ?",
+            (CANCELADA, "Cancelada", _agora(), self._expira_em(), id_tarefa, PENDENTE))
+
+    # --- consulta -----------------------------------------------------
+
+    def tarefa(self, id_tarefa):
+        """Tarefa pelo id (None se não existir ou já tiver expirado)"""
+        with self.pool.conexao() as conn:
+            linha = conn.execute(
+                f"SELECT {', '.join(COLUNAS_TAREFA)} FROM tarefas WHERE id = ?",
+                (id_tarefa,)).fetchone()
+        return Tarefa.de_linha(linha) if linha else None
+
+    def recentes(self, limite=20):
+        with self.pool.conexao() as conn:
+            linhas = conn.execute(
+                f"SELECT {', '.join(COLUNAS_TAREFA)} FROM tarefas ORDER BY id DESC LIMIT ?",
+                (limite,)).fetchall()
+        return [Tarefa.de_linha(linha) for linha in linhas]
+
+    def arquivo_entrada(self, sufixo=""):
+        """Caminho novo na pasta da fila, para arquivos enviados a uma tarefa"""
+        return os.path.join(self.pasta, f"entrada_{uuid.uuid4().hex}{sufixo}")
+
+    # --- validade dos resultados --------------------------------------
+
+    def _descartar_arquivos(self, id_tarefa):
+        prefixo = f"tarefa_{id_tarefa}."
+        for nome in os.listdir(self.pasta):
+            if nome.startswith(prefixo):
+                _remover(os.path.join(self.pasta, nome))
+
+    def limpar_expiradas(self):
+        return limpar_expiradas(self.pool, self.pasta, self.validade_s)
+
+    def encerrar(self, esperar=True):
+        self._executor.shutdown(wait=esperar, cancel_futures=True)
+
+
+def _remover(caminho):
+    try:
+        os.remove(caminho)
+    except OSError:
+        pass
+
+
+def limpar_expiradas(pool, pasta=PASTA_TAREFAS, validade_s=VALIDADE_S):
+    """Apaga as tarefas finalizadas já expiradas e seus arquivos, além de
+    arquivos da pasta sem tarefa válida e mais antigos que a validade.
+
+    Retorna o número de tarefas apagadas.
+    """
+    agora = _agora()
+    with pool.conexao() as conn:
+        expiradas = conn.execute(
+            "SELECT id, arquivo FROM tarefas WHERE expira_em <= ?", (agora,)).fetchall()
+        em_uso = {arquivo for (arquivo,) in conn.execute(
+            "SELECT arquivo FROM tarefas WHERE arquivo IS NOT NULL AND expira_em > ?",
+            (agora,))}
+        for _, arquivo in expiradas:
+            if arquivo:
+                _remover(arquivo)
+        if expiradas:
+            executar_escrita(conn.cursor(), "DELETE FROM tarefas WHERE expira_em <= ?", (agora,))
+
+    if os.path.isdir(pasta):
+        limite = time.time() - validade_s
+        for nome in os.listdir(pasta):
+            caminho = os.path.join(pasta, nome)
+            if caminho not in em_uso and os.path.getmtime(caminho) < limite:
+                _remover(caminho)
+    return len(expiradas)
+
+
+# =============================================
+# TIPOS DE TAREFA
+# =============================================
+#
+# Os módulos de cada tarefa são importados só quando ela executa.
+
+TABELAS_CAIXA = ("recebimentos", "consumo_clientes", "gastos_insumos", "gastos_fixos")
+
+
+def _dia_seguinte(dia):
+    return (date.fromisoformat(dia) + timedelta(days=1)).isoformat()
+
+
+def tarefa_exportar_periodo(execucao, inicio, fim, formato="xlsx"):
+    """Lançamentos de [inicio, fim] (datas ISO, inclusive) em .xlsx ou .zip de CSVs"""
+    from exportacao import FORMATOS, contar_linhas, exportar_periodo
+
+    total = max(contar_linhas(execucao.conn, inicio, _dia_seguinte(fim)), 1)
+    temporario = exportar_periodo(
+        execucao.conn, inicio, _dia_seguinte(fim), formato,
+        progresso=lambda n: execucao.progresso(n / total, f"{n} de {total} lançamentos"))
+    sufixo = FORMATOS[formato][1]
+    destino = execucao.arquivo(sufixo)
+    shutil.move(temporario, destino)
+    return Resultado(destino, f"lancamentos_{inicio}_{fim}{sufixo}",
+                     f"{total} lançamentos exportados")
+
+
+def tarefa_pdf_periodo(execucao, inicio, fim, vazios=False):
+    """PDF dos fechamentos diários de [inicio, fim] (ver caza.pdf_lote)"""
+    from caza.pdf_lote import gerar_pdf_periodo
+
+    resultado = gerar_pdf_periodo(
+        execucao.conn, inicio, fim,
+        progresso=lambda feitos, total: execucao.progresso(
+            feitos / total, f"{feitos} de {total} páginas de capa e dias"),
+        incluir_dias_vazios=vazios)
+    destino = execucao.arquivo(".pdf")
+    with open(destino, "wb") as arquivo:
+        arquivo.write(resultado.conteudo)
+    return Resultado(
+        destino, f"fechamentos_{inicio}_{fim}.pdf",
+        f"{resultado.paginas} páginas ({resultado.dias} dias) em {resultado.segundos:.2f} s "
+        f"· {resultado.paginas_por_segundo:.0f} páginas/s",
+        {"paginas": resultado.paginas, "dias": resultado.dias,
+         "paginas_por_segundo": round(resultado.paginas_por_segundo, 1)})
+
+
+def tarefa_reconstruir_resumos(execucao):
+    """Recalcula os resumos do caixa e o saldo de estoque a partir dos lançamentos"""
+    from agregados import reconstruir_resumo_diario
+    from estoque import reconstruir_estoque
+
+    # Cada reconstrução é uma transação; o cancelamento vale entre elas
+    execucao.progresso(0.0, "Reconstruindo os resumos do caixa")
+    dias = reconstruir_resumo_diario(execucao.conn)
+    execucao.progresso(0.5, "Reconstruindo o saldo de estoque")
+    insumos = reconstruir_estoque(execucao.conn)
+    return Resultado(mensagem=f"Resumos de {dias} dias reconstruídos; "
+                              f"{insumos} saldo(s) de estoque corrigido(s)",
+                     dados={"dias": dias, "insumos_corrigidos": insumos})
+
+
+def tarefa_importar_extrato(execucao, caminho, nome, metodo="auto", simular=False):
+    """Importa (ou simula) um extrato salvo em `caminho`, que é apagado ao final"""
+    from importador import importar_extrato, ler_extrato
+
+    try:
+        tamanho = max(os.path.getsize(caminho), 1)
+        with open(caminho, "rb") as bruto:
+            relatorio = importar_extrato(
+                execucao.conn, ler_extrato(bruto, nome), metodo, simular=simular,
+                progresso=lambda n: execucao.progresso(
+                    min(bruto.tell() / tamanho, 1.0), f"{n} linhas lidas"))
+    finally:
+        _remover(caminho)
+    acao = "seriam importados" if simular else "importados"
+    return Resultado(mensagem=f"{relatorio['novos']} recebimentos {acao}",
+                     dados=relatorio)
+
+
+TIPOS = {
+    "exportar_periodo": TipoTarefa(tarefa_exportar_periodo, TABELAS_CAIXA),
+    "pdf_periodo": TipoTarefa(tarefa_pdf_periodo, TABELAS_CAIXA + ("saldo_inicial",)),
+    "reconstruir_resumos": TipoTarefa(tarefa_reconstruir_resumos, None),
+    "importar_extrato": TipoTarefa(tarefa_importar_extrato, None),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Lista as tarefas em segundo plano ou apaga as expiradas")
+    parser.add_argument("--banco", default=CAMINHO_BANCO,
+                        help="caminho do arquivo SQLite")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("listar", help="mostra as tarefas mais recentes")
+    sub.add_parser("limpar", help="apaga tarefas e arquivos expirados")
+    args = parser.parse_args()
+
+    pool = PoolConexoes(args.banco, tamanho_maximo=2)
+    try:
+        with pool.conexao() as conn:
+            aplicar_migracoes(conn)
+        if args.comando == "limpar":
+            print(f"{limpar_expiradas(pool)} tarefa(s) expirada(s) apagada(s)")
+        else:
+            with pool.conexao() as conn:
+                linhas = conn.execute(
+                    "SELECT id, tipo, estado, progresso, criada_em, COALESCE(mensagem, erro, '') "
+                    "FROM tarefas ORDER BY id DESC LIMIT 30").fetchall()
+            for id_, tipo, estado, progresso, criada_em, texto in linhas:
+                print(f"{id_:>5} {criada_em} {tipo:<20} {estado:<10} {progresso:>4.0%} {texto}")
+    finally:
+        pool.fechar()
+
+
+if __name__ == "__main__":
+    main()
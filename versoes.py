@@ -0,0 +1,16 @@
+# =============================================
+# VERSÕES DAS TABELAS
+# =============================================
+#
+# `versoes_tabelas` tem um contador por tabela, incrementado por triggers
+# (migração 005) a cada INSERT, UPDATE ou DELETE. Uma tupla de versões
+# identifica o conteúdo das tabelas e serve de chave para caches:
+# enquanto ela não muda, o que foi gerado a partir delas continua válido.
+
+SQL_VERSOES = "SELECT tabela, versao FROM versoes_tabelas"
+
+
+def versoes_tabelas(cursor, tabelas):
+    """Tupla com a versão atual de cada tabela, na ordem pedida"""
+    versoes = dict(cursor.execute(SQL_VERSOES).fetchall())
+    return tuple(versoes.get(tabela, 0) for tabela in tabelas)